@@ -5,18 +5,18 @@ from typing import Any, TYPE_CHECKING
 if TYPE_CHECKING:
     import pandas as _pd_check  # type: ignore
 
-import os, sys, csv
+import os, sys, io, re, csv, json, bisect, time, random, gc, unicodedata, threading, queue, functools, itertools, operator, contextlib, hashlib
+import multiprocessing, concurrent.futures
+from collections import deque
+from collections.abc import Mapping, Sequence
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, colorchooser
+from tkinter import ttk, messagebox, filedialog, colorchooser, simpledialog
 
 # Excel
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
-# Biểu đồ
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
+# Biểu đồ: matplotlib nạp ở lần vẽ đầu tiên (_pyplot)
 import numpy as np
 
 # Load .env if present
@@ -45,9 +45,14 @@ try:
 except Exception:
     _HAS_PIL = False
 
-# ---- Cấu hình font Unicode cho Matplotlib ----
-matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Segoe UI']
-matplotlib.rcParams['axes.unicode_minus'] = False
+# ---- Matplotlib: nạp khi vẽ biểu đồ lần đầu, kèm cấu hình font Unicode ----
+# (tiến trình con đọc file song song import lại cả module này -> không kéo theo matplotlib)
+def _pyplot():
+    import matplotlib
+    import matplotlib.pyplot as plt
+    matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Segoe UI']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return plt
 
 def resource_path(rel_path: str) -> str:
     if hasattr(sys, "_MEIPASS"):
@@ -58,14 +63,12 @@ def resource_path(rel_path: str) -> str:
 
 SUBJECTS = ["toan", "ly", "hoa", "van", "anh", "tin"]
 
-# ================== MẢNG THỐNG KÊ (10 BIN) & MẢNG RAW ==================
+# ================== THỐNG KÊ (10 BIN) ==================
 # 10 bin: [0,1), [1,2), ..., [8,9), [9,10]
-TOAN = [0]*10; LI = [0]*10; HOA = [0]*10
-VAN  = [0]*10; ANH = [0]*10; TIN = [0]*10; TB = [0]*10
-
-TOAN_RAW, LI_RAW, HOA_RAW = [], [], []
-VAN_RAW, ANH_RAW, TIN_RAW = [], [], []
-TB_RAW = []
+# 7 dãy histogram theo thứ tự TOAN, LI, HOA, VAN, ANH, TIN, TB (do ScoreHistograms giữ)
+HIST_COLS = SUBJECTS + ["diem_tb"]
+HIST_NAMES = ["TOAN", "LI", "HOA", "VAN", "ANH", "TIN", "TB"]
+GRADES = ["10", "11", "12"]   # khối, nhận theo tiền tố tên lớp
 
 # ================== HÀM TÍNH TOÁN ==================
 def classify(avg: float) -> str:
@@ -99,17 +102,1745 @@ def _bucket_index(v: float) -> int:
     if x > 10: x = 10.0
     return 9 if x >= 9.0 else int(x)
 
-def update_histograms_from_raw():
-    global TOAN, LI, HOA, VAN, ANH, TIN, TB
-    TOAN = [0]*10; LI = [0]*10; HOA = [0]*10
-    VAN  = [0]*10; ANH = [0]*10; TIN = [0]*10; TB = [0]*10
-    for s in TOAN_RAW: TOAN[_bucket_index(s)] += 1
-    for s in LI_RAW:   LI[_bucket_index(s)]   += 1
-    for s in HOA_RAW:  HOA[_bucket_index(s)]  += 1
-    for s in VAN_RAW:  VAN[_bucket_index(s)]  += 1
-    for s in ANH_RAW:  ANH[_bucket_index(s)]  += 1
-    for s in TIN_RAW:  TIN[_bucket_index(s)]  += 1
-    for s in TB_RAW:   TB[_bucket_index(s)]   += 1
+def _bucket_indices(values) -> np.ndarray:
+    # Bản vector hoá của _bucket_index cho cả mảng (fmax/fmin: NaN -> 0, ít mảng tạm)
+    x = np.fmax(np.asarray(values, dtype=np.float64), 0.0)
+    np.fmin(x, 9.0, out=x)
+    return x.astype(np.int64)
+
+def hist10_matrix(values) -> np.ndarray:
+    # values (k, n) -> (k, 10): clip + floor + một lần np.bincount cho cả k dãy
+    b = _bucket_indices(values)
+    k = b.shape[0]
+    b += 10 * np.arange(k)[:, None]
+    return np.bincount(b.ravel(), minlength=10 * k).reshape(k, 10)
+
+def hist10_grouped(groups, values, ngroups: int) -> np.ndarray:
+    # groups[i] = nhóm của dòng i (-1 = bỏ qua) -> (ngroups, 10)
+    g = np.asarray(groups, dtype=np.int64); b = _bucket_indices(values)
+    keep = g >= 0
+    return np.bincount(g[keep] * 10 + b[keep], minlength=10 * ngroups).reshape(ngroups, 10)
+
+# ================== KHO DỮ LIỆU DẠNG CỘT ==================
+# Thay cho list[dict]: điểm/ĐTB/ID nằm trong mảng NumPy có kiểu, chuỗi (họ tên, lớp,
+# xếp loại) mã hoá từ điển – mỗi giá trị phân biệt chỉ lưu một lần.
+# Mỗi dòng có "rid" (chỉ số slot) cố định suốt đời dòng; dòng bị xoá chỉ đánh dấu chết.
+NUM_COLS = ["id"] + SUBJECTS + ["diem_tb"]
+STR_COLS = ["ho_ten", "lop", "xep_loai"]
+STUDENT_COLS = ["id", "ho_ten", "lop"] + SUBJECTS + ["diem_tb", "xep_loai"]
+
+def fold_vn(s: str) -> str:
+    # Khoá tìm kiếm: chữ thường, bỏ dấu tiếng Việt (đ -> d), gộp khoảng trắng
+    s = unicodedata.normalize("NFD", (s or "").lower().replace("đ", "d"))
+    return " ".join("".join(ch for ch in s if not unicodedata.combining(ch)).split())
+
+@contextlib.contextmanager
+def _gc_paused():
+    # nạp hàng loạt chỉ tạo đối tượng mới, không tạo vòng tham chiếu -> tạm tắt GC để khỏi quét cả heap
+    on = gc.isenabled(); gc.disable()
+    try: yield
+    finally:
+        if on: gc.enable()
+
+class _InternColumn:
+    # Cột chuỗi: codes[rid] -> chỉ số trong values (chuỗi đã sys.intern).
+    # keys[code] = khoá tìm kiếm đã fold, tính một lần khi giá trị mới xuất hiện (lúc nạp/sửa).
+    def __init__(self, cap: int, fold=fold_vn):
+        self.codes = np.zeros(cap, dtype=np.int32)
+        self.values: list[str] = []
+        self.keys: list[str] = []
+        self.fold = fold
+        self._lookup: dict[str, int] = {}
+
+    def code_of(self, s: str) -> int:
+        c = self._lookup.get(s)
+        if c is None:
+            s = sys.intern(s)
+            c = len(self.values)
+            self.values.append(s); self.keys.append(sys.intern(self.fold(s))); self._lookup[s] = c
+        return c
+
+    def get(self, rid: int) -> str: return self.values[self.codes[rid]]
+    def key(self, rid: int) -> str: return self.keys[self.codes[rid]]
+    def set(self, rid: int, s: str): self.codes[rid] = self.code_of(s)
+
+    def grow(self, cap: int):
+        codes = np.zeros(cap, dtype=np.int32); codes[:len(self.codes)] = self.codes
+        self.codes = codes
+
+class _PostingIndex:
+    # Chỉ mục ngược: khoá tìm kiếm (cột keys của _InternColumn) -> tập rid.
+    # Nạp hàng loạt vào chỉ mục rỗng (add_many) chỉ sắp rid theo mã một lần (argsort); tập rid của một
+    # khoá được tạo khi khoá đó được tra/sửa lần đầu (_ids). Luồng tìm nền cũng tạo tập -> giữ _lock.
+    def __init__(self, normalize=fold_vn):
+        self.normalize = normalize   # chỉ dùng cho chuỗi truy vấn
+        self._post: dict[str, set[int]] = {}
+        self._pending: dict[str, list[int]] = {}   # khoá chưa tạo tập -> các mã của nó trong lần nạp hàng loạt
+        self._bulk = None                           # (rid sắp theo mã, đầu đoạn theo mã, cuối đoạn theo mã)
+        self._sorted: list[str] | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def postings(self) -> dict[str, set[int]]:
+        # toàn bộ khoá -> tập rid (tạo nốt các tập còn chờ)
+        for k in list(self._pending): self._ids(k)
+        return self._post
+
+    def keys(self) -> list[str]:
+        return list(self._post) + list(self._pending)
+
+    def _ids(self, k: str) -> set[int] | None:
+        ids = self._post.get(k)
+        if ids is None and k in self._pending:
+            with self._lock:
+                codes = self._pending.pop(k, None)
+                if codes is None: return self._post.get(k)
+                order, lo, hi = self._bulk; ids = set()
+                for c in codes: ids.update(order[lo[c]:hi[c]].tolist())
+                self._post[k] = ids
+        return ids
+
+    def add(self, k: str, rid: int):
+        with self._lock:
+            ids = self._ids(k)
+            if ids is None:
+                ids = self._post[k] = set(); self._sorted = None
+            ids.add(rid)
+
+    def add_many(self, keys: list[str], codes: np.ndarray) -> list[str]:
+        # nạp hàng loạt: codes[rid] = mã của khoá keys[mã]. Trả các khoá mới xuất hiện.
+        if not len(codes): return []
+        with self._lock:
+            if not self._post and not self._pending:
+                counts = np.bincount(codes, minlength=len(keys))
+                hi = np.cumsum(counts); lo = hi - counts
+                self._bulk = (np.argsort(codes, kind="stable"), lo, hi)
+                for c in np.flatnonzero(counts).tolist(): self._pending.setdefault(keys[c], []).append(c)
+                self._sorted = None
+                return list(self._pending)
+            order = np.argsort(codes, kind="stable"); sc = codes[order]
+            starts = np.flatnonzero(np.r_[True, sc[1:] != sc[:-1]]); ends = np.r_[starts[1:], len(sc)]
+            rids = order.tolist(); new = []
+            for code, s, e in zip(sc[starts].tolist(), starts.tolist(), ends.tolist()):
+                k = keys[code]; ids = self._ids(k)
+                if ids is None: self._post[k] = set(rids[s:e]); new.append(k)
+                else: ids.update(rids[s:e])
+            if new: self._sorted = None
+            return new
+
+    def discard(self, k: str, rid: int):
+        with self._lock:
+            ids = self._ids(k)
+            if ids is None: return
+            ids.discard(rid)
+            if not ids:
+                del self._post[k]; self._sorted = None
+
+    def clear(self):
+        with self._lock:
+            self._post = {}; self._pending = {}; self._bulk = None; self._sorted = None
+
+    def sorted_keys(self) -> list[str]:
+        if self._sorted is None: self._sorted = sorted(self.keys())
+        return self._sorted
+
+    # Truy vấn nhận chuỗi đã chuẩn hoá (q = index.normalize(...))
+    def exact(self, q: str) -> set[int]:
+        ids = self._ids(q)
+        return set() if ids is None else ids
+
+    def prefix_keys(self, q: str) -> list[str]:
+        keys = self.sorted_keys()
+        i = j = bisect.bisect_left(keys, q)
+        while j < len(keys) and keys[j].startswith(q): j += 1
+        return keys[i:j]
+
+    def size(self, k: str) -> int:
+        # số rid của khoá, không tạo tập nếu khoá còn chờ
+        codes = self._pending.get(k)
+        if codes is not None:
+            _, lo, hi = self._bulk
+            return int(sum(hi[c] - lo[c] for c in codes))
+        return len(self._post.get(k, ()))
+
+    def prefix(self, q: str) -> set[int]:
+        out: set[int] = set()
+        for k in self.prefix_keys(q): out |= self._ids(k) or set()
+        return out
+
+    def contains(self, q: str) -> set[int]:
+        out: set[int] = set()
+        for k in self.keys():
+            if q in k: out |= self._ids(k) or set()
+        return out
+
+def _trigrams(s: str) -> set[str]:
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+class _TrigramIndex(_PostingIndex):
+    # Thêm tầng trigram -> tập khoá phân biệt; tìm chuỗi con chỉ kiểm trên ứng viên.
+    # Tầng trigram dựng ở lần tìm chuỗi con đầu tiên (nạp file không phải trả), sau đó cập nhật theo sửa đổi.
+    def __init__(self, normalize=fold_vn):
+        super().__init__(normalize)
+        self.grams: dict[str, set[str]] | None = None
+
+    def add(self, k: str, rid: int):
+        with self._lock:
+            grams = self.grams
+            if grams is not None and self._ids(k) is None:
+                for g in _trigrams(k):
+                    ks = grams.get(g)
+                    if ks is None: grams[g] = {k}
+                    else: ks.add(k)
+            super().add(k, rid)
+
+    def add_many(self, keys: list[str], codes: np.ndarray) -> list[str]:
+        with self._lock:
+            new = super().add_many(keys, codes)
+            if self.grams is not None: self._add_grams(new, self.grams)
+            return new
+
+    def _ensure_grams(self) -> dict[str, set[str]]:
+        if self.grams is None:
+            with self._lock:
+                if self.grams is None:
+                    grams: dict[str, set[str]] = {}
+                    self._add_grams(self.keys(), grams); self.grams = grams
+        return self.grams
+
+    def _add_grams(self, keys: list[str], grams: dict[str, set[str]]):
+        for i in range(0, len(keys), 16384): self._add_gram_slice(keys[i:i + 16384], grams)   # bộ nhớ tạm nhỏ
+
+    @staticmethod
+    def _add_gram_slice(keys: list[str], grams: dict[str, set[str]]):
+        # trigram của nhiều khoá một lượt: ma trận mã ký tự -> mã trigram -> gom khoá theo trigram
+        width = max(map(len, keys), default=0)
+        if width < 3: return
+        cp = np.array(keys, dtype=f"<U{width}").view(np.uint32).reshape(len(keys), width)
+        seen = np.zeros(int(cp.max()) + 1, dtype=bool); seen[cp] = True     # bảng mã ký tự -> số liên tiếp
+        chars = np.flatnonzero(seen); k = len(chars)
+        inv = (np.cumsum(seen) - 1)[cp]
+        gid = (inv[:, :-2] * k + inv[:, 1:-1]) * k + inv[:, 2:]
+        lens = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+        valid = np.arange(width - 2)[None, :] < (lens - 2)[:, None]
+        pair = np.sort(gid[valid] * len(keys) + np.nonzero(valid)[0])
+        pair = pair[np.r_[True, pair[1:] != pair[:-1]]]
+        g, kid = np.divmod(pair, len(keys))
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]]); ends = np.r_[starts[1:], len(g)]
+        karr = np.array(keys, dtype=object)[kid]; chars = [chr(c) for c in chars.tolist()]
+        for code, s, e in zip(g[starts].tolist(), starts.tolist(), ends.tolist()):
+            a, rest = divmod(code, k * k); b, c = divmod(rest, k)
+            gram = chars[a] + chars[b] + chars[c]; ks = grams.get(gram)
+            if ks is None: grams[gram] = set(karr[s:e].tolist())
+            else: ks.update(karr[s:e].tolist())
+
+    def discard(self, k: str, rid: int):
+        with self._lock:
+            super().discard(k, rid)
+            grams = self.grams
+            if grams is not None and self._ids(k) is None:
+                for g in _trigrams(k):
+                    ks = grams.get(g)
+                    if ks is None: continue
+                    ks.discard(k)
+                    if not ks: del grams[g]
+
+    def clear(self):
+        with self._lock:
+            super().clear(); self.grams = None
+
+    def contains(self, q: str) -> set[int]:
+        if len(q) < 3:
+            return super().contains(q)
+        grams = self._ensure_grams(); cands = []
+        for g in _trigrams(q):
+            ks = grams.get(g)
+            if not ks: return set()
+            cands.append(ks)
+        out: set[int] = set()
+        for k in _intersect(cands):
+            if q in k: out |= self._ids(k) or set()
+        return out
+
+def _intersect(sets) -> set:
+    # Giao các tập rid, bắt đầu từ tập nhỏ nhất
+    sets = sorted(sets, key=len)
+    if not sets: return set()
+    out = set(sets[0])
+    for other in sets[1:]:
+        if not out: break
+        out &= other
+    return out
+
+class StudentRow(Mapping):
+    # "View" một dòng trong StudentStore, dùng như dict cũ: s["ho_ten"], s.get(...), s.update(...)
+    __slots__ = ("_store", "rid")
+
+    def __init__(self, store: "StudentStore", rid: int):
+        self._store = store; self.rid = rid
+
+    def __getitem__(self, key): return self._store.get_value(self.rid, key)
+    def __iter__(self): return iter(STUDENT_COLS)
+    def __len__(self): return len(STUDENT_COLS)
+    def __setitem__(self, key, value): self._store.update_row(self.rid, {key: value})
+
+    def update(self, other=(), **kw):
+        self._store.update_row(self.rid, {**dict(other), **kw})
+
+    def __eq__(self, other):
+        return isinstance(other, StudentRow) and other._store is self._store and other.rid == self.rid
+    def __hash__(self): return hash((id(self._store), self.rid))
+    def __repr__(self): return f"StudentRow({dict(self)!r})"
+
+class StudentView(Sequence):
+    # Danh sách dòng chỉ đọc trên một mảng rid (không chép dữ liệu); cắt lát vẫn là view
+    __slots__ = ("_store", "rids")
+
+    def __init__(self, store: "StudentStore", rids):
+        self._store = store; self.rids = np.asarray(rids, dtype=np.int64)
+
+    def __len__(self): return len(self.rids)
+    def __getitem__(self, i):
+        if isinstance(i, slice): return StudentView(self._store, self.rids[i])
+        return StudentRow(self._store, int(self.rids[i]))
+    def __iter__(self):
+        store = self._store
+        return (StudentRow(store, r) for r in self.rids.tolist())
+
+class StudentStore:
+    # Người nghe thay đổi (KPI, histogram, ...) cài các hàm:
+    #   on_insert(rid), on_update(rid, old: dict), on_delete(rid, old: dict), on_reset()
+    # old chỉ chứa các cột trước khi đổi (on_delete: cả dòng).
+    def __init__(self, capacity: int = 1024):
+        self._listeners: list = []
+        self.version = 0       # tăng sau mỗi thay đổi (kể cả clear) -> kết quả tính nền biết mình đã cũ
+        self.lock = threading.RLock()   # luồng nền giữ khi đọc chỉ mục; mọi thay đổi giữ khi ghi
+        self._reset(capacity)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _reset(self, cap: int):
+        self._cap = max(16, cap)
+        self._n = 0            # số slot đã cấp (kể cả dòng đã xoá)
+        self._size = 0         # số dòng còn sống
+        self._alive = np.zeros(self._cap, dtype=bool)
+        self._num = {c: np.zeros(self._cap, dtype=np.int64 if c == "id" else np.float64) for c in NUM_COLS}
+        self._str = {c: _InternColumn(self._cap) for c in STR_COLS}
+        self._id_index: dict[int, int] = {}    # id -> rid (ID trùng: giữ dòng vào trước)
+        self._id_dups = 0                      # số dòng sống có ID trùng với dòng đã đánh chỉ mục
+        # chỉ mục phụ: họ tên (kèm trigram) / lớp / xếp loại (khoá chuẩn hoá -> rid)
+        self.key_index = {"ho_ten": _TrigramIndex(), "lop": _PostingIndex(), "xep_loai": _PostingIndex()}
+
+    def _grow(self, need: int):
+        if need <= self._cap: return
+        cap = max(need, self._cap * 2)
+        alive = np.zeros(cap, dtype=bool); alive[:self._n] = self._alive[:self._n]; self._alive = alive
+        for c, a in self._num.items():
+            b = np.zeros(cap, dtype=a.dtype); b[:self._n] = a[:self._n]; self._num[c] = b
+        for col in self._str.values(): col.grow(cap)
+        self._cap = cap
+
+    # ----- truy cập -----
+    def __len__(self): return self._size
+    def __bool__(self): return self._size > 0
+    def __iter__(self):
+        for rid in self.row_ids(): yield StudentRow(self, int(rid))
+
+    def __getitem__(self, i):
+        ids = self.row_ids()[i]
+        if isinstance(i, slice): return self.rows(ids)
+        return StudentRow(self, int(ids))
+
+    def row_ids(self) -> np.ndarray:
+        # rid các dòng còn sống theo thứ tự thêm vào (thứ tự hiển thị do SortEngine giữ)
+        return np.flatnonzero(self._alive[:self._n])
+
+    def rows(self, rids) -> list[StudentRow]:
+        return [StudentRow(self, int(r)) for r in rids]
+
+    def view(self, rids=None) -> "StudentView":
+        # tập/dãy rid -> StudentView (rid tăng dần nếu là tập); None = mọi dòng còn sống
+        if rids is None: return StudentView(self, self.row_ids())
+        if isinstance(rids, (set, frozenset)): rids = np.sort(np.fromiter(rids, dtype=np.int64, count=len(rids)))
+        return StudentView(self, rids)
+
+    def is_alive(self, rid: int) -> bool: return 0 <= rid < self._n and bool(self._alive[rid])
+
+    def alive_mask(self) -> np.ndarray:
+        # mảng bool theo rid (view, chỉ đọc)
+        return self._alive[:self._n]
+
+    def get_value(self, rid: int, col: str):
+        a = self._num.get(col)
+        if a is not None:
+            return int(a[rid]) if col == "id" else float(a[rid])
+        s = self._str.get(col)
+        if s is not None:
+            return s.get(rid)
+        raise KeyError(col)
+
+    def rid_of(self, sid: int) -> int | None:
+        return self._id_index.get(sid)
+
+    def by_id(self, sid: int) -> StudentRow | None:
+        rid = self._id_index.get(sid)
+        return None if rid is None else StudentRow(self, rid)
+
+    def codes(self, col: str, rids=None) -> np.ndarray:
+        c = self._str[col].codes[:self._n]
+        return c if rids is None else c[rids]
+
+    def pool(self, col: str) -> list[str]:
+        # các giá trị phân biệt của cột chuỗi, theo mã
+        return self._str[col].values
+
+    def pool_keys(self, col: str) -> list[str]:
+        # khoá đã fold của pool, cùng thứ tự mã
+        return self._str[col].keys
+
+    def search_key(self, rid: int, col: str) -> str:
+        return self._str[col].key(rid)
+
+    def record(self, rid: int) -> dict:
+        return {c: self.get_value(rid, c) for c in STUDENT_COLS}
+
+    def column(self, col: str, rids=None):
+        # Numeric -> mảng NumPy (view nếu rids=None); chuỗi -> list
+        if col in self._num:
+            a = self._num[col][:self._n]
+            return a if rids is None else a[rids]
+        s = self._str[col]
+        codes = s.codes[:self._n] if rids is None else s.codes[rids]
+        vals = s.values
+        return [vals[c] for c in codes]
+
+    # ----- thay đổi -----
+    def _write(self, rid: int, rec):
+        for c, v in rec.items():
+            if c in self._num: self._num[c][rid] = v
+            elif c in self._str: self._str[c].set(rid, "" if v is None else str(v))
+
+    def append(self, rec) -> StudentRow:
+        with self.lock:
+            rid = self._n
+            self._grow(rid + 1)
+            self._n += 1
+            self._write(rid, {c: rec.get(c, "" if c in self._str else 0) for c in STUDENT_COLS})
+            self._alive[rid] = True; self._size += 1
+            self._index_id(rid)
+            for c, idx in self.key_index.items(): idx.add(self._str[c].key(rid), rid)
+            self.version += 1
+        for l in self._listeners: l.on_insert(rid)
+        return StudentRow(self, rid)
+
+    def update_row(self, rid: int, changes):
+        if not self.is_alive(rid): raise KeyError(rid)
+        new_id = changes.get("id")
+        reid = new_id is not None and int(new_id) != self._num["id"][rid]
+        rekey = [c for c in self.key_index if c in changes]
+        old = {c: self.get_value(rid, c) for c in changes if c in self._num or c in self._str}
+        with self.lock:
+            if reid: self._unindex_id(rid)
+            for c in rekey: self.key_index[c].discard(self._str[c].key(rid), rid)
+            self._write(rid, changes)
+            if reid: self._index_id(rid)
+            for c in rekey: self.key_index[c].add(self._str[c].key(rid), rid)
+            self.version += 1
+        for l in self._listeners: l.on_update(rid, old)
+
+    def delete(self, rid: int):
+        if not self.is_alive(rid): return
+        with self.lock:
+            self._alive[rid] = False; self._size -= 1
+            self._unindex_id(rid)
+            for c, idx in self.key_index.items(): idx.discard(self._str[c].key(rid), rid)
+            self.version += 1
+        if self._listeners:
+            old = self.record(rid)
+            for l in self._listeners: l.on_delete(rid, old)
+
+    def _index_id(self, rid: int):
+        sid = int(self._num["id"][rid])
+        if self._id_index.setdefault(sid, rid) != rid: self._id_dups += 1
+
+    def _unindex_id(self, rid: int):
+        sid = int(self._num["id"][rid])
+        if self._id_index.get(sid) != rid:
+            self._id_dups -= 1; return
+        del self._id_index[sid]
+        if self._id_dups:
+            # còn dòng trùng ID -> chuyển chỉ mục sang dòng đó (chỉ xảy ra khi dữ liệu có ID trùng)
+            same = np.flatnonzero((self._num["id"][:self._n] == sid) & self._alive[:self._n])
+            same = same[same != rid]
+            if len(same):
+                self._id_index[sid] = int(same[0]); self._id_dups -= 1
+
+    def remove(self, row: StudentRow):
+        self.delete(row.rid)
+
+    def clear(self):
+        with self.lock:
+            self._reset(1024)
+            self.version += 1
+        for l in self._listeners: l.on_reset()
+
+    def load_columns(self, cols: dict):
+        # thay toàn bộ dữ liệu bằng cột dựng sẵn (build_columns): số -> mảng, chuỗi -> (mã, pool);
+        # chỉ mục dựng hàng loạt, người nghe nhận một on_reset
+        with self.lock, _gc_paused():
+            self._load_columns(cols)
+            self.version += 1
+        for l in self._listeners: l.on_reset()
+
+    def _load_columns(self, cols: dict):
+        n = len(cols["id"])
+        self._reset(n)
+        self._n = self._size = n; self._alive[:n] = True
+        for c in NUM_COLS: self._num[c][:n] = cols[c]
+        for c in STR_COLS:
+            codes, values = cols[c]; s = self._str[c]
+            remap = np.fromiter((s.code_of(v) for v in values), dtype=np.int32, count=len(values))
+            if n: s.codes[:n] = remap[codes]
+        ids = self._num["id"][:n]
+        if n < 2 or bool(np.all(ids[1:] > ids[:-1])):                  # ID tăng dần (thường gặp): không cần sort
+            self._id_index = dict(zip(ids.tolist(), range(n)))
+        else:                                                          # ID trùng: dòng vào trước giữ chỉ mục
+            uniq, first = np.unique(ids, return_index=True)
+            self._id_index = dict(zip(uniq.tolist(), first.tolist()))
+            self._id_dups = n - len(uniq)
+        for c, idx in self.key_index.items(): idx.add_many(self._str[c].keys, self._str[c].codes[:n])
+
+def filter_rids(store: StudentStore, fields: dict[str, str], base=None) -> set[int] | None:
+    # fields: cột chuỗi -> truy vấn đã fold (khớp chuỗi con); None = không có điều kiện (cả kho).
+    # base: kết quả của truy vấn trước mà truy vấn này chỉ thu hẹp -> lọc lại trong base.
+    # Gọi được từ luồng nền: giữ store.lock nên không đọc chỉ mục đang sửa dở.
+    fields = {c: q for c, q in fields.items() if q}
+    if not fields: return None
+    with store.lock:
+        if base is not None:
+            return {r for r in base if store.is_alive(r)
+                    and all(q in store.search_key(r, c) for c, q in fields.items())}
+        return _intersect([store.key_index[c].contains(q) for c, q in fields.items()])
+
+def is_refinement(old: dict[str, str], new: dict[str, str]) -> bool:
+    # mỗi điều kiện cũ vẫn nằm trong điều kiện mới -> kết quả mới là tập con của kết quả cũ
+    return all(q in new.get(c, "") for c, q in old.items() if q)
+
+# ================== TÌM GẦN ĐÚNG (SymSpell theo từ) ==================
+def _osa_distance(a: str, b: str, max_d: int) -> int:
+    # Damerau-Levenshtein (đổi chỗ 2 ký tự kề = 1 bước); vượt max_d thì trả max_d + 1.
+    # Chỉ tính dải |i - j| <= max_d của bảng quy hoạch động (ngoài dải chắc chắn > max_d).
+    la, lb = len(a), len(b); big = max_d + 1
+    if abs(la - lb) > max_d: return big
+    prev2 = None; prev = [j if j <= max_d else big for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        cur = [big] * (lb + 1)
+        if i <= max_d: cur[0] = i
+        best = cur[0]; ai = a[i - 1]
+        for j in range(max(1, i - max_d), min(lb, i + max_d) + 1):
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ai != b[j - 1]))
+            if prev2 is not None and j > 1 and ai == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+            if v < best: best = v
+        if best > max_d: return big
+        prev2, prev = prev, cur
+    return min(prev[lb], big)
+
+def _deletes(word: str, d: int) -> set[str]:
+    out = {word}; frontier = {word}
+    for _ in range(d):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+def _word_tolerance(word: str) -> int:
+    return 0 if len(word) <= 1 else 1 if len(word) <= 4 else 2
+
+class FuzzyNameIndex:
+    # Từ điển xoá (SymSpell) trên các từ của họ tên đã fold: xoá tối đa 2 ký tự của mỗi từ -> từ gốc.
+    # Truy vấn: mỗi từ tra các biến thể xoá của nó, kiểm lại bằng khoảng cách OSA, rồi ghép theo tên
+    # (tên phải khớp mọi từ truy vấn, thứ tự từ tuỳ ý). Dựng dần theo pool khoá (pool chỉ thêm).
+    MAX_D = 2
+
+    def __init__(self, store: StudentStore, col: str = "ho_ten"):
+        self.store = store; self.col = col; self._pool = None
+
+    def _sync(self):
+        keys = self.store.pool_keys(self.col)
+        if keys is not self._pool:                      # kho bị nạp lại -> pool mới
+            self._pool = keys; self._done = 0
+            self.word_names: dict[str, set[str]] = {}   # từ -> các tên (khoá đã fold) chứa từ đó
+            self.deletes: dict[str, set[str]] = {}      # biến thể xoá -> các từ
+        for key in keys[self._done:]:
+            for w in key.split():
+                names = self.word_names.get(w)
+                if names is None:
+                    names = self.word_names[w] = set()
+                    for d in _deletes(w, self.MAX_D): self.deletes.setdefault(d, set()).add(w)
+                names.add(key)
+        self._done = len(keys)
+
+    def _similar_words(self, q: str) -> dict[str, int]:
+        # từ trong từ điển cách q không quá ngưỡng -> khoảng cách
+        max_d = _word_tolerance(q); out = {}
+        for d in _deletes(q, max_d):
+            for w in self.deletes.get(d, ()):
+                if w not in out:
+                    dist = _osa_distance(q, w, max_d)
+                    if dist <= max_d: out[w] = dist
+        return out
+
+    def search(self, query: str, limit: int = 200) -> list[tuple[str, int]]:
+        # [(tên đã fold, điểm)] tăng dần theo điểm = tổng khoảng cách từng từ (rồi chênh số từ)
+        self._sync()
+        qwords = fold_vn(query).split()
+        if not qwords: return []
+        per_word = []
+        for q in qwords:
+            best: dict[str, int] = {}
+            for w, dist in self._similar_words(q).items():
+                for name in self.word_names[w]:
+                    if dist < best.get(name, self.MAX_D + 1): best[name] = dist
+            if not best: return []
+            per_word.append(best)
+        per_word.sort(key=len)                          # bắt đầu từ từ hiếm nhất
+        score = dict(per_word[0])
+        for best in per_word[1:]:
+            score = {k: v + best[k] for k, v in score.items() if k in best}
+            if not score: return []
+        n = len(qwords)
+        return sorted(score.items(), key=lambda kv: (kv[1], abs(len(kv[0].split()) - n), kv[0]))[:limit]
+
+    def search_rids(self, query: str, limit: int = 200) -> list[int]:
+        # rid còn sống theo thứ tự xếp hạng của tên
+        idx = self.store.key_index[self.col]; out = []
+        for key, _ in self.search(query, limit):
+            out.extend(sorted(idx.exact(key)))
+        return out
+
+# ================== PHÁT HIỆN TRÙNG (chia khối + băm bản ghi) ==================
+# Không so từng cặp trên cả kho. Mỗi dòng có mã băm bản ghi (tên + lớp đã fold + 6 điểm môn) và
+# các khoá khối; chỉ so cặp trong cùng khối:
+#   - (lớp, tên): sắp theo băm -> dòng kề nhau cùng băm là trùng hoàn toàn, khác băm là trùng tên;
+#   - (lớp, tiền tố tên theo thứ tự tên-đệm-họ) và (lớp, băm điểm): họ tên khác nhau nhưng cách nhau
+#     vài ký tự (gõ sai) -> tên gần giống.
+# Khoá/băm tính trên giá trị phân biệt của pool rồi tra mảng, nên gần tuyến tính theo số dòng.
+DUP_KINDS = {"exact": "Trùng hoàn toàn", "name": "Trùng tên, khác điểm", "similar": "Tên gần giống"}
+DUP_PREFIX = 7          # số ký tự đầu của tên đã fold (tên trước họ) làm khoá khối
+DUP_MAX_BLOCK = 64      # khối lớn hơn thì bỏ qua bước so tên gần giống (vẫn gom trùng theo băm)
+
+def _dense_ids(keys) -> tuple[np.ndarray, list[str]]:
+    # khoá -> mã liên tiếp (pool có thể chứa nhiều cách viết cùng một khoá đã fold)
+    ids: dict[str, int] = {}
+    codes = np.fromiter((ids.setdefault(k, len(ids)) for k in keys), dtype=np.int64, count=len(keys))
+    return codes, list(ids)
+
+def _hash_mix(parts) -> np.ndarray:
+    # FNV-1a trên từng cột số nguyên (uint64, tràn vòng) -> một mã băm mỗi dòng
+    h = np.full(len(parts[0]), 14695981039346656037, dtype=np.uint64)
+    for p in parts:
+        h ^= np.asarray(p).astype(np.uint64); h *= np.uint64(1099511628211)
+    return h
+
+def _given_first(key: str) -> str:
+    w = key.split()
+    return " ".join(w[-1:] + w[:-1])
+
+def _name_tolerance(a: str, b: str) -> int:
+    return 1 if min(len(a), len(b)) < 12 else 2
+
+DUP_PROGRESS_EVERY = 2048   # số khối so tên giữa hai lần báo tiến độ
+
+class LoadCancelled(Exception):
+    # progress() ném ra để dừng việc nền giữa chừng: đọc file, kiểm tra trùng (người dùng bấm Hủy)
+    pass
+
+def find_duplicates(store: StudentStore, prefix: int = DUP_PREFIX, max_block: int = DUP_MAX_BLOCK,
+                    progress=None) -> list[tuple[str, np.ndarray]]:
+    # [(loại, rid của nhóm theo ID tăng dần)]; loại là mối liên hệ mạnh nhất trong nhóm.
+    # progress(đã xong, tổng) báo theo khối so tên (phần tốn thời gian); ném LoadCancelled để dừng.
+    rids = np.flatnonzero(store.alive_mask())
+    if len(rids) < 2: return []
+    name_pool, names = _dense_ids(store.pool_keys("ho_ten"))
+    lop_pool, lops = _dense_ids(store.pool_keys("lop"))
+    pre_pool, _ = _dense_ids([_given_first(k)[:prefix] for k in store.pool_keys("ho_ten")])
+    name = name_pool[store.codes("ho_ten", rids)]
+    lop = lop_pool[store.codes("lop", rids)]
+    scores = [store.column(c, rids) for c in SUBJECTS]
+    h_sc = _hash_mix([lop] + [np.rint(s * 100).astype(np.int64) for s in scores])
+    h = _hash_mix([h_sc, name])
+    ea, eb, ek = [], [], []      # cạnh (vị trí trong rids) + hạng loại: 0 hoàn toàn, 1 tên, 2 gần giống
+
+    # (lớp, tên): dòng kề nhau sau khi sắp theo (lớp, tên, băm)
+    order = np.lexsort((h, name, lop))
+    a, b = order[:-1], order[1:]
+    same = (lop[a] == lop[b]) & (name[a] == name[b])
+    a, b = a[same], b[same]
+    eq = h[a] == h[b]
+    for s in scores: eq &= s[a] == s[b]              # xác nhận lại, phòng va chạm băm
+    ea.append(a); eb.append(b); ek.append(np.where(eq, 0, 1))
+
+    # tên gần giống: chỉ so các tên khác nhau trong cùng khối nhỏ
+    dist: dict[tuple[int, int], bool] = {}
+    pa, pb = [], []; blocks = []
+    for key in (lop * len(pre_pool) + pre_pool[store.codes("ho_ten", rids)], h_sc):
+        order = np.argsort(key, kind="stable"); k = key[order]
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]]); ends = np.r_[starts[1:], len(k)]
+        nm = name[order]
+        multi = (ends - starts >= 2) & (ends - starts <= max_block) & \
+                (np.minimum.reduceat(nm, starts) != np.maximum.reduceat(nm, starts))
+        blocks.append((order, starts[multi].tolist(), ends[multi].tolist()))
+    total = sum(len(ss) for _, ss, _ in blocks) + 1; done = 0
+    for order, ss, es in blocks:
+        for s, e in zip(ss, es):
+            done += 1
+            if progress is not None and not done % DUP_PROGRESS_EVERY: progress(done, total)
+            first: dict[int, int] = {}
+            for pos in order[s:e].tolist(): first.setdefault(int(name[pos]), pos)
+            ids = sorted(first)
+            for i, x in enumerate(ids):
+                for y in ids[i + 1:]:
+                    ok = dist.get((x, y))
+                    if ok is None:
+                        tol = _name_tolerance(names[x], names[y])
+                        ok = dist[(x, y)] = _osa_distance(names[x], names[y], tol) <= tol
+                    if ok: pa.append(first[x]); pb.append(first[y])
+    if progress is not None: progress(total - 1, total)
+    ea.append(np.array(pa, dtype=np.int64)); eb.append(np.array(pb, dtype=np.int64))
+    ek.append(np.full(len(pa), 2))
+
+    # gộp cạnh thành nhóm (union-find trên số ít dòng có cạnh)
+    parent: dict[int, int] = {}
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]; x = parent[x]
+        return x
+    a, b, kind = np.concatenate(ea).tolist(), np.concatenate(eb).tolist(), np.concatenate(ek).tolist()
+    for x, y in zip(a, b):
+        rx, ry = find(x), find(y)
+        if rx != ry: parent[max(rx, ry)] = min(rx, ry)
+    rank: dict[int, int] = {}
+    for x, k in zip(a, kind):
+        r = find(x); rank[r] = min(rank.get(r, 2), k)
+    members: dict[int, list[int]] = {}
+    for x in parent: members.setdefault(find(x), []).append(x)
+
+    ids_col = store.column("id"); kinds = list(DUP_KINDS); out = []
+    for r, pos in members.items():
+        g = rids[pos]; g = g[np.argsort(ids_col[g], kind="stable")]
+        out.append((rank[r], lops[lop[r]], names[name[r]], kinds[rank[r]], g))
+    out.sort(key=lambda t: t[:3])
+    return [(k, g) for *_, k, g in out]
+
+def exact_copies(store: StudentStore, rids) -> dict[int, int]:
+    # rid -> rid dòng đầu (ID nhỏ nhất) giống hệt nó trừ ID, trong một nhóm trùng
+    first: dict[tuple, int] = {}; out = {}
+    for rid in rids:
+        if not store.is_alive(rid): continue
+        key = (store.search_key(rid, "ho_ten"), store.search_key(rid, "lop"),
+               *(store.get_value(rid, c) for c in SUBJECTS))
+        keep = first.setdefault(key, rid)
+        if keep != rid: out[rid] = keep
+    return out
+
+def write_duplicate_report(path: str, store: StudentStore, groups) -> int:
+    # báo cáo gộp dạng CSV (cùng định dạng file lưu): mỗi dòng một học sinh, kèm nhóm, loại trùng
+    # và ID của dòng mà nó là bản sao y hệt (nếu có) -> dòng đó nên giữ, dòng này có thể xoá
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        w.writerow(["Nhóm", "Loại", "Trùng hệt ID", "ID", "Họ Tên", "Lớp", "Toán", "Lý", "Hóa", "Văn", "Anh", "Tin", "Điểm TB"])
+        for gi, (kind, rids) in enumerate(groups, 1):
+            rids = rids.tolist(); copy = exact_copies(store, rids)
+            for rid in rids:
+                r = store.record(rid); keep = copy.get(rid)
+                w.writerow([gi, DUP_KINDS[kind], "" if keep is None else store.get_value(keep, "id"),
+                            r["id"], r["ho_ten"], r["lop"], *(r[c] for c in SUBJECTS), f"{r['diem_tb']:.2f}"])
+    return len(groups)
+
+# ================== BỘ LỌC BIỂU THỨC ==================
+# Ví dụ: toan >= 8 and van < 5 and lop ^= 11
+#        (xl in (gioi, kha) or tb > 9) and not ten ~ "nguyễn"
+#        tb between 6.5 and 7          top 50 toan          top 10 tb where lop ^= 12
+# Số: < <= > >= = != in between ; chuỗi (so sánh không dấu): = != ^= (bắt đầu bằng) ~ (chứa) in
+# Ghép: and/và, or/hoặc, not/không, ngoặc. Biên dịch thành hàm pred(store, rids=None) -> mặt nạ bool.
+class FilterSyntaxError(ValueError):
+    pass
+
+_FILTER_FIELDS = {
+    **{c: c for c in SUBJECTS}, "diem_tb": "diem_tb", "tb": "diem_tb", "dtb": "diem_tb", "id": "id",
+    "lop": "lop", "ten": "ho_ten", "ho_ten": "ho_ten", "hoten": "ho_ten",
+    "xep_loai": "xep_loai", "xeploai": "xep_loai", "xl": "xep_loai", "loai": "xep_loai",
+}
+_FILTER_KEYWORDS = {"and": "and", "va": "and", "&&": "and", "or": "or", "hoac": "or", "||": "or",
+                    "not": "not", "khong": "not", "!": "not", "in": "in", "between": "between"}
+_FILTER_NUM_OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+                   "=": np.equal, "==": np.equal, "!=": np.not_equal}
+_FILTER_STR_OPS = {"=": lambda k, v: k == v, "==": lambda k, v: k == v, "!=": lambda k, v: k != v,
+                   "^=": lambda k, v: k.startswith(v), "~": lambda k, v: v in k}
+_FILTER_TOKEN = re.compile(r"""\s*(?:(?P<num>-?\d+(?:[.,]\d+)?)(?![^\s<>=~!(),&|])|(?P<str>"[^"]*"|'[^']*')"""
+                           r"""|(?P<op><=|>=|==|!=|\^=|&&|\|\||[<>=~!(),])|(?P<word>[^\s<>=~!(),"'^&|]+))""")
+
+def _filter_tokens(text: str) -> list[tuple[str, Any]]:
+    # số nhận cả dấu phẩy thập phân (tb >= 6,5); riêng trong danh sách in (...) dấu phẩy là dấu ngăn
+    out = []; pos = 0; text = text.strip(); in_list = False
+    while pos < len(text):
+        m = _FILTER_TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            pos += len(text[pos:]) - len(text[pos:].lstrip())
+            raise FilterSyntaxError(f"Không hiểu ký tự ở vị trí {pos + 1}: '{text[pos:pos + 10]}'")
+        pos = m.end(); kind = m.lastgroup; tok = m.group(kind)
+        if kind == "num":
+            if in_list and "," in tok:
+                a, b = tok.split(","); out += [("num", float(a)), ("op", ","), ("num", float(b))]
+            else: out.append(("num", float(tok.replace(",", "."))))
+        elif kind == "str": out.append(("str", tok[1:-1]))
+        elif kind == "op":
+            if tok == "(": in_list = bool(out) and out[-1] == ("kw", "in")
+            elif tok == ")": in_list = False
+            out.append(("kw", _FILTER_KEYWORDS[tok]) if tok in _FILTER_KEYWORDS else ("op", tok))
+        else:
+            w = fold_vn(tok)
+            out.append(("kw", _FILTER_KEYWORDS[w]) if w in _FILTER_KEYWORDS else ("word", tok))
+    return out
+
+class _FilterParser:
+    # Đệ quy xuống: or -> and -> not -> so sánh | (biểu thức)
+    def __init__(self, text: str):
+        self.toks = _filter_tokens(text); self.i = 0
+
+    def peek(self): return self.toks[self.i] if self.i < len(self.toks) else (None, None)
+    def take(self): t = self.peek(); self.i += 1; return t
+
+    def expect(self, kind, val=None):
+        t = self.take()
+        if t[0] is None: raise FilterSyntaxError(f"Biểu thức kết thúc đột ngột: còn thiếu '{val or kind}'")
+        if t[0] != kind or (val is not None and t[1] != val):
+            raise FilterSyntaxError(f"Cần '{val or kind}' nhưng gặp '{t[1]}'")
+        return t
+
+    def parse(self):
+        if not self.toks: raise FilterSyntaxError("Biểu thức rỗng")
+        node = self.or_()
+        if self.i < len(self.toks): raise FilterSyntaxError(f"Thừa '{self.peek()[1]}' ở cuối biểu thức")
+        return node
+
+    def or_(self):
+        node = self.and_()
+        while self.peek() == ("kw", "or"): self.take(); node = ("or", node, self.and_())
+        return node
+
+    def and_(self):
+        node = self.not_()
+        while self.peek() == ("kw", "and"): self.take(); node = ("and", node, self.not_())
+        return node
+
+    def not_(self):
+        if self.peek() == ("kw", "not"): self.take(); return ("not", self.not_())
+        if self.peek() == ("op", "("):
+            self.take(); node = self.or_(); self.expect("op", ")"); return node
+        return self.cmp()
+
+    def cmp(self):
+        kind, w = self.take()
+        if kind is None: raise FilterSyntaxError("Biểu thức kết thúc đột ngột: còn thiếu điều kiện")
+        field = _FILTER_FIELDS.get(fold_vn(w)) if kind == "word" else None
+        if field is None: raise FilterSyntaxError(f"Không có cột '{w}'")
+        negate = False
+        if self.peek() == ("kw", "between"):
+            if field in STR_COLS: raise FilterSyntaxError(f"Cột '{w}' không dùng được 'between'")
+            self.take(); lo = self.value(field); self.expect("kw", "and")
+            return ("between", field, lo, self.value(field))
+        if self.peek() == ("kw", "not"): self.take(); negate = True; self.expect("kw", "in")
+        elif self.peek() == ("kw", "in"): self.take()
+        else:
+            op = self.expect("op")[1]
+            ops = _FILTER_STR_OPS if field in STR_COLS else _FILTER_NUM_OPS
+            if op not in ops: raise FilterSyntaxError(f"Cột '{w}' không dùng được phép '{op}'")
+            return ("cmp", field, op, self.value(field))
+        self.expect("op", "(")
+        vals = [self.value(field)]
+        while self.peek() == ("op", ","): self.take(); vals.append(self.value(field))
+        self.expect("op", ")")
+        node = ("in", field, tuple(vals))
+        return ("not", node) if negate else node
+
+    def value(self, field):
+        kind, v = self.take()
+        if kind is None: raise FilterSyntaxError(f"Biểu thức kết thúc đột ngột: còn thiếu giá trị cho '{field}'")
+        if kind not in ("num", "str", "word"): raise FilterSyntaxError(f"Thiếu giá trị cho '{field}'")
+        if field in STR_COLS:
+            return fold_vn(str(int(v)) if kind == "num" and v == int(v) else str(v))
+        if kind != "num": raise FilterSyntaxError(f"'{v}' không phải số (cột {field})")
+        return v
+
+def _compile_node(node):
+    # trả về pred(store, rids) -> mặt nạ bool (theo rids, hoặc theo mọi slot nếu rids=None)
+    tag = node[0]
+    if tag in ("and", "or"):
+        a, b = _compile_node(node[1]), _compile_node(node[2])
+        join = np.logical_and if tag == "and" else np.logical_or
+        return lambda store, rids=None: join(a(store, rids), b(store, rids))
+    if tag == "not":
+        a = _compile_node(node[1])
+        return lambda store, rids=None: ~a(store, rids)
+    field = node[1]
+    if field in STR_COLS:
+        # xét điều kiện trên từng giá trị phân biệt của pool rồi tra theo mã
+        test = (lambda k, vals=set(node[2]): k in vals) if tag == "in" else \
+               (lambda k, f=_FILTER_STR_OPS[node[2]], v=node[3]: f(k, v))
+        def pred(store, rids=None):
+            keys = store.pool_keys(field)
+            ok = np.fromiter((test(k) for k in keys), dtype=bool, count=len(keys))
+            return ok[store.codes(field, rids)]
+        return pred
+    if tag == "in":
+        vals = np.array(node[2], dtype=np.float64)
+        return lambda store, rids=None: np.isin(store.column(field, rids), vals)
+    if tag == "between":
+        lo, hi = node[2], node[3]
+        def pred(store, rids=None):
+            a = store.column(field, rids)
+            return (a >= lo) & (a <= hi)
+        return pred
+    f, v = _FILTER_NUM_OPS[node[2]], node[3]
+    return lambda store, rids=None: f(store.column(field, rids), v)
+
+def parse_filter(text: str):
+    return _FilterParser(text).parse()
+
+def _node_range(node):
+    # so sánh một cột số -> (cột, lo, hi, lo_open, hi_open) để tra chỉ mục điểm; không được -> None
+    if node[0] == "between": return node[1], node[2], node[3], False, False
+    if node[0] != "cmp" or node[1] in STR_COLS: return None
+    col, op, v = node[1], node[2], node[3]
+    return {"<": (col, None, v, False, True), "<=": (col, None, v, False, False),
+            ">": (col, v, None, True, False), ">=": (col, v, None, False, False),
+            "=": (col, v, v, False, False), "==": (col, v, v, False, False)}.get(op)
+
+def _node_lookup(node):
+    # so sánh cột chuỗi tra thẳng được chỉ mục phụ (=, ^=, in) -> (cột, "exact"/"prefix", các giá trị); không -> None
+    if node[0] == "in" and node[1] in STR_COLS: return node[1], "exact", node[2]
+    if node[0] == "cmp" and node[1] in STR_COLS and node[2] in ("=", "==", "^="):
+        return node[1], "prefix" if node[2] == "^=" else "exact", (node[3],)
+    return None
+
+def _conjuncts(node) -> list:
+    return _conjuncts(node[1]) + _conjuncts(node[2]) if node[0] == "and" else [node]
+
+def _node_columns(node) -> set[str]:
+    if node[0] in ("and", "or"): return _node_columns(node[1]) | _node_columns(node[2])
+    if node[0] == "not": return _node_columns(node[1])
+    return {node[1]}
+
+@functools.lru_cache(maxsize=128)
+def compile_filter(text: str):
+    # biên dịch một lần cho mỗi chuỗi biểu thức; lỗi cú pháp -> FilterSyntaxError
+    return _compile_node(parse_filter(text))
+
+@functools.lru_cache(maxsize=128)
+def _filter_plans(text: str) -> list[tuple[str, tuple, Any]]:
+    # mỗi vế AND tra được chỉ mục: ("range", khoảng trên cột số) hoặc ("key", tra chỉ mục phụ chuỗi),
+    # kèm pred của các vế còn lại (None nếu không còn)
+    parts = _conjuncts(parse_filter(text)); plans = []
+    for i, part in enumerate(parts):
+        rng = _node_range(part); look = None if rng is not None else _node_lookup(part)
+        if rng is None and look is None: continue
+        rest = parts[:i] + parts[i + 1:]
+        node = functools.reduce(lambda a, b: ("and", a, b), rest) if rest else None
+        plans.append(("range", rng) if rng is not None else ("key", look))
+        plans[-1] += (None if node is None else _compile_node(node),)
+    return plans
+
+def filter_expr_rids(store: StudentStore, text: str, sorter: "SortEngine | None" = None) -> np.ndarray:
+    # rid (tăng dần) thoả biểu thức. Nếu một vế AND đủ hẹp tra được chỉ mục (khoảng điểm qua sorter,
+    # lớp/tên/xếp loại =, ^=, in qua chỉ mục phụ) thì lấy ứng viên từ đó rồi chỉ xét các vế còn lại
+    # trên ứng viên; ngược lại tính mặt nạ trên cả kho.
+    text = text.strip()
+    pred = compile_filter(text)
+    best = None
+    for kind, spec, rest in _filter_plans(text):
+        if kind == "range":
+            if sorter is None: continue
+            n = sorter.range_size(*spec)
+        else:
+            col, how, vals = spec; idx = store.key_index[col]
+            keys = [k for v in vals for k in idx.prefix_keys(v)] if how == "prefix" else set(vals)
+            n = sum(idx.size(k) for k in keys)
+        if best is None or n < best[0]: best = (n, kind, spec, rest)
+    if best is not None and best[0] <= max(1, len(store)) // 8:
+        _, kind, spec, rest = best
+        if kind == "range": cand = sorter.range(*spec)
+        else:
+            col, how, vals = spec; idx = store.key_index[col]
+            cand = set().union(*(idx.prefix(v) if how == "prefix" else idx.exact(v) for v in vals))
+            cand = np.fromiter(cand, dtype=np.int64, count=len(cand))
+        if rest is not None: cand = cand[rest(store, cand)]
+        return np.sort(cand)
+    return np.flatnonzero(pred(store) & store.alive_mask())
+
+_TOP_WORDS = {"top": True, "dau": True, "bottom": False, "cuoi": False}
+
+def parse_top_query(text: str):
+    # "top 50 toan [where <biểu thức>]" -> (cột, k, lớn nhất?, biểu thức lọc); không phải dạng top -> None
+    parts = (text or "").split(None, 3)
+    if len(parts) < 3 or fold_vn(parts[0]) not in _TOP_WORDS or not parts[1].isdigit(): return None
+    col = _FILTER_FIELDS.get(fold_vn(parts[2]))
+    if col is None or col in STR_COLS: raise FilterSyntaxError(f"'{parts[2]}' không phải cột điểm")
+    where = ""
+    if len(parts) == 4:
+        kw, _, where = parts[3].partition(" ")
+        if fold_vn(kw) not in ("where", "khi") or not where.strip():
+            raise FilterSyntaxError("Sau 'top K cột' chỉ được 'where <biểu thức>'")
+    return col, int(parts[1]), _TOP_WORDS[fold_vn(parts[0])], where.strip()
+
+# ================== BỘ LỌC ĐÃ LƯU (view cụ thể hoá) ==================
+class SavedFilter:
+    # Giữ sẵn tập rid thoả biểu thức. Thêm/sửa chỉ ghi rid vào hàng chờ, lúc đọc xét lại cả hàng chờ
+    # bằng một lần gọi pred (vector); sửa cột không nằm trong biểu thức thì bỏ qua.
+    def __init__(self, store: StudentStore, name: str, expr: str):
+        self.store = store; self.name = name; self.expr = expr.strip()
+        self.pred = compile_filter(self.expr)
+        self.cols = _node_columns(parse_filter(self.expr))
+        self._rids: set[int] = set(); self._pending: set[int] = set(); self._stale = True
+
+    def on_insert(self, rid): self._pending.add(rid)
+    def on_update(self, rid, old):
+        if self.cols.intersection(old): self._pending.add(rid)
+    def on_delete(self, rid, old): self._rids.discard(rid); self._pending.discard(rid)
+    def on_reset(self): self._rids.clear(); self._pending.clear(); self._stale = True
+
+    def rids(self) -> set[int]:
+        if self._stale:
+            self._rids = set(filter_expr_rids(self.store, self.expr).tolist())
+            self._stale = False; self._pending.clear()
+        elif self._pending:
+            todo = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            self._pending.clear()
+            ok = self.pred(self.store, todo)
+            self._rids.difference_update(todo[~ok].tolist()); self._rids.update(todo[ok].tolist())
+        return self._rids
+
+    def __len__(self): return len(self.rids())
+
+class SavedFilters:
+    # Danh sách bộ lọc đã lưu (thứ tự thêm vào), lưu JSON cạnh file dữ liệu; nhận thay đổi của kho
+    # một lần rồi chuyển cho từng bộ lọc.
+    def __init__(self, store: StudentStore):
+        self.store = store; self.filters: dict[str, SavedFilter] = {}
+        store.subscribe(self)
+
+    def on_insert(self, rid):
+        for f in self.filters.values(): f.on_insert(rid)
+    def on_update(self, rid, old):
+        for f in self.filters.values(): f.on_update(rid, old)
+    def on_delete(self, rid, old):
+        for f in self.filters.values(): f.on_delete(rid, old)
+    def on_reset(self):
+        for f in self.filters.values(): f.on_reset()
+
+    def add(self, name: str, expr: str) -> SavedFilter:
+        f = self.filters[name] = SavedFilter(self.store, name, expr)   # lỗi cú pháp -> FilterSyntaxError
+        return f
+
+    def remove(self, name: str): self.filters.pop(name, None)
+    def get(self, name: str) -> SavedFilter | None: return self.filters.get(name)
+    def names(self) -> list[str]: return list(self.filters)
+
+    def save(self, path: str):
+        data = {"version": 1, "filters": [{"name": f.name, "expr": f.expr} for f in self.filters.values()]}
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False, indent=2)
+
+    def load(self, path: str) -> int:
+        # thay toàn bộ danh sách; bộ lọc có biểu thức hỏng thì bỏ qua
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        self.filters.clear()
+        for item in data.get("filters", []):
+            try: self.add(str(item["name"]), str(item["expr"]))
+            except (KeyError, FilterSyntaxError): continue
+        return len(self.filters)
+
+# ================== ĐỌC FILE (theo cột, từng khối) ==================
+# Header được ánh xạ một lần thành vị trí cột; dữ liệu đọc từng khối (CSV_BLOCK/XLSX_CHUNK), mỗi cột
+# chuyển một lượt: điểm/ID -> mảng NumPy (lỗi định dạng mới phân tích từng giá trị), chuỗi ->
+# mã + pool giá trị thô. Cuối cùng ĐTB/xếp loại tính vector và kho nạp hàng loạt (load_columns).
+CSV_BLOCK = 1 << 20      # ký tự mỗi khối khi đọc CSV
+XLSX_CHUNK = 10_000      # dòng mỗi khối khi đọc XLSX (mỗi dòng là tuple đối tượng -> giữ khối nhỏ)
+IMPORT_FIELDS = ["id", "ho_ten", "lop"] + SUBJECTS
+_HEADER_ALIASES = {
+    "id":"id","họ tên":"ho_ten","ho ten":"ho_ten",
+    "lớp":"lop","lop":"lop","toán":"toan","toan":"toan",
+    "lý":"ly","ly":"ly","hóa":"hoa","hoa":"hoa",
+    "văn":"van","van":"van","anh":"anh","tin":"tin",
+    "điểm tb":"diem_tb","diem tb":"diem_tb",
+    "xếp loại":"xep_loai","xep loai":"xep_loai",
+    **{c: c for c in STUDENT_COLS}
+}
+
+def map_header(headers) -> dict[str, int]:
+    # cột cần đọc -> vị trí trong dòng (trùng tên: lấy cột đầu tiên)
+    pos: dict[str, int] = {}
+    for i, h in enumerate(headers):
+        en = _HEADER_ALIASES.get(str(h or "").strip().lower())
+        if en in IMPORT_FIELDS: pos.setdefault(en, i)
+    return pos
+
+def parse_scores(vals) -> np.ndarray:
+    # parse_score_any cho cả cột: chuyển thẳng sang float (nhanh), lỗi thì phân tích từng giá trị
+    # trên các giá trị phân biệt (điểm chỉ có vài trăm cách viết)
+    try: a = np.asarray(vals, dtype=np.float64)
+    except (ValueError, TypeError):
+        memo = {v: parse_score_any(v) for v in dict.fromkeys(vals)}
+        return np.fromiter(map(memo.__getitem__, vals), dtype=np.float64, count=len(vals))
+    a[~((a >= 0) & (a <= 10))] = 0.0          # NaN / ngoài thang điểm -> 0 như parse_score_any
+    return a
+
+def _id_float(v) -> float:
+    try: return float(v)
+    except (ValueError, TypeError): return np.nan
+
+def parse_ids(vals) -> np.ndarray:
+    # float64, NaN = thiếu/lỗi (sẽ thay bằng số thứ tự dòng khi ghép cột)
+    try: a = np.asarray(vals, dtype=np.float64)
+    except (ValueError, TypeError):
+        a = np.fromiter((_id_float(v) for v in vals), dtype=np.float64, count=len(vals))
+    a[~np.isfinite(a) | (np.abs(a) >= 2.0 ** 63)] = np.nan
+    return a
+
+class ColumnBuffers:
+    # Bộ đệm cột cho một nguồn (file/sheet): số -> các khối mảng, chuỗi -> mã int32 + pool giá trị thô.
+    # arrays() trả dạng gọn (pickle được) để ghép nhiều phần bằng build_columns.
+    def __init__(self, pos: dict[str, int]):
+        self.pos = pos; self.n = 0
+        self._num = {c: [] for c in ["id"] + SUBJECTS}
+        self._str = {c: ({}, []) for c in ("ho_ten", "lop")}   # (giá trị thô -> mã, các khối mã)
+        fields = list(pos)
+        self._fields = fields; self._width = max(pos.values(), default=-1) + 1
+        self._get = operator.itemgetter(*(pos[c] for c in fields)) if fields else None
+
+    def add_rows(self, rows: list):
+        # rows: list các dòng (list/tuple) theo thứ tự cột của header
+        if not rows: return
+        if self._get is None: cols = []
+        else:
+            w = self._width; lens = set(map(len, rows))
+            if len(lens) == 1 and w <= min(lens):          # mọi dòng đủ cột: chuyển vị cả khối một lần
+                allcols = list(zip(*rows)); cols = [allcols[self.pos[c]] for c in self._fields]
+            else:
+                if min(lens) < w:
+                    rows = [r if len(r) >= w else list(r) + [""] * (w - len(r)) for r in rows]
+                cols = list(zip(*map(self._get, rows))) if len(self._fields) > 1 else [list(map(self._get, rows))]
+        self.add_columns(dict(zip(self._fields, cols)), len(rows))
+
+    def add_columns(self, cols: dict, n: int):
+        # cols: cột -> dãy n giá trị thô; cột vắng: ID theo số dòng, điểm 0, chuỗi rỗng
+        if n <= 0: return
+        v = cols.get("id")
+        self._num["id"].append(parse_ids(v) if v is not None else np.full(n, np.nan))
+        for c in SUBJECTS:
+            v = cols.get(c)
+            self._num[c].append(parse_scores(v) if v is not None else np.zeros(n))
+        for c, (lookup, chunks) in self._str.items():
+            v = cols.get(c, ("",) * n)
+            for x in dict.fromkeys(v):                  # giá trị mới của khối -> mã mới
+                if x not in lookup: lookup[x] = len(lookup)
+            chunks.append(np.fromiter(map(lookup.__getitem__, v), dtype=np.int32, count=n))
+        self.n += n
+
+    def arrays(self) -> dict:
+        out = {"n": self.n}
+        for c, chunks in self._num.items():
+            out[c] = np.concatenate(chunks) if chunks else np.zeros(0)
+        for c, (lookup, chunks) in self._str.items():
+            out[c] = (np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32),
+                      [str(x or "").strip() for x in lookup])
+        return out
+
+def build_columns(parts) -> dict:
+    # ghép các phần arrays() -> cột cho StudentStore.load_columns (ĐTB, xếp loại tính vector)
+    parts = list(parts); n = sum(p["n"] for p in parts)
+    out = {}
+    for c in ["id"] + SUBJECTS:
+        out[c] = np.concatenate([p[c] for p in parts]) if parts else np.zeros(0)
+    ids = out["id"]; bad = np.isnan(ids)
+    out["id"] = np.where(bad, np.arange(1, n + 1), np.trunc(np.where(bad, 0, ids))).astype(np.int64)
+    avg = np.zeros(n)
+    for c in SUBJECTS: avg = avg + out[c]               # cộng lần lượt như wavg -> cùng kết quả
+    avg /= len(SUBJECTS)
+    # round(x, 2) của Python làm tròn theo biểu diễn thập phân: NumPy chỉ lệch ở ca sát .5 -> tính lại riêng
+    tb = np.round(avg, 2); near = np.flatnonzero(np.abs(avg * 100 % 1 - 0.5) < 1e-6)
+    tb[near] = [round(x, 2) for x in avg[near].tolist()]
+    out["diem_tb"] = tb
+    xl = np.select([avg >= 8.5, avg >= 7.0, avg >= 5.0], [0, 1, 2], 3).astype(np.int32)   # = classify(avg)
+    out["xep_loai"] = (xl, list(RANKS))
+    for c in ("ho_ten", "lop"):
+        pool: dict[str, int] = {}; codes = []
+        for p in parts:
+            pc, values = p[c]
+            remap = np.fromiter((pool.setdefault(v, len(pool)) for v in values), dtype=np.int32, count=len(values))
+            codes.append(remap[pc] if len(pc) else pc)
+        out[c] = (np.concatenate(codes) if codes else np.zeros(0, dtype=np.int32), list(pool))
+    return out
+
+def _sniff_delimiter(sample: str) -> str:
+    try: return csv.Sniffer().sniff(sample, delimiters=";,").delimiter
+    except Exception: return ";"
+
+def _csv_row_blocks(f, delimiter: str):
+    # các khối dòng đã tách cột (~CSV_BLOCK ký tự, cắt ở cuối dòng). Khối không có dấu nháy/CR ->
+    # str.split (nhanh, kết quả như csv.reader); ngược lại csv.reader, đọc nối thêm dòng đến khi số
+    # dấu nháy chẵn để không cắt giữa một trường nhiều dòng. Dòng trống bị bỏ như DictReader.
+    while True:
+        text = f.read(CSV_BLOCK)
+        if not text: return
+        text += f.readline()
+        quotes = text.count('"')
+        while quotes % 2:
+            more = f.readline()
+            if not more: break
+            text += more; quotes += more.count('"')
+        if "\r" in text: text = text.replace("\r\n", "\n")
+        if quotes or "\r" in text:
+            yield [r for r in csv.reader(io.StringIO(text, newline=""), delimiter=delimiter, quotechar='"') if r]
+        else:
+            yield [l.split(delimiter) for l in text.split("\n") if l]
+
+def _read_csv_buffer(path: str, progress=None) -> ColumnBuffers:
+    total = os.path.getsize(path)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        delimiter = _sniff_delimiter(f.read(4096)); f.seek(0)
+        header = []
+        for line in f:
+            header = next(csv.reader([line], delimiter=delimiter, quotechar='"'), [])
+            if header: break
+        buf = ColumnBuffers(map_header(header))
+        for rows in _csv_row_blocks(f, delimiter):
+            buf.add_rows(rows)
+            if progress: progress(buf.n, f.buffer.tell(), total)
+    return buf
+
+def _read_sheet_buffer(ws, progress=None) -> ColumnBuffers:
+    # ws: sheet của workbook mở read_only -> đọc XML từng dòng, chỉ lấy giá trị
+    total = max((ws.max_row or 0) - 1, 0)   # theo thẻ dimension: chỉ để báo tiến độ
+    ws.reset_dimensions()                   # thẻ dimension sai (vài phần mềm ghi "A1") không làm cụt dữ liệu
+    rows = ws.iter_rows(values_only=True)
+    buf = ColumnBuffers(map_header(next(rows, ())))
+    for chunk in iter(lambda: list(itertools.islice(rows, XLSX_CHUNK)), []):
+        buf.add_rows(chunk)
+        if progress: progress(buf.n, buf.n, max(total, buf.n))
+    return buf
+
+def read_csv_columns(path: str, progress=None) -> dict:
+    # progress(số dòng, byte đã đọc, tổng byte) sau mỗi khối
+    with _gc_paused(): return build_columns([_read_csv_buffer(path, progress).arrays()])
+
+def read_xlsx_columns(path: str, progress=None) -> dict:
+    # sheet đang chọn của workbook; progress(số dòng, số dòng, tổng dòng) sau mỗi khối XLSX_CHUNK dòng.
+    # Bộ nhớ ngoài các cột kết quả chỉ cỡ một khối
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        with _gc_paused(): return build_columns([_read_sheet_buffer(wb.active, progress).arrays()])
+    finally:
+        wb.close()
+
+# ---------- nhập nhiều nguồn (thư mục / mọi sheet) ở các tiến trình con ----------
+# Mỗi việc = một file (mọi sheet) hoặc một sheet; tiến trình con trả arrays() gọn kèm nhãn nguồn,
+# tiến trình chính ghép bằng build_columns. Lớp trống lấy theo tên sheet (workbook nhiều sheet) hoặc
+# tên file; ID trùng giữa các nguồn (mỗi lớp thường đánh số từ 1) được cấp lại sau ID lớn nhất.
+IMPORT_SUFFIXES = (".xlsx", ".csv")
+
+def _source_arrays(buf: ColumnBuffers, source: str, lop: str) -> dict:
+    out = buf.arrays(); out["source"] = source
+    codes, values = out["lop"]; out["lop"] = (codes, [v or lop for v in values])
+    return out
+
+def _read_source_parts(task) -> list[dict]:
+    # task = (path, tên sheet | None = mọi sheet). Chạy trong tiến trình con; sheet/file không có cột
+    # nào nhận ra thì bỏ qua, file lỗi -> phần rỗng có "error" để báo lại
+    path, sheet = task
+    name = os.path.basename(path); stem = os.path.splitext(name)[0]; parts = []
+    try:
+        with _gc_paused():
+            if not path.lower().endswith(".xlsx"):
+                buf = _read_csv_buffer(path)
+                if buf.pos: parts.append(_source_arrays(buf, name, stem))
+                return parts
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                many = len(wb.sheetnames) > 1
+                for s in ([sheet] if sheet is not None else wb.sheetnames):
+                    buf = _read_sheet_buffer(wb[s])
+                    if buf.pos: parts.append(_source_arrays(buf, f"{name} › {s}" if many else name, s if many else stem))
+            finally:
+                wb.close()
+    except Exception as e:
+        parts.append({"n": 0, "source": name if sheet is None else f"{name} › {sheet}", "error": str(e)})
+    return parts
+
+def _run_parts(fn, tasks: list, progress=None, workers: int | None = None) -> list[dict]:
+    # fn(task) -> list phần arrays(), chạy song song ở tiến trình con; kết quả giữ thứ tự tasks.
+    # "spawn" vì hàm được gọi từ luồng nền của Tk (fork tiến trình nhiều luồng không an toàn).
+    # Mỗi tiến trình con import lại cả PROJECT.py (~0.25s: tkinter, openpyxl, numpy, phần AI; matplotlib
+    # chỉ nạp khi vẽ) nên chỉ đáng dùng khi có nhiều file/sheet hoặc file CSV rất lớn. Bản đóng gói
+    # (PyInstaller) cần multiprocessing.freeze_support() ở đầu __main__.
+    # progress(số dòng, số việc xong, tổng số việc); progress ném lỗi (Hủy) -> bỏ các việc chưa chạy
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    ex = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futs = [ex.submit(fn, t) for t in tasks]; rows = done = 0
+        for fut in concurrent.futures.as_completed(futs):
+            rows += sum(p["n"] for p in fut.result()); done += 1
+            if progress: progress(rows, done, len(tasks))
+        return [p for fut in futs for p in fut.result()]
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+def build_import(parts: list[dict]) -> dict:
+    # build_columns + nguồn từng dòng ("nguon": (mã, nhãn)), số ID được cấp lại, các nguồn lỗi
+    ok = [p for p in parts if p["n"]]
+    cols = build_columns(ok); ids = cols["id"]
+    dup = np.ones(len(ids), dtype=bool); dup[np.unique(ids, return_index=True)[1]] = False
+    k = int(dup.sum())
+    if k: ids[dup] = ids.max() + 1 + np.arange(k)           # lần xuất hiện đầu giữ ID, các lần sau cấp mới
+    cols["nguon"] = (np.repeat(np.arange(len(ok), dtype=np.int32), [p["n"] for p in ok]), [p["source"] for p in ok])
+    cols["doi_id"] = k
+    cols["loi"] = [(p["source"], p["error"]) for p in parts if "error" in p]
+    return cols
+
+def import_sources(paths: list[str], progress=None, workers: int | None = None) -> dict:
+    # nhiều file (mỗi file mọi sheet) -> cột đã ghép cho load_columns
+    return build_import(_run_parts(_read_source_parts, [(p, None) for p in paths], progress, workers))
+
+def import_workbook_sheets(path: str, progress=None, workers: int | None = None) -> dict:
+    # mọi sheet của một workbook, mỗi sheet một việc
+    wb = load_workbook(path, read_only=True); sheets = wb.sheetnames; wb.close()
+    return build_import(_run_parts(_read_source_parts, [(path, s) for s in sheets], progress, workers))
+
+def list_import_files(folder: str) -> list[str]:
+    # file bảng điểm trong thư mục (bỏ file khóa tạm "~$..." của Excel), theo tên
+    return [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+            if f.lower().endswith(IMPORT_SUFFIXES) and not f.startswith("~$")]
+
+# ---------- CSV rất lớn: chia theo khoảng byte, mỗi khoảng một tiến trình ----------
+# Ranh giới là ngay sau một "\n" mà số dấu nháy từ đầu dữ liệu tới đó chẵn (không nằm trong trường
+# có nháy, "" thoát vẫn giữ chẵn lẻ). Mỗi tiến trình tách khoảng của mình như read_csv_columns;
+# build_columns ghép theo thứ tự nên ID thiếu vẫn đánh theo số dòng toàn file.
+CSV_RANGE = 32 << 20             # byte mỗi việc (nhiều việc hơn số tiến trình -> chia tải đều, RAM mỗi việc có hạn)
+# Pool tốn thêm ~30-45% thời gian đọc một tiến trình (khởi động con, chuyển mảng/pool về, ghép pool chuỗi)
+# -> 2 CPU gần như không lợi; chỉ dùng khi đủ CPU và file đủ lớn để bù phần khởi động.
+CSV_PARALLEL_MIN = 256 << 20     # file nhỏ hơn đọc một tiến trình
+CSV_PARALLEL_CPUS = 4            # ít CPU hơn thì đọc một tiến trình
+
+def _count_quotes(mm, lo: int, hi: int) -> int:
+    return sum(mm[i:min(i + CSV_BLOCK * 16, hi)].count(b'"') for i in range(lo, hi, CSV_BLOCK * 16))
+
+def _csv_header(path: str):
+    # (dấu phân cách, header, byte bắt đầu dữ liệu | None nếu file xuống dòng bằng CR đơn) - như _read_csv_buffer
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        delimiter = _sniff_delimiter(f.read(4096))
+    with open(path, "rb") as f:
+        if f.read(3) != b"\xef\xbb\xbf": f.seek(0)
+        header = []
+        for line in iter(f.readline, b""):
+            if b"\r" in line.rstrip(b"\r\n"): return delimiter, [], None
+            header = next(csv.reader([line.decode("utf-8")], delimiter=delimiter, quotechar='"'), [])
+            if header: break
+        return delimiter, header, f.tell()
+
+def csv_byte_ranges(path: str, start: int, parts: int) -> list[tuple[int, int]]:
+    # chia [start, cuối file) thành <= parts khoảng, mỗi khoảng kết thúc ở đầu một dòng mới thật sự
+    import mmap
+    size = os.path.getsize(path)
+    if size <= start or parts <= 1: return [(start, size)] if size > start else []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        cuts = [start]; q = 0; p = start                 # q = số dấu nháy trong [start, p)
+        for k in range(1, parts):
+            target = start + (size - start) * k // parts
+            if target <= p: continue
+            q += _count_quotes(mm, p, target); p = target
+            while True:
+                nl = mm.find(b"\n", p)
+                if nl < 0: p = size; break
+                q += _count_quotes(mm, p, nl + 1); p = nl + 1
+                if q % 2 == 0: break
+            if p >= size: break
+            cuts.append(p)
+    return list(zip(cuts, cuts[1:] + [size]))
+
+def _read_csv_range(task) -> list[dict]:
+    # chạy trong tiến trình con: một khoảng byte -> [arrays()]
+    path, lo, hi, delimiter, pos = task
+    with open(path, "rb") as f:
+        f.seek(lo); text = f.read(hi - lo).decode("utf-8")
+    buf = ColumnBuffers(pos)
+    with _gc_paused():
+        for rows in _csv_row_blocks(io.StringIO(text, newline=""), delimiter): buf.add_rows(rows)
+    return [buf.arrays()]
+
+def read_csv_columns_parallel(path: str, progress=None, workers: int | None = None) -> dict:
+    # như read_csv_columns nhưng các khoảng byte đọc ở nhiều tiến trình; file nhỏ / ít CPU -> đọc thẳng.
+    # progress(số dòng, số khoảng xong, tổng số khoảng)
+    workers = workers or os.cpu_count() or 1
+    if workers < CSV_PARALLEL_CPUS or os.path.getsize(path) < CSV_PARALLEL_MIN:
+        return read_csv_columns(path, progress)
+    return _read_csv_parallel(path, progress, workers)
+
+def _read_csv_parallel(path: str, progress=None, workers: int = 1) -> dict:
+    delimiter, header, start = _csv_header(path)
+    if start is None: return read_csv_columns(path, progress)
+    pos = map_header(header); size = os.path.getsize(path)
+    ranges = csv_byte_ranges(path, start, max(workers, -(-(size - start) // CSV_RANGE)))
+    parts = _run_parts(_read_csv_range, [(path, lo, hi, delimiter, pos) for lo, hi in ranges], progress, workers)
+    with _gc_paused(): return build_columns(parts)
+
+class ImportSources:
+    # Nguồn (file/sheet) của từng dòng lần nạp gần nhất, mã theo rid. Dòng thêm sau đó không có nguồn;
+    # nạp/xoá toàn bộ (on_reset) thì quên hết, GUI gán lại sau load_columns.
+    def __init__(self, store: StudentStore):
+        self.codes = np.empty(0, dtype=np.int32); self.names: list[str] = []
+        store.subscribe(self)
+
+    def set(self, codes, names): self.codes = codes; self.names = list(names)
+
+    def name_of(self, rid: int) -> str | None:
+        return self.names[self.codes[rid]] if rid < len(self.codes) else None
+
+    def on_insert(self, rid): pass
+    def on_update(self, rid, old): pass
+    def on_delete(self, rid, old): pass
+    def on_reset(self): self.codes = np.empty(0, dtype=np.int32); self.names = []
+
+# ================== KPI TĂNG DẦN ==================
+RANKS = ["Giỏi", "Khá", "Trung bình", "Yếu"]
+
+class KpiAggregator:
+    # Đếm xếp loại cho cả kho và cho tập đang hiển thị (view); cập nhật theo delta mỗi thay đổi
+    def __init__(self, store: StudentStore):
+        self.store = store
+        self.view: set[int] | None = None   # None = đang hiển thị tất cả
+        self.view_counts = dict.fromkeys(RANKS, 0)
+        store.subscribe(self)
+        self.on_reset()
+
+    @staticmethod
+    def _bump(counts: dict, rank: str, d: int):
+        counts[rank] = counts.get(rank, 0) + d
+
+    def _rank(self, rid: int) -> str: return self.store.get_value(rid, "xep_loai")
+
+    def on_insert(self, rid):
+        # dòng mới không thuộc view đang lọc (bảng chưa hiện nó) -> chỉ đổi đếm toàn kho;
+        # nơi thêm dòng vẽ lại bảng ngay sau đó và refresh_table gọi lại set_view
+        self._bump(self.counts, self._rank(rid), 1)
+
+    def on_update(self, rid, old):
+        if "xep_loai" not in old: return
+        new = self._rank(rid)
+        if new == old["xep_loai"]: return
+        self._bump(self.counts, old["xep_loai"], -1); self._bump(self.counts, new, 1)
+        if self.view is not None and rid in self.view:
+            self._bump(self.view_counts, old["xep_loai"], -1); self._bump(self.view_counts, new, 1)
+
+    def on_delete(self, rid, old):
+        self._bump(self.counts, old["xep_loai"], -1)
+        if self.view is not None and rid in self.view:
+            self.view.discard(rid); self._bump(self.view_counts, old["xep_loai"], -1)
+
+    def _count(self, rids=None) -> dict:
+        # đếm một lượt trên cột mã xếp loại (bincount), không duyệt dòng bằng Python
+        store = self.store; pool = store.pool("xep_loai")
+        codes = store.codes("xep_loai")[store.alive_mask()] if rids is None else store.codes("xep_loai", rids)
+        counts = dict.fromkeys(RANKS, 0)
+        for v, n in zip(pool, np.bincount(codes, minlength=len(pool)).tolist()):
+            if n: self._bump(counts, v, n)
+        return counts
+
+    def on_reset(self):
+        self.counts = self._count()
+        self.view = None
+
+    def set_view(self, rids):
+        if rids is None:
+            self.view = None; return
+        self.view = set(rids)
+        self.view_counts = self._count(np.fromiter(self.view, dtype=np.int64, count=len(self.view)))
+
+    def visible(self) -> int:
+        return len(self.store) if self.view is None else len(self.view)
+
+    def current(self) -> dict:
+        return self.counts if self.view is None else self.view_counts
+
+# ================== HISTOGRAM TĂNG DẦN ==================
+class ScoreHistograms:
+    # Giữ ma trận 7x10 (HIST_COLS x bin) cho cả kho; mỗi thay đổi điểm chỉ chuyển 1 đếm giữa 2 bin
+    def __init__(self, store: StudentStore):
+        self.store = store
+        self.counts = np.zeros((len(HIST_COLS), 10), dtype=np.int64)
+        store.subscribe(self)
+        self.on_reset()
+
+    def _move(self, rid: int, d: int):
+        for j, c in enumerate(HIST_COLS):
+            self.counts[j, _bucket_index(self.store.get_value(rid, c))] += d
+
+    def on_insert(self, rid):
+        self._move(rid, 1)
+
+    def on_update(self, rid, old):
+        for j, c in enumerate(HIST_COLS):
+            if c not in old: continue
+            b_old = _bucket_index(old[c]); b_new = _bucket_index(self.store.get_value(rid, c))
+            if b_old != b_new:
+                self.counts[j, b_old] -= 1; self.counts[j, b_new] += 1
+
+    def on_delete(self, rid, old):
+        for j, c in enumerate(HIST_COLS):
+            self.counts[j, _bucket_index(old[c])] -= 1
+
+    def on_reset(self):
+        self.counts = self.for_rows(self.store.row_ids())
+
+    def for_rows(self, rids=None) -> np.ndarray:
+        # rids=None -> cả kho (đọc thẳng bộ đếm); ngược lại tính trên tập con từ các cột
+        if rids is None:
+            return self.counts.copy()
+        rids = np.asarray(rids, dtype=np.int64)
+        return hist10_matrix(np.stack([self.store.column(c, rids) for c in HIST_COLS]))
+
+    def by_grade(self, rids=None) -> np.ndarray:
+        # (3, 10): Điểm TB theo khối 10/11/12; khối tính một lần cho mỗi giá trị lớp phân biệt
+        if rids is None: rids = self.store.row_ids()
+        rids = np.asarray(rids, dtype=np.int64)
+        grade_of = np.array([next((i for i, g in enumerate(GRADES) if v.strip().startswith(g)), -1)
+                             for v in self.store.pool("lop")], dtype=np.int64)
+        return hist10_grouped(grade_of[self.store.codes("lop", rids)],
+                              self.store.column("diem_tb", rids), len(GRADES))
+
+    def as_dict(self, rids=None) -> dict[str, list[int]]:
+        h = self.for_rows(rids)
+        return {name: [int(x) for x in h[j]] for j, name in enumerate(HIST_NAMES)}
+
+# ================== SẮP XẾP (hoán vị lưu sẵn theo cột) ==================
+# Khoá so sánh tiếng Việt dạng bytes: so sánh byte = thứ tự bảng chữ cái
+#   a ă â b c d đ e ê g h i k l m n o ô ơ p q r s t u ư v x y (f j w z xen theo Latin),
+# mỗi từ: chữ cái (mức 1) rồi thanh điệu ngang < huyền < hỏi < ngã < sắc < nặng (mức 2).
+_VN_ALPHABET = "aăâbcdđeêfghijklmnoôơpqrstuưvwxyz"
+_VN_PRIMARY = {ch: bytes([0x20 + i]) for i, ch in enumerate(_VN_ALPHABET)}
+_VN_PRIMARY.update({d: bytes([0x10 + i]) for i, d in enumerate("0123456789")})
+_VN_TONES = {"\u0300": 1, "\u0309": 2, "\u0303": 3, "\u0301": 4, "\u0323": 5}
+_VN_MODS = {("a", "\u0306"): "ă", ("a", "\u0302"): "â", ("e", "\u0302"): "ê",
+            ("o", "\u0302"): "ô", ("o", "\u031b"): "ơ", ("u", "\u031b"): "ư"}
+_vn_char_cache: dict[str, tuple[bytes, int]] = {}
+
+def _vn_char(ch: str) -> tuple[bytes, int]:
+    # (byte chữ cái, thanh điệu) của một ký tự thường; ký tự lạ xếp sau mọi chữ cái
+    r = _vn_char_cache.get(ch)
+    if r is None:
+        d = unicodedata.normalize("NFD", ch); base, tone = d[0], 0
+        for m in d[1:]:
+            if m in _VN_TONES: tone = _VN_TONES[m]
+            else: base = _VN_MODS.get((base, m), base)
+        r = _vn_char_cache[ch] = (_VN_PRIMARY.get(base) or b"\xfe" + base.encode("utf-8"), tone)
+    return r
+
+def vn_collate_key(text: str, name_order: bool = False) -> bytes:
+    # name_order: họ tên xếp theo tên, rồi tên đệm, rồi họ (như danh sách lớp)
+    words = (text or "").lower().split()
+    if name_order and len(words) > 1:
+        words = words[-1:] + words[1:-1] + words[:1]
+    out = bytearray()
+    for w in words:
+        tone = 0
+        for ch in w:
+            p, t = _vn_char(ch); out += p; tone = tone or t
+        out += bytes((0x02, 0x03 + tone, 0x01))   # 0x02 < chữ cái: "an" < "anh"; 0x01 ngắt từ
+    return bytes(out)
+
+def vn_name_key(name: str) -> bytes:
+    return vn_collate_key(name, name_order=True)
+
+DEFAULT_SORT = ("lop", "ho_ten")
+VN_COLLATE = {"ho_ten": vn_name_key, "lop": vn_collate_key, "xep_loai": vn_collate_key}
+
+class SortEngine:
+    # Giữ hoán vị rid tăng dần cho mỗi bộ cột đã dùng (cùng khoá: theo rid); giảm dần đảo thứ tự
+    # các đoạn khoá bằng nhau nhưng giữ nguyên thứ tự trong đoạn -> cùng khoá vẫn theo rid tăng.
+    # Khoá chuỗi (collate[col], mặc định VN_COLLATE) tính một lần cho mỗi giá trị phân biệt.
+    # Thêm/sửa chỉ ghi rid vào hàng chờ; lúc đọc chèn lại bằng bisect, nhiều quá thì dựng lại.
+    # Xoá không động vào hoán vị: lọc bằng mặt nạ dòng sống khi đọc (slot không bị tái dùng).
+    # Cột số một mình (các môn, diem_tb, id) giữ thêm mảng giá trị đã sort song song với hoán vị
+    # -> chỉ mục điểm: khoảng bằng searchsorted, top-k đọc từ hai đầu.
+    REBUILD_RATIO = 64
+
+    def __init__(self, store: StudentStore, collate=None):
+        self.store = store
+        self.collate = dict(VN_COLLATE)
+        if collate: self.collate.update(collate)
+        store.subscribe(self)
+        self.on_reset()
+
+    # ----- khoá -----
+    def _ckeys(self, col: str) -> list:
+        # khoá so sánh theo mã trong pool; pool chỉ thêm nên chỉ cần tính nốt phần mới
+        ck = self._ck.setdefault(col, [])
+        pool = self.store.pool(col)
+        if len(ck) < len(pool):
+            f = self.collate[col]
+            ck.extend(f(v) for v in pool[len(ck):])
+        return ck
+
+    def _ranks(self, col: str) -> np.ndarray:
+        # hạng dày đặc của khoá theo mã (khoá bằng nhau -> cùng hạng); sort byte trong NumPy
+        ck = self._ckeys(col)
+        if not ck: return np.zeros(0, dtype=np.int64)
+        return np.unique(np.array(ck), return_inverse=True)[1].astype(np.int64).ravel()
+
+    def _key_arrays(self, cols, rids) -> list[np.ndarray]:
+        return [self.store.column(c, rids) if c not in self.collate
+                else self._ranks(c)[self.store.codes(c, rids)] for c in cols]
+
+    def _row_key(self, cols, rid: int) -> tuple:
+        # cùng thứ tự với _key_arrays, thêm rid để mọi khoá phân biệt
+        st = self.store
+        return tuple(st.get_value(rid, c) if c not in self.collate
+                     else self._ck[c][st.codes(c)[rid]] for c in cols) + (rid,)
+
+    # ----- hoán vị -----
+    def _build(self, cols) -> np.ndarray:
+        rids = np.flatnonzero(self.store.alive_mask())
+        return rids[np.lexsort(self._key_arrays(cols, rids)[::-1])]   # lexsort ổn định: hoà -> rid
+
+    def _settle(self, cols) -> np.ndarray:
+        perm = self._perms.get(cols); pending = self._pending.get(cols)
+        valued = len(cols) == 1 and cols[0] not in self.collate
+        if perm is None or len(pending) > max(self.REBUILD_RATIO, len(perm) // self.REBUILD_RATIO):
+            perm = self._build(cols)
+            if valued: self._vals[cols] = self.store.column(cols[0], perm)
+        elif pending:
+            alive = self.store.alive_mask()
+            todo = np.fromiter(pending, dtype=np.int64, count=len(pending))
+            keep = ~np.isin(perm, todo); perm = perm[keep]
+            for c in cols:
+                if c in self.collate: self._ckeys(c)
+            key = lambda r: self._row_key(cols, int(r))
+            todo = sorted(todo[alive[todo]].tolist(), key=key)   # vị trí không giảm -> np.insert giữ đúng thứ tự
+            pos = [bisect.bisect_left(perm, key(r), key=key) for r in todo]
+            todo = np.array(todo, dtype=np.int64)
+            perm = np.insert(perm, pos, todo)
+            if valued: self._vals[cols] = np.insert(self._vals[cols][keep], pos, self.store.column(cols[0], todo))
+        self._perms[cols] = perm; self._pending[cols] = set()
+        return perm
+
+    def _desc(self, cols) -> np.ndarray:
+        # hoán vị giảm dần, dựng lại khi hoán vị tăng dần đổi: đoạn [a, b) của khoá bằng nhau
+        # chuyển sang vị trí n - b + (i - a) -> O(N), không sort lại
+        perm = self._settle(cols); cached = self._descs.get(cols)
+        if cached is not None and cached[0] is perm: return cached[1]
+        n = len(perm); out = perm
+        if n:
+            keys = self._key_arrays(cols, perm)
+            head = np.zeros(n, dtype=bool); head[0] = True
+            for k in keys: head[1:] |= k[1:] != k[:-1]
+            starts = np.flatnonzero(head); run = np.cumsum(head) - 1
+            ends = np.r_[starts[1:], n]
+            out = np.empty_like(perm); out[n - ends[run] + np.arange(n) - starts[run]] = perm
+        self._descs[cols] = (perm, out)
+        return out
+
+    def _mask(self, rids=None) -> np.ndarray:
+        alive = self.store.alive_mask()
+        if rids is None: return alive
+        mask = np.zeros(len(alive), dtype=bool); mask[np.asarray(rids, dtype=np.int64)] = True
+        return mask & alive
+
+    def order(self, cols=DEFAULT_SORT, descending=False, rids=None) -> np.ndarray:
+        # rid theo thứ tự (cols, chiều); rids != None -> chỉ giữ các dòng đó: perm[mask[perm]]
+        cols = tuple(cols)
+        perm = self._desc(cols) if descending else self._settle(cols)
+        return perm[self._mask(rids)[perm]]
+
+    # ----- chỉ mục điểm (cột số) -----
+    def sorted_values(self, col: str) -> tuple[np.ndarray, np.ndarray]:
+        # (hoán vị, giá trị tương ứng tăng dần); có thể lẫn rid đã xoá -> lọc bằng alive khi dùng
+        perm = self._settle((col,))
+        return perm, self._vals[(col,)]
+
+    def range(self, col: str, lo=None, hi=None, lo_open=False, hi_open=False, rids=None) -> np.ndarray:
+        # rid có lo <= giá trị <= hi (mở nếu *_open), theo giá trị tăng dần: O(log N + k)
+        perm, vals = self.sorted_values(col)
+        a = 0 if lo is None else int(np.searchsorted(vals, lo, "right" if lo_open else "left"))
+        b = len(vals) if hi is None else int(np.searchsorted(vals, hi, "left" if hi_open else "right"))
+        out = perm[a:b]
+        return out[self._mask(rids)[out]]
+
+    def range_size(self, col: str, lo=None, hi=None, lo_open=False, hi_open=False) -> int:
+        # cận trên số dòng trong khoảng (tính cả rid đã xoá), O(log N) -> chọn điều kiện hẹp nhất
+        _, vals = self.sorted_values(col)
+        a = 0 if lo is None else int(np.searchsorted(vals, lo, "right" if lo_open else "left"))
+        b = len(vals) if hi is None else int(np.searchsorted(vals, hi, "left" if hi_open else "right"))
+        return max(0, b - a)
+
+    def top(self, col: str, k: int, largest: bool = True, rids=None) -> np.ndarray:
+        # k dòng lớn (nhỏ) nhất, đọc từ đầu tương ứng của hoán vị; lấy dần khối gấp đôi đến khi đủ k dòng hợp lệ
+        # (lớn nhất: hoán vị giảm dần của _desc -> điểm bằng nhau vẫn theo rid tăng)
+        perm = self._desc((col,)) if largest else self.sorted_values(col)[0]; mask = self._mask(rids)
+        out = []; need = k; start = 0; step = max(2 * k, 64)
+        while need > 0 and start < len(perm):
+            chunk = perm[start:start + step]
+            hit = chunk[mask[chunk]][:need]
+            out.append(hit); need -= len(hit); start += step; step *= 2
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.int64)
+
+    # ----- người nghe của kho -----
+    def on_insert(self, rid):
+        for p in self._pending.values(): p.add(rid)
+
+    def on_update(self, rid, old):
+        for cols, p in self._pending.items():
+            if any(c in old for c in cols): p.add(rid)
+
+    def on_delete(self, rid, old): pass
+
+    def on_reset(self):
+        self._ck: dict[str, list] = {}
+        self._perms: dict[tuple, np.ndarray] = {}
+        self._descs: dict[tuple, tuple] = {}     # cols -> (hoán vị tăng dần đã dùng, hoán vị giảm dần)
+        self._vals: dict[tuple, np.ndarray] = {}
+        self._pending: dict[tuple, set[int]] = {}
+
+# ================== THEO DÕI DÒNG ĐỔI (cho bảng vẽ theo diff) ==================
+class _DirtyRows:
+    # Ghi lại rid đổi giá trị và cờ reset kể từ lần vẽ bảng trước
+    def __init__(self, store: StudentStore):
+        self.rids: set[int] = set(); self.reset = False
+        store.subscribe(self)
+
+    def on_insert(self, rid): pass
+    def on_update(self, rid, old): self.rids.add(rid)
+    def on_delete(self, rid, old): self.rids.discard(rid)
+    def on_reset(self): self.rids.clear(); self.reset = True
+
+    def take(self) -> tuple[set[int], bool]:
+        rids, reset = self.rids, self.reset
+        self.rids = set(); self.reset = False
+        return rids, reset
+
+def _lis_positions(seq) -> set[int]:
+    # Chỉ số các phần tử thuộc một dãy con tăng dài nhất (patience sorting, O(n log n))
+    tails: list[int] = []; tails_idx: list[int] = []; prev = [-1] * len(seq)
+    for i, v in enumerate(seq):
+        j = bisect.bisect_left(tails, v)
+        if j == len(tails): tails.append(v); tails_idx.append(i)
+        else: tails[j] = v; tails_idx[j] = i
+        prev[i] = tails_idx[j - 1] if j else -1
+    out = set(); k = tails_idx[-1] if tails_idx else -1
+    while k >= 0:
+        out.add(k); k = prev[k]
+    return out
 
 # ---------- AI helpers (để giữ tương thích với nền cũ) ----------
 def _ai__summarize_records(records, limit_rows=15):
@@ -117,12 +1848,12 @@ def _ai__summarize_records(records, limit_rows=15):
         return "Bảng hiện đang trống."
     ranks = {}
     for s in records:
-        xl = (s.get("xep_loai") if isinstance(s, dict) else getattr(s, "xep_loai", "")) or \
-             (s.get("xếp loại") if isinstance(s, dict) else "")
+        xl = (s.get("xep_loai") if isinstance(s, Mapping) else getattr(s, "xep_loai", "")) or \
+             (s.get("xếp loại") if isinstance(s, Mapping) else "")
         ranks[xl] = ranks.get(xl, 0) + 1
     head = []
     for i, s in enumerate(records[:limit_rows], start=1):
-        if isinstance(s, dict):
+        if isinstance(s, Mapping):
             name = s.get("ho_ten") or s.get("Họ Tên") or "?"
             clss = s.get("lop") or s.get("Lớp") or "?"
             tb = s.get("diem_tb") or s.get("Điểm TB") or 0.0
@@ -130,7 +1861,7 @@ def _ai__summarize_records(records, limit_rows=15):
             name = getattr(s, "ho_ten", "?"); clss = getattr(s, "lop", "?"); tb = getattr(s, "diem_tb", 0.0)
         try: tb = float(tb)
         except Exception: tb = 0.0
-        xl = (s.get("xep_loai") if isinstance(s, dict) else getattr(s, "xep_loai","?")) or s.get("xếp loại") if isinstance(s, dict) else "?"
+        xl = (s.get("xep_loai") if isinstance(s, Mapping) else getattr(s, "xep_loai","?")) or s.get("xếp loại") if isinstance(s, Mapping) else "?"
         head.append(f"{i}. {name} ({clss}) - TB={tb:.2f} - XL={xl}")
     return "\n".join([
         f"Số HS hiển thị: {len(records)}",
@@ -211,11 +1942,16 @@ class StudentManagerGUI:
         self.dark_mode = False
         self.buttons: list[tuple[tk.Button, str, str, str]] = []  # (btn, bg, fg, active_bg)
         self.sort_state = {}  # cột -> asc/desc
+        self.sort_spec = (DEFAULT_SORT, False)   # (bộ cột, giảm dần?) của view hiện tại
+        self._sort_saved = None  # (sort_spec, sort_state) trước truy vấn top-K, trả lại khi tìm khác/xoá tìm
         self.display_columns = ["stt","id","ho_ten","lop"] + SUBJECTS + ["diem_tb","xep_loai"]
 
-        # Dữ liệu
-        self.students = []
+        # Dữ liệu: kho + các chỉ mục/người nghe của nó (_new_data)
+        self._use_data(self._new_data(StudentStore()))
         self.next_id = 1
+        self.data_path = None            # file dữ liệu đang mở / vừa lưu (bộ lọc đã lưu nằm cạnh nó)
+        self._active_filter = None       # tên bộ lọc đã lưu đang chọn
+        self._load_saved_filters()
 
         # KPI variables
         self.kpi_total = tk.StringVar(value="0")
@@ -224,6 +1960,7 @@ class StudentManagerGUI:
         self.kpi_kha = tk.StringVar(value="0")
         self.kpi_tb = tk.StringVar(value="0")
         self.kpi_yeu = tk.StringVar(value="0")
+        self.kpi_saved = tk.StringVar(value="–")
 
         # Theme gốc
         self._setup_theme()
@@ -454,6 +2191,7 @@ class StudentManagerGUI:
         card(k, "Khá", self.kpi_kha)
         card(k, "Trung bình", self.kpi_tb)
         card(k, "Yếu", self.kpi_yeu)
+        self.kpi_saved_title = card(k, "Bộ lọc đã lưu", self.kpi_saved).winfo_children()[0]
 
     # ---------- FORM ----------
     def _build_form(self):
@@ -565,11 +2303,14 @@ class StudentManagerGUI:
         mkbtn("Xóa (Del)", self.delete_student, self.primary, ic_delete, "🗑️")
         mkbtn("Lưu (Ctrl+S)", self.save_csv, "#1565c0", ic_save, "💾")
         mkbtn("Đọc (Ctrl+O)", self.load_csv_or_xlsx, "#1565c0", ic_open, "📂")
+        mkbtn("Nhập thư mục", self.import_folder, "#1565c0", None, "🗂")
+        mkbtn("Nhập mọi sheet", self.import_all_sheets, "#1565c0", None, "📑")
         mkbtn("Xuất File", lambda: self.export_excel(subset_only=False), "#2e7d32", ic_excel, "📊")
         mkbtn("Xuất File đang hiển thị", lambda: self.export_excel(subset_only=True), "#388e3c", ic_excel, "📑")
         mkbtn("Biểu đồ", self.show_charts, "#425862", ic_chart, "📈")
         mkbtn("Biểu đồ 3 khối", self.show_block_chart, "#455a64", ic_chart, "🏫")
         mkbtn("Ẩn/Hiện cột", self.toggle_columns_dialog, "#546e7a", ic_cols, "🧩")
+        mkbtn("Kiểm tra trùng", self.check_duplicates, "#6d4c41", None, "👥")
         mkbtn("Hỏi AI (Ctrl+Q)", lambda: open_qna_window(self.root, get_subset_callable=self._get_visible_subset), "#6a1b9a", None, "🤖")
         mkbtn("Dark Mode (Ctrl+D)", self.toggle_dark_mode, self.primary, None, "🌙")
 
@@ -605,7 +2346,7 @@ class StudentManagerGUI:
         ttk.Label(sf, text="Theo:").pack(side="left", padx=(16,0))
         self.cmb_criteria = ttk.Combobox(
             sf, state="readonly", width=12,
-            values=["Tên", "Lớp", "ID", "Xếp loại"]
+            values=["Tên", "Tên (gần đúng)", "Lớp", "ID", "Xếp loại", "Biểu thức"]
         )
         self.cmb_criteria.current(0); self.cmb_criteria.pack(side="left", padx=6)
         ttk.Label(sf, text="Giá trị:").pack(side="left", padx=(10,0))
@@ -619,12 +2360,40 @@ class StudentManagerGUI:
         self.buttons.append((b_find, self.primary, "white", self.primary_dark))
 
         b_all = tk.Button(sf, text="📋 Hiển thị tất cả (F5)",
-                          command=self.refresh_table, bg=self.primary, fg="white",
+                          command=self.show_all, bg=self.primary, fg="white",
                           activebackground=self.primary_dark,
                           font=("Segoe UI", 10, "bold"), padx=10, pady=4)
         b_all.pack(side="left", padx=6)
         self.buttons.append((b_all, self.primary, "white", self.primary_dark))
 
+        # tắt cuộn ảo -> mọi dòng đều thành item (chèn dần theo lượt, không treo giao diện)
+        self.virtual_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(sf, text="Cuộn ảo", variable=self.virtual_var,
+                        command=self._toggle_virtual).pack(side="left", padx=6)
+
+        # bộ lọc đã lưu: chọn là hiện ngay (tập rid giữ sẵn), số dòng cập nhật theo dữ liệu
+        ff = ttk.Frame(self.root); ff.pack(fill="x", padx=12)
+        ttk.Label(ff, text="Bộ lọc đã lưu:").pack(side="left", padx=4)
+        self.cmb_saved = ttk.Combobox(ff, state="readonly", width=42)
+        self.cmb_saved.pack(side="left", padx=6)
+        self.cmb_saved.bind("<<ComboboxSelected>>", lambda e: self.apply_saved_filter())
+        for text, cmd, bg, abg in (("💾 Lưu bộ lọc", self.save_current_filter, "#5e35b1", "#4527a0"),
+                                   ("🗑 Xóa bộ lọc", self.delete_saved_filter, "#757575", "#616161")):
+            b = tk.Button(ff, text=text, command=cmd, bg=bg, fg="white", activebackground=abg,
+                          font=("Segoe UI", 10, "bold"), padx=10, pady=2)
+            b.pack(side="left", padx=6)
+            self.buttons.append((b, bg, "white", abg))
+
+        # tìm khi gõ: chờ ngừng gõ LIVE_DELAY_MS rồi lọc ở luồng nền
+        self._live_job = None; self._live_poll = None; self._live_gen = 0; self._live_waiting = False
+        self._live_last = None      # (tên truy vấn, version kho, fields, rids) của kết quả đã hiển thị
+        self._live_queue: queue.Queue = queue.Queue()
+        self.ent_search.bind("<KeyRelease>", lambda e: self._schedule_live_search("simple"))
+        self.cmb_criteria.bind("<<ComboboxSelected>>", lambda e: self._schedule_live_search("simple"))
+        for w in (self.ent_search_name, self.ent_search_class, self.ent_search_rank):
+            w.bind("<KeyRelease>", lambda e: self._schedule_live_search("adv"))
+        self._update_saved_filters()
+
     # ---------- TABLE ----------
     def _build_table(self):
         wrap = ttk.Frame(self.root); wrap.pack(fill="both", expand=True, padx=12, pady=6)
@@ -649,16 +2418,33 @@ class StudentManagerGUI:
         self.tree.column("diem_tb", width=95, anchor="e")
         self.tree.column("xep_loai", width=110, anchor="center")
 
-        vsb = ttk.Scrollbar(wrap, orient="vertical", command=self.tree.yview)
+        # Thanh cuộn dọc đi qua _on_vsb/_on_tree_yscroll để dùng chung cho chế độ cuộn ảo
+        self.vsb = ttk.Scrollbar(wrap, orient="vertical", command=self._on_vsb)
         hsb = ttk.Scrollbar(wrap, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll, xscrollcommand=hsb.set)
         self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
         wrap.rowconfigure(0, weight=1); wrap.columnconfigure(0, weight=1)
 
+        # trạng thái cuộn ảo: _virt_ids = rid toàn bộ view (None = bảng thường)
+        self.view_ids = np.empty(0, dtype=np.int64)   # rid các dòng của view hiện tại, theo thứ tự hiển thị
+        self._virt_ids = None
+        self._virt_start = 0        # vị trí (trong view) của item đầu tiên trong Treeview
+        self._virt_top = 0          # vị trí dòng trên cùng đang thấy
+        self._virt_sel_rid = None   # dòng đang chọn, nhớ theo rid vì item được tái sử dụng
+        self._virt_reselect = None  # rid vừa chọn lại khi dựng cửa sổ -> bỏ qua sự kiện chọn
+
+        # trạng thái bảng thường (vẽ theo diff): iid "r<rid>" -> (values, tags) đang hiển thị
+        self._shown: dict[str, tuple[list, tuple]] = {}
+        self._shown_order: list[str] = []
+        self._shown_pos: dict[str, int] = {}
+        self._stt_queue = deque(); self._stt_job = None
+        self._render = None; self._render_job = None; self._render_gen = 0   # lượt vẽ theo chunk đang chạy
+
         self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
         self.tree.bind("<Button-3>", self._on_right_click)
+        self.tree.bind("<Configure>", lambda e: self._virt_ids is not None and self._virt_render(self._virt_top))
 
         self._configure_row_tags(dark=False)
 
@@ -666,8 +2452,14 @@ class StudentManagerGUI:
     def _build_statusbar(self):
         self.status = tk.StringVar()
         bar = ttk.Frame(self.root); bar.pack(fill="x", side="bottom")
+        # thanh tiến độ + nút Hủy khi đọc file ở luồng nền (chỉ hiện lúc đang đọc)
+        self.btn_load_cancel = ttk.Button(bar, text="Hủy", width=6, command=self.cancel_load)
+        self.load_progress = ttk.Progressbar(bar, mode="determinate", maximum=100, length=220)
         ttk.Label(bar, textvariable=self.status, anchor="w").pack(fill="x", padx=12, pady=4)
-    def _set_status(self, msg): self.status.set(msg)
+        self._status_msg = ""       # thông báo gần nhất, khôi phục sau khi hết dòng tiến độ
+        self._load = None; self._load_poll = None   # lượt đọc file đang chạy (load_csv_or_xlsx)
+        self._dup = None; self._dup_poll = None     # lượt kiểm tra trùng đang chạy nền (check_duplicates)
+    def _set_status(self, msg): self._status_msg = msg; self.status.set(msg)
 
     # ---------- SHORTCUTS ----------
     def _bind_shortcuts(self):
@@ -683,7 +2475,7 @@ class StudentManagerGUI:
         self.root.bind("<Control-d>", self.toggle_dark_mode)
         self.root.bind("<Control-D>", self.toggle_dark_mode)
         self.root.bind("<Control-f>", lambda e: (self.ent_search.focus_set(), "break"))
-        self.root.bind("<F5>",        lambda e: self.refresh_table())
+        self.root.bind("<F5>",        lambda e: self.show_all())
         self.root.bind("<Control-q>", lambda e: open_qna_window(self.root, get_subset_callable=self._get_visible_subset))
 
     # ---------- HELPERS ----------
@@ -696,6 +2488,11 @@ class StudentManagerGUI:
         sel = self.tree.selection()
         if not sel: return
         vals = self.tree.item(sel[0])["values"]
+        if self._virt_ids is not None:
+            rid = self._item_rid(sel[0])
+            if rid == self._virt_reselect:
+                self._virt_reselect = None; return
+            self._virt_sel_rid = rid
         self.ent_name.delete(0, tk.END); self.ent_name.insert(0, vals[2])
         self.ent_class.delete(0, tk.END); self.ent_class.insert(0, vals[3])
         for i, subj in enumerate(SUBJECTS, start=4):
@@ -703,6 +2500,19 @@ class StudentManagerGUI:
             self.ent_scores[subj].insert(0, vals[i])
         self._set_status(f"Đang chọn ID {vals[1]}.")
 
+    def _item_rid(self, iid):
+        # rid của một item (không tra ngược theo ID – ID có thể trùng): bảng thường có iid "r<rid>",
+        # cuộn ảo: item thứ k của cửa sổ là dòng _virt_ids[_virt_start + k]
+        if self._virt_ids is not None:
+            return int(self._virt_ids[self._virt_start + self.tree.index(iid)])
+        return int(iid[1:])
+
+    def _selected_rid(self):
+        # dòng đang chọn; ở chế độ cuộn ảo dòng chọn có thể đã cuộn ra khỏi cửa sổ item
+        sel = self.tree.selection()
+        rid = self._item_rid(sel[0]) if sel else self._virt_sel_rid if self._virt_ids is not None else None
+        return rid if rid is not None and self.students.is_alive(rid) else None
+
     def _collect_scores(self):
         return {s: parse_score_any(e.get()) for s, e in self.ent_scores.items()}
 
@@ -710,17 +2520,13 @@ class StudentManagerGUI:
         # Bỏ qua cột STT vì là thứ tự hiển thị
         if col == "stt":
             return
+        self._sort_saved = None          # người dùng chọn cột -> không trả lại thứ tự trước top-K nữa
         ascending = self.sort_state.get(col, True)
-        key_fn = None
-        if col in SUBJECTS + ["diem_tb"]:
-            key_fn = lambda s: float(s.get(col, 0.0))
-        elif col in ["id"]:
-            key_fn = lambda s: int(s.get(col, 0))
-        else:
-            key_fn = lambda s: str(s.get(col, "")).lower()
-        self.students.sort(key=key_fn, reverse=not ascending)
         self.sort_state[col] = not ascending
-        self.refresh_table()
+        # hoán vị đã lưu trong SortEngine -> chỉ lọc theo view hiện tại, giữ nguyên bộ lọc
+        self.sort_spec = ((col,), not ascending)
+        full = len(self.view_ids) == len(self.students)
+        self.refresh_table(None if full else self._get_visible_subset())
         self._set_status(f"Sắp xếp theo '{col}' ({'↑' if ascending else '↓'})")
 
     def _on_right_click(self, event):
@@ -733,11 +2539,21 @@ class StudentManagerGUI:
         menu.add_separator()
         menu.add_command(label="📋 Copy hàng", command=self._copy_selected_row)
         menu.add_command(label="📋 Copy ô", command=lambda: self._copy_cell(event))
+        src = self._row_source(iid)
+        if src:
+            menu.add_separator(); menu.add_command(label=f"Nguồn: {src}", state="disabled")
         try:
             menu.tk_popup(event.x_root, event.y_root)
         finally:
             menu.grab_release()
 
+    def _row_source(self, iid):
+        # nguồn của dòng trong bảng; bảng thường: iid "r<rid>", cuộn ảo: item tái sử dụng -> tra theo ID
+        if not iid or not self.sources.names: return None
+        if self._virt_ids is None and iid.startswith("r"): rid = int(iid[1:])
+        else: rid = self.students.rid_of(int(self.tree.item(iid)["values"][1]))
+        return None if rid is None else self.sources.name_of(rid)
+
     def _copy_selected_row(self):
         sel = self.tree.selection()
         if not sel: return
@@ -771,12 +2587,10 @@ class StudentManagerGUI:
         self.refresh_table(); self._set_status(f"Đã thêm HS {name} ({lop}).")
 
     def edit_student(self):
-        sel = self.tree.selection()
-        if not sel:
+        rid = self._selected_rid()
+        if rid is None:
             messagebox.showinfo("Chọn dòng", "Chọn một học sinh trong bảng để sửa."); return
-        sid = int(self.tree.item(sel[0])["values"][1])
-        st = next((s for s in self.students if s["id"] == sid), None)
-        if not st: return
+        st = StudentRow(self.students, rid); sid = st["id"]
         name = self.ent_name.get().strip() or st["ho_ten"]
         lop  = self.ent_class.get().strip() or st["lop"]
         new_scores = self._collect_scores()
@@ -789,98 +2603,477 @@ class StudentManagerGUI:
         self.refresh_table(); self._set_status(f"Đã sửa ID {sid}.")
 
     def delete_student(self):
-        sel = self.tree.selection()
-        if not sel: return
-        sid = int(self.tree.item(sel[0])["values"][1])
-        self.students = [s for s in self.students if s["id"] != sid]
+        rid = self._selected_rid()
+        if rid is None: return
+        sid = self.students.get_value(rid, "id"); self.students.delete(rid)
         self.refresh_table(); self._set_status(f"Đã xóa ID {sid}.")
 
-    # ---------- REFRESH TABLE + KPI + HISTOGRAM ----------
-    def refresh_table(self, subset=None):
-        for i in self.tree.get_children(): self.tree.delete(i)
-
-        global TOAN_RAW, LI_RAW, HOA_RAW, VAN_RAW, ANH_RAW, TIN_RAW, TB_RAW
-        TOAN_RAW, LI_RAW, HOA_RAW = [], [], []
-        VAN_RAW, ANH_RAW, TIN_RAW = [], [], []
-        TB_RAW = []
-
-        data = subset if subset is not None else self.students
-        data.sort(key=lambda s: (s["lop"], s["ho_ten"]))
+    # ---------- REFRESH TABLE + KPI ----------
+    _RANK_TAGS = {"Giỏi": "rank_gioi", "Khá": "rank_kha", "Trung bình": "rank_tb", "Yếu": "rank_yeu"}
+
+    def _row_values(self, idx, s):
+        return [idx, s["id"], s["ho_ten"], s["lop"]] + \
+               [s[subj] for subj in SUBJECTS] + [f"{s['diem_tb']:.2f}", s["xep_loai"]]
+
+    def _row_tags(self, idx, s):
+        zebra = "evenrow" if idx % 2 == 0 else "oddrow"
+        return (zebra, self._RANK_TAGS.get(s["xep_loai"], "oddrow"))
+
+    def refresh_table(self, subset=None, ranked=False):
+        # bảng đổi nội dung -> kết quả tìm-khi-gõ đang chạy nền (nếu có) không còn hiện hành
+        self._live_gen += 1; self._live_waiting = False
+        # thứ tự lấy từ SortEngine theo cột đã chọn (mặc định lớp, họ tên), không sort lại mỗi lần;
+        # ranked=True: subset đã xếp hạng (tìm gần đúng) -> giữ nguyên thứ tự
+        if subset is None: ids = None
+        elif isinstance(subset, StudentView): ids = subset.rids
+        else: ids = np.fromiter((s.rid for s in subset), dtype=np.int64, count=len(subset))
+        self.kpi.set_view(None if ids is None else ids.tolist())
+        if ranked and ids is not None:
+            self.view_ids = ids
+        else:
+            cols, desc = self.sort_spec
+            ids = self.view_ids = self.sorter.order(cols, desc, ids)
 
-        rank_count = {"Giỏi":0,"Khá":0,"Trung bình":0,"Yếu":0}
+        if self.virtual_var.get() and len(ids) > self.VIRTUAL_THRESHOLD:
+            # làm mới sau thêm/sửa/xóa (subset=None) thì giữ vị trí cuộn và dòng đang chọn
+            keep = subset is None and self._virt_ids is not None
+            self._virt_show(ids, top=self._virt_top if keep else 0, keep_sel=keep)
+        else:
+            self._reconcile(ids.tolist())
 
-        for idx, s in enumerate(data, start=1):
-            row = [idx, s["id"], s["ho_ten"], s["lop"]] + \
-                  [s[subj] for subj in SUBJECTS] + [f"{s['diem_tb']:.2f}", s["xep_loai"]]
+        self._update_kpis()
 
-            rank_tag = {
-                "Giỏi": "rank_gioi",
-                "Khá": "rank_kha",
-                "Trung bình": "rank_tb",
-                "Yếu": "rank_yeu"
-            }.get(s["xep_loai"], "oddrow")
-            rank_count[s["xep_loai"]] = rank_count.get(s["xep_loai"],0) + 1
+        # theme row tags
+        self._configure_row_tags(self.dark_mode)
 
-            zebra = "evenrow" if idx % 2 == 0 else "oddrow"
-            self.tree.insert("", "end", values=row, tags=(zebra, rank_tag))
+    # ---------- BẢNG ẢO (chỉ giữ các dòng đang thấy + vùng đệm làm item) ----------
+    VIRTUAL_THRESHOLD = 5000   # view lớn hơn ngưỡng này -> cuộn ảo
+    VIRTUAL_BUFFER = 40        # số dòng đệm trên/dưới vùng đang thấy
+
+    def _toggle_virtual(self):
+        full = len(self.view_ids) == len(self.students)
+        self.refresh_table(None if full else self._get_visible_subset())
+
+    def _virt_visible_rows(self) -> int:
+        try: rh = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (TypeError, ValueError): rh = 20
+        h = self.tree.winfo_height()
+        return max(int(self.tree.cget("height")), (h - 24) // rh if h > 1 else 0)
+
+    def _virt_show(self, ids, top=0, keep_sel=False):
+        self._cancel_render()
+        if self._virt_ids is None:      # rời bảng thường: item sẽ được tái dùng làm slot
+            self._shown.clear(); self._shown_order = []; self._shown_pos = {}
+        self._dirty.take()
+        self._virt_ids = ids
+        if not keep_sel: self._virt_sel_rid = None
+        self._virt_start = -1          # ép dựng lại cửa sổ
+        self._virt_render(top)
+
+    def _virt_render(self, top, from_tree=False):
+        ids = self._virt_ids; n = len(ids)
+        vis = self._virt_visible_rows(); buf = self.VIRTUAL_BUFFER
+        top = max(0, min(int(top), max(0, n - vis)))
+        start = self._virt_start; end = start + len(self.tree.get_children())
+        margin = buf // 2
+        if start < 0 or top < start or top + vis > end or \
+           (start > 0 and top < start + margin) or (end < n and top + vis > end - margin):
+            start = max(0, top - buf)
+            self._virt_fill(start, min(n, top + vis + buf))
+            self.tree.yview_moveto((top - start) / max(1, len(self.tree.get_children())))
+        elif not from_tree:
+            self.tree.yview_moveto((top - start) / max(1, end - start))
+        self._virt_top = top
+        self.vsb.set(top / max(1, n), min(1.0, (top + vis) / max(1, n)))
+
+    def _virt_fill(self, start, end):
+        # tái sử dụng item: chỉ đổi values/tags, thêm/bớt cho đủ số dòng cửa sổ
+        items = list(self.tree.get_children())
+        count = end - start
+        if len(items) > count:
+            self.tree.delete(*items[count:]); del items[count:]
+        sel_rid = self._virt_sel_rid
+        if sel_rid is not None and not self.students.is_alive(sel_rid):
+            sel_rid = self._virt_sel_rid = None
+        sel_iid = None
+        for k in range(count):
+            pos = start + k
+            s = StudentRow(self.students, int(self._virt_ids[pos]))
+            vals = self._row_values(pos + 1, s); tags = self._row_tags(pos + 1, s)
+            if k < len(items): self.tree.item(items[k], values=vals, tags=tags)
+            else: items.append(self.tree.insert("", "end", values=vals, tags=tags))
+            if s.rid == sel_rid: sel_iid = items[k]
+        self._virt_start = start
+        # giữ lựa chọn theo rid, không theo item
+        if sel_iid is not None:
+            if self.tree.selection() != (sel_iid,):
+                self._virt_reselect = sel_rid
+                self.tree.selection_set(sel_iid)
+            self.tree.focus(sel_iid)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+    def _on_vsb(self, *args):
+        if self._virt_ids is None:
+            return self.tree.yview(*args)
+        n = len(self._virt_ids); vis = self._virt_visible_rows()
+        if args[0] == "moveto":
+            top = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            top = self._virt_top + int(args[1]) * (vis if args[2] == "pages" else 1)
+        else:
+            return
+        self._virt_render(top)
+
+    def _on_tree_yscroll(self, first, last):
+        # Treeview tự cuộn trong cửa sổ (lăn chuột, phím mũi tên) -> quy về vị trí trong view
+        if self._virt_ids is None:
+            self.vsb.set(first, last); return
+        count = len(self.tree.get_children())
+        self._virt_render(self._virt_start + int(round(float(first) * count)), from_tree=True)
+
+    # ---------- BẢNG THƯỜNG: VẼ THEO DIFF ----------
+    RENDER_BUDGET_MS = 30      # thời gian tối đa mỗi lượt chèn dòng, hết giờ thì nhường mainloop
+    RENDER_CHUNK = 200         # số dòng giữa hai lần xem đồng hồ
+
+    def _reconcile(self, rids):
+        # So view mới với các dòng đang hiển thị: chỉ xóa/thêm/chuyển/sửa dòng thay đổi.
+        # Phần thêm/chuyển chạy theo lượt (after) nên view lớn không treo giao diện;
+        # STT + zebra của các dòng bị dời chỗ: phần đang thấy sửa ngay, phần còn lại sửa dần.
+        self._cancel_render()
+        tree = self.tree
+        dirty, reset = self._dirty.take()
+        if reset or self._virt_ids is not None:
+            if tree.get_children(): tree.delete(*tree.get_children())
+            self._shown.clear(); self._shown_order = []
+        self._virt_ids = None
+
+        new = [f"r{r}" for r in rids]
+        new_pos = {iid: i for i, iid in enumerate(new)}
+        old = self._shown_order
+        gone = [iid for iid in old if iid not in new_pos]
+        if gone:
+            tree.delete(*gone)
+            for iid in gone: del self._shown[iid]
+        kept = [iid for iid in old if iid in new_pos]
+        stay = {kept[k] for k in _lis_positions([new_pos[iid] for iid in kept])}
+        moved = [iid for iid in kept if iid not in stay]
+        if moved: tree.detach(*moved)
+
+        self._render_gen += 1
+        self._render = {"gen": self._render_gen, "rids": rids, "new": new, "new_pos": new_pos,
+                        "stay": stay, "moved": set(moved), "dirty": dirty, "i": 0, "steps": 0}
+        self._render_step(self._render_gen)
+
+    def _render_step(self, gen):
+        job = self._render; self._render_job = None
+        if job is None or job["gen"] != gen: return
+        if self._dirty.reset:           # kho vừa được nạp lại: rid của lượt vẽ này đã vô nghĩa
+            self._cancel_render(); return
+        tree = self.tree; store = self.students
+        new, rids, stay, moved = job["new"], job["rids"], job["stay"], job["moved"]
+        i, n = job["i"], len(new)
+        deadline = time.perf_counter() + self.RENDER_BUDGET_MS / 1000
+        while i < n:
+            stop = min(n, i + self.RENDER_CHUNK)
+            for k in range(i, stop):
+                iid = new[k]
+                if iid in stay: continue
+                if iid in moved:
+                    tree.move(iid, "", k); moved.discard(iid)
+                else:
+                    s = StudentRow(store, rids[k])
+                    vals = self._row_values(k + 1, s); tags = self._row_tags(k + 1, s)
+                    tree.insert("", k, iid=iid, values=vals, tags=tags)
+                    self._shown[iid] = (vals, tags)
+            i = stop
+            if time.perf_counter() >= deadline: break
+        job["i"] = i
+        if i < n:
+            job["steps"] += 1
+            self.status.set(f"Đang hiển thị {i:,}/{n:,} dòng...")
+            self._render_job = self.root.after(1, self._render_step, gen)
+            return
 
-            TOAN_RAW.append(s["toan"]); LI_RAW.append(s["ly"]); HOA_RAW.append(s["hoa"])
-            VAN_RAW.append(s["van"]); ANH_RAW.append(s["anh"]); TIN_RAW.append(s["tin"])
-            TB_RAW.append(s["diem_tb"])
+        self._render = None
+        new_pos = job["new_pos"]
+        for rid in job["dirty"]:
+            iid = f"r{rid}"
+            if iid in self._shown and store.is_alive(rid):
+                pos = new_pos[iid]; s = StudentRow(store, rid)
+                vals = self._row_values(pos + 1, s); tags = self._row_tags(pos + 1, s)
+                tree.item(iid, values=vals, tags=tags); self._shown[iid] = (vals, tags)
+        self._shown_order = new; self._shown_pos = new_pos
+        if job["steps"]: self.status.set(self._status_msg)
+
+        shifted = [iid for i, iid in enumerate(new) if self._shown[iid][0][0] != i + 1]
+        if shifted:
+            try: first, last = tree.yview()
+            except Exception: first, last = 0.0, 1.0
+            lo = int(float(first) * len(new)) - 5; hi = int(float(last) * len(new)) + 5
+            now = [iid for iid in shifted if lo <= new_pos[iid] <= hi]
+            self._fix_positions(now)
+            self._stt_queue.extend(shifted)
+            if self._stt_job is None:
+                self._stt_job = self.root.after(1, self._renumber_step)
+
+    def _cancel_render(self):
+        # Dừng lượt vẽ dở (tìm kiếm/nạp mới): cây giữ new[:i] + các dòng đứng yên,
+        # dòng đã tách ra mà chưa gắn lại thì xóa hẳn để _shown khớp với cây.
+        job = self._render
+        if job is None: return
+        self._render = None
+        if self._render_job is not None:
+            self.root.after_cancel(self._render_job); self._render_job = None
+        if job["moved"]:
+            self.tree.delete(*job["moved"])
+            for iid in job["moved"]: del self._shown[iid]
+        self._shown_order = list(self.tree.get_children())
+        self._shown_pos = {iid: k for k, iid in enumerate(self._shown_order)}
+        if not self._dirty.reset: self._dirty.rids.update(job["dirty"])
+        if job["steps"]: self.status.set(self._status_msg)
+
+    def _fix_positions(self, iids):
+        for iid in iids:
+            pos = self._shown_pos.get(iid)
+            if pos is None: continue
+            vals, tags = self._shown[iid]
+            if vals[0] == pos + 1: continue
+            vals = [pos + 1] + vals[1:]
+            tags = ("evenrow" if (pos + 1) % 2 == 0 else "oddrow", tags[1])
+            self.tree.item(iid, values=vals, tags=tags); self._shown[iid] = (vals, tags)
+
+    def _renumber_step(self):
+        self._stt_job = None
+        if self._virt_ids is not None:
+            self._stt_queue.clear(); return
+        n = min(500, len(self._stt_queue))
+        self._fix_positions([self._stt_queue.popleft() for _ in range(n)])
+        if self._stt_queue:
+            self._stt_job = self.root.after(1, self._renumber_step)
+
+    def _update_kpis(self):
+        # O(1): chỉ đọc bộ đếm của KpiAggregator
+        counts = self.kpi.current()
+        self.kpi_total.set(str(len(self.students)))
+        self.kpi_visible.set(str(self.kpi.visible()))
+        self.kpi_gioi.set(str(counts.get("Giỏi",0)))
+        self.kpi_kha.set(str(counts.get("Khá",0)))
+        self.kpi_tb.set(str(counts.get("Trung bình",0)))
+        self.kpi_yeu.set(str(counts.get("Yếu",0)))
+        self._update_saved_filters()
 
-        update_histograms_from_raw()
+    # ---------- TÌM KIẾM THƯỜNG ----------
+    _CRIT_COLS = {"Tên": "ho_ten", "Lớp": "lop", "Xếp loại": "xep_loai"}
 
-        # KPI update
-        self.kpi_total.set(str(len(self.students)))
-        self.kpi_visible.set(str(len(data)))
-        self.kpi_gioi.set(str(rank_count.get("Giỏi",0)))
-        self.kpi_kha.set(str(rank_count.get("Khá",0)))
-        self.kpi_tb.set(str(rank_count.get("Trung bình",0)))
-        self.kpi_yeu.set(str(rank_count.get("Yếu",0)))
+    def _restore_sort(self):
+        # bỏ thứ tự tạm của kết quả top-K -> cột/chiều sắp đã chọn trước đó
+        if self._sort_saved is None: return
+        self.sort_spec, self.sort_state = self._sort_saved; self._sort_saved = None
 
-        # theme row tags
-        self._configure_row_tags(self.dark_mode)
+    def show_all(self):
+        self._restore_sort(); self.refresh_table()
 
-    # ---------- TÌM KIẾM THƯỜNG ----------
     def search_student(self):
         crit = self.cmb_criteria.get(); q = self.ent_search.get().strip()
+        self._restore_sort()
         if not q:
             self.refresh_table(); self._set_status("Hiển thị tất cả."); return
 
-        if crit == "Tên":
-            ql = q.lower(); filtered = [s for s in self.students if ql in s["ho_ten"].lower()]
-        elif crit == "Lớp":
-            ql = q.lower(); filtered = [s for s in self.students if ql in s["lop"].lower()]
+        if crit in self._CRIT_COLS:
+            filtered = self.students.view(filter_rids(self.students, {self._CRIT_COLS[crit]: fold_vn(q)}))
         elif crit == "ID":
             try:
-                qid = int(q); filtered = [s for s in self.students if s["id"] == qid]
+                qid = int(q); st = self.students.by_id(qid); filtered = self.students.view([st.rid] if st else [])
             except ValueError:
                 messagebox.showwarning("ID không hợp lệ", "Nhập số nguyên cho ID."); return
-        elif crit == "Xếp loại":
-            ql = q.lower(); filtered = [s for s in self.students if ql in s["xep_loai"].lower()]
+        elif crit == "Tên (gần đúng)":
+            # sai chính tả / thiếu dấu: xếp theo độ gần, tên gần nhất lên đầu
+            filtered = StudentView(self.students, self.fuzzy.search_rids(q))
+            self.refresh_table(filtered, ranked=True)
+            self._set_status(f"Tìm gần đúng '{q}' → {len(filtered)} kết quả (gần nhất trước)."); return
+        elif crit == "Biểu thức":
+            try:
+                top = parse_top_query(q)
+                if top is None:
+                    filtered = StudentView(self.students, filter_expr_rids(self.students, q, self.sorter))
+                else:
+                    # xếp hạng: đọc k dòng từ đầu chỉ mục điểm, hiển thị theo đúng cột/chiều đó
+                    # (chỉ cho kết quả này: tìm khác hoặc xoá ô tìm thì trả lại thứ tự cũ)
+                    col, k, largest, where = top
+                    base = filter_expr_rids(self.students, where, self.sorter) if where else None
+                    filtered = StudentView(self.students, self.sorter.top(col, k, largest, base))
+                    self._sort_saved = (self.sort_spec, dict(self.sort_state))
+                    self.sort_spec = ((col,), largest); self.sort_state[col] = largest
+            except FilterSyntaxError as e:
+                messagebox.showwarning("Biểu thức không hợp lệ", f"{e}\n\nVí dụ: toan >= 8 and van < 5 and lop ^= 11")
+                return
         else:
-            filtered = self.students
+            filtered = self.students.view()
 
         self.refresh_table(filtered)
         self._set_status(f"Tìm theo {crit}='{q}' → {len(filtered)} kết quả.")
 
     # ---------- TÌM KIẾM NÂNG CAO ----------
     def advanced_search(self):
-        qname  = self.ent_search_name.get().strip().lower()
-        qclass = self.ent_search_class.get().strip().lower()
-        qrank  = self.ent_search_rank.get().strip().lower()
-
-        filtered = []
-        for s in self.students:
-            ok = True
-            if qname  and qname  not in s["ho_ten"].lower(): ok = False
-            if qclass and qclass not in s["lop"].lower():    ok = False
-            if qrank  and qrank  not in s["xep_loai"].lower(): ok = False
-            if ok: filtered.append(s)
+        # giao các tập rid từ chỉ mục phụ (tên qua trigram, lớp, xếp loại)
+        self._restore_sort()
+        filtered = self.students.view(filter_rids(self.students, self._adv_fields()))
 
         self.refresh_table(filtered)
         self._set_status(f"Tìm nâng cao → {len(filtered)} kết quả.")
 
+    def _adv_fields(self) -> dict[str, str]:
+        return {"ho_ten": fold_vn(self.ent_search_name.get()),
+                "lop": fold_vn(self.ent_search_class.get()),
+                "xep_loai": fold_vn(self.ent_search_rank.get())}
+
+    # ---------- BỘ LỌC ĐÃ LƯU ----------
+    _EXPR_FIELDS = {"ho_ten": "ten", "lop": "lop", "xep_loai": "xl"}   # cột -> tên trong biểu thức lọc
+
+    def _filters_path(self, data_path=False) -> str:
+        # <file dữ liệu>.filters.json (mặc định file đang mở); chưa mở file nào -> saved_filters.json cạnh chương trình
+        if data_path is False: data_path = self.data_path
+        if data_path: return os.path.splitext(data_path)[0] + ".filters.json"
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_filters.json")
+
+    def _load_saved_filters(self):
+        # file dữ liệu mới chưa có bộ lọc riêng -> giữ danh sách đang dùng
+        path = self._filters_path()
+        if not os.path.exists(path): return
+        try: self.saved.load(path)
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("Bộ lọc đã lưu", f"Không đọc được {path}:\n{e}")
+        if self._active_filter not in self.saved.filters: self._active_filter = None
+
+    def _write_saved_filters(self):
+        try: self.saved.save(self._filters_path())
+        except OSError as e:
+            messagebox.showerror("Lỗi", f"Không lưu được bộ lọc:\n{e}")
+
+    def _current_filter_expr(self) -> str | None:
+        # điều kiện đang nhập -> biểu thức lọc (ô "Theo/Giá trị" trước, rồi các ô tìm nâng cao)
+        def cond(col, v): return f"{self._EXPR_FIELDS[col]} ~ " + (f"'{v}'" if '"' in v else f'"{v}"')
+        crit = self.cmb_criteria.get(); q = self.ent_search.get().strip()
+        if q:
+            if crit == "Biểu thức": return q
+            if crit not in self._CRIT_COLS and crit != "ID":
+                raise FilterSyntaxError(f"Không lưu được kiểu tìm '{crit}' thành bộ lọc.")
+            if crit == "ID": return f"id = {q}"
+            return cond(self._CRIT_COLS[crit], q)
+        return " and ".join(cond(c, v) for c, v in self._adv_fields().items() if v) or None
+
+    def save_current_filter(self):
+        try:
+            expr = self._current_filter_expr()
+            if not expr:
+                messagebox.showinfo("Lưu bộ lọc", "Nhập điều kiện tìm kiếm (hoặc chọn 'Biểu thức') trước khi lưu."); return
+            if parse_top_query(expr) is not None:
+                raise FilterSyntaxError("Không lưu được truy vấn 'top'; hãy lưu phần điều kiện lọc.")
+            compile_filter(expr)
+        except FilterSyntaxError as e:
+            messagebox.showwarning("Biểu thức không hợp lệ", str(e)); return
+        name = simpledialog.askstring("Lưu bộ lọc", f"Tên cho bộ lọc:\n{expr}", parent=self.root)
+        if not name or not name.strip(): return
+        name = name.strip()
+        if name in self.saved.filters and not messagebox.askyesno("Lưu bộ lọc", f"Ghi đè bộ lọc '{name}'?"): return
+        self.saved.add(name, expr); self._write_saved_filters()
+        self._active_filter = name
+        self._update_saved_filters()
+        self._set_status(f"Đã lưu bộ lọc '{name}': {expr}")
+
+    def delete_saved_filter(self):
+        name = self._active_filter
+        if name is None: return
+        if not messagebox.askyesno("Xóa bộ lọc", f"Xóa bộ lọc '{name}'?"): return
+        self.saved.remove(name); self._write_saved_filters()
+        self._active_filter = None
+        self._update_saved_filters()
+        self._set_status(f"Đã xóa bộ lọc '{name}'.")
+
+    def apply_saved_filter(self):
+        i = self.cmb_saved.current(); names = self.saved.names()
+        if not 0 <= i < len(names): return
+        f = self.saved.get(names[i]); self._active_filter = f.name
+        rids = f.rids()
+        self.refresh_table(StudentView(self.students, np.fromiter(rids, dtype=np.int64, count=len(rids))))
+        self._set_status(f"Bộ lọc '{f.name}' ({f.expr}) → {len(rids)} kết quả.")
+
+    def _update_saved_filters(self):
+        # số dòng của từng bộ lọc (đọc tập giữ sẵn) -> combobox + thẻ KPI
+        names = self.saved.names()
+        self.cmb_saved["values"] = [f"{n} ({len(self.saved.get(n)):,})" for n in names]
+        if self._active_filter in names:
+            self.cmb_saved.current(names.index(self._active_filter))
+            self.kpi_saved.set(str(len(self.saved.get(self._active_filter))))
+            self.kpi_saved_title.configure(text=f"Bộ lọc: {self._active_filter}")
+        else:
+            self.cmb_saved.set(""); self.kpi_saved.set("–")
+            self.kpi_saved_title.configure(text="Bộ lọc đã lưu")
+
+    # ---------- TÌM KHI GÕ (debounce + luồng nền) ----------
+    LIVE_DELAY_MS = 250          # ngừng gõ bao lâu thì mới lọc
+    LIVE_POLL_MS = 30            # chu kỳ nhận kết quả từ luồng nền
+    LIVE_NARROW_MAX = 50_000     # kết quả cũ lớn hơn thì tra chỉ mục lại nhanh hơn lọc từng dòng
+
+    def _schedule_live_search(self, kind):
+        if self._live_job is not None: self.root.after_cancel(self._live_job)
+        self._live_job = self.root.after(self.LIVE_DELAY_MS, self._start_live_search, kind)
+
+    def _live_spec(self, kind):
+        if kind == "adv": return "adv", self._adv_fields()
+        col = self._CRIT_COLS.get(self.cmb_criteria.get())
+        if col is None: return None          # ID / Biểu thức: chỉ tìm khi bấm nút
+        return self.cmb_criteria.get(), {col: fold_vn(self.ent_search.get())}
+
+    def _start_live_search(self, kind):
+        self._live_job = None
+        spec = self._live_spec(kind)
+        if spec is None: return
+        name, fields = spec
+        store = self.students; version = store.version; last = self._live_last
+        if last and last[0] == name and last[1] == version and last[2] == fields:
+            return                             # phím không đổi nội dung (mũi tên, Shift...)
+        base = None
+        if last and last[0] == name and last[1] == version and last[3] is not None \
+           and len(last[3]) <= self.LIVE_NARROW_MAX and is_refinement(last[2], fields):
+            base = last[3]
+        self._live_gen += 1; gen = self._live_gen
+
+        def work():
+            try: rids = filter_rids(store, fields, base)
+            except Exception as e: rids = e     # lỗi thật -> báo ở luồng Tk
+            self._live_queue.put((gen, version, kind, name, fields, rids))
+        threading.Thread(target=work, daemon=True).start()
+        self._live_waiting = True
+        if self._live_poll is None:
+            self._live_poll = self.root.after(self.LIVE_POLL_MS, self._poll_live)
+
+    def _poll_live(self):
+        self._live_poll = None
+        while True:
+            try: gen, version, kind, name, fields, rids = self._live_queue.get_nowait()
+            except queue.Empty: break
+            if gen != self._live_gen: continue              # đã có truy vấn/hiển thị mới hơn
+            self._live_waiting = False
+            if version != self.students.version:            # dữ liệu đổi khi đang lọc -> lọc lại
+                self._live_last = None; self._start_live_search(kind); continue
+            if isinstance(rids, Exception):
+                self._live_last = None
+                self._set_status("Tìm nhanh lỗi."); messagebox.showerror("Lỗi", f"Tìm nhanh thất bại:\n{rids}")
+                continue
+            self._apply_live(name, fields, rids)
+        if self._live_waiting:
+            self._live_poll = self.root.after(self.LIVE_POLL_MS, self._poll_live)
+
+    def _apply_live(self, name, fields, rids):
+        self._live_last = (name, self.students.version, fields, rids)
+        self._restore_sort()
+        if rids is None:
+            self.refresh_table(); self._set_status("Hiển thị tất cả."); return
+        self.refresh_table(self.students.view(rids))
+        self._set_status(f"Tìm nhanh → {len(rids)} kết quả.")
+
     # ---------- CSV / XLSX ----------
     def save_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv",
@@ -899,110 +3092,167 @@ class StudentManagerGUI:
                 for s in self.students: w.writerow([s[c] for c in cols_en])
             messagebox.showinfo("Thành công", f"Đã lưu {len(self.students)} HS vào:\n{path}")
             self._set_status(f"Đã lưu CSV: {path}")
+            self.data_path = path
+            if self.saved.filters: self._write_saved_filters()
         except Exception as e:
             messagebox.showerror("Lỗi", str(e))
 
+    # đọc + dựng kho ở luồng nền: dữ liệu cũ giữ nguyên đến khi xong, rồi đổi sang kho mới một lần
+    LOAD_POLL_MS = 100
+
     def load_csv_or_xlsx(self):
         path = filedialog.askopenfilename(filetypes=[("CSV/XLSX","*.csv *.xlsx"), ("CSV","*.csv"), ("Excel","*.xlsx"), ("All files","*.*")])
         if not path: return
-        ext = os.path.splitext(path)[1].lower()
-        try:
-            if ext == ".xlsx":
-                self._load_xlsx(path)
-            else:
-                self._load_csv(path)
-        except Exception as e:
-            messagebox.showerror("Lỗi", str(e))
-
-    def _load_csv(self, path):
-        self.students.clear()
-        with open(path, "r", encoding="utf-8-sig", newline="") as f:
-            sample = f.read(4096); f.seek(0)
+        xlsx = os.path.splitext(path)[1].lower() == ".xlsx"
+        reader = read_xlsx_columns if xlsx else read_csv_columns_parallel
+        self._start_load(lambda progress: reader(path, progress), os.path.basename(path),
+                         f"Đã đọc {'Excel' if xlsx else 'CSV'}: {path}", path)
+
+    def import_folder(self):
+        # mỗi lớp một file (.xlsx/.csv, mọi sheet) -> đọc song song rồi ghép
+        folder = filedialog.askdirectory(title="Chọn thư mục bảng điểm các lớp")
+        if not folder: return
+        paths = list_import_files(folder)
+        if not paths:
+            messagebox.showinfo("Nhập thư mục", "Thư mục không có file .xlsx/.csv."); return
+        self._start_load(lambda progress: import_sources(paths, progress), os.path.basename(folder),
+                         f"Đã nhập {len(paths)} file từ {folder}", None)
+
+    def import_all_sheets(self):
+        # mỗi lớp một sheet -> đọc các sheet song song rồi ghép
+        path = filedialog.askopenfilename(filetypes=[("Excel","*.xlsx")])
+        if not path: return
+        self._start_load(lambda progress: import_workbook_sheets(path, progress), os.path.basename(path),
+                         f"Đã nhập mọi sheet: {path}", None)
+
+    def _start_load(self, read, label, done_msg, data_path):
+        # read(progress) -> cột cho load_columns, chạy ở luồng nền; data_path: file dữ liệu sau khi nạp.
+        # Kho mới + chỉ mục cũng dựng ở luồng nền (_build_data); luồng Tk chỉ đổi tham chiếu (_install_data).
+        if self._load is not None:
+            messagebox.showinfo("Đang đọc", "Đang đọc một file khác – chờ xong hoặc bấm Hủy."); return
+        self._cancel_duplicates()               # kết quả đang tính sẽ thuộc dữ liệu cũ
+        cancel = threading.Event(); q: queue.Queue = queue.Queue()
+        sort_spec = self.sort_spec; filters_path = self._filters_path(data_path)
+        keep_filters = [(f.name, f.expr) for f in self.saved.filters.values()]
+
+        def progress(rows, done, total):
+            if cancel.is_set(): raise LoadCancelled
+            q.put(("progress", rows, done, total))
+
+        def work():
+            t0 = time.perf_counter()
             try:
-                dialect = csv.Sniffer().sniff(sample, delimiters=";,")
-                delimiter = dialect.delimiter
-            except Exception:
-                delimiter = ";"
-            reader = csv.DictReader(f, delimiter=delimiter, quotechar='"')
-            vi_to_en = {
-                "id":"id","họ tên":"ho_ten","ho ten":"ho_ten",
-                "lớp":"lop","lop":"lop","toán":"toan","toan":"toan",
-                "lý":"ly","ly":"ly","hóa":"hoa","hoa":"hoa",
-                "văn":"van","van":"van","anh":"anh","tin":"tin",
-                "điểm tb":"diem_tb","diem tb":"diem_tb",
-                "xếp loại":"xep_loai","xep loai":"xep_loai"
-            }
-            file_fields = reader.fieldnames or []
-            field_map = {}
-            for h in file_fields:
-                k = (h or "").strip().lower()
-                en = vi_to_en.get(k)
-                if not en and k in ["id","ho_ten","lop","toan","ly","hoa","van","anh","tin","diem_tb","xep_loai"]:
-                    en = k
-                if en: field_map[h] = en
-
-            for row in reader:
-                get = lambda en_key: next((row[h] for h, en in field_map.items() if en == en_key), "")
-                sc = {s: parse_score_any(get(s)) for s in SUBJECTS}
-                avg = wavg(sc); xl = classify(avg)
-                id_val = get("id")
-                try: id_int = int(float(id_val)) if id_val != "" else len(self.students)+1
-                except: id_int = len(self.students)+1
-                self.students.append({
-                    "id": id_int,
-                    "ho_ten": (get("ho_ten") or "").strip(),
-                    "lop": (get("lop") or "").strip(),
-                    **sc, "diem_tb": round(avg, 2), "xep_loai": xl
-                })
-        self.next_id = max((s["id"] for s in self.students), default=0) + 1
-        self.refresh_table()
-        self._set_status(f"Đã đọc CSV: {path}")
-
-    def _load_xlsx(self, path):
-        self.students.clear()
-        wb = load_workbook(path, data_only=True)
-        ws = wb.active
-        # Lấy header
-        headers = []
-        for c in ws[1]:
-            headers.append((c.value or "").strip() if isinstance(c.value, str) else str(c.value or ""))
-        vi_to_en = {
-            "id":"id","họ tên":"ho_ten","ho ten":"ho_ten",
-            "lớp":"lop","lop":"lop","toán":"toan","toan":"toan",
-            "lý":"ly","ly":"ly","hóa":"hoa","hoa":"hoa",
-            "văn":"van","van":"van","anh":"anh","tin":"tin",
-            "điểm tb":"diem_tb","diem tb":"diem_tb",
-            "xếp loại":"xep_loai","xep loai":"xep_loai"
-        }
-        # map cột
-        col_map = {}
-        for idx, h in enumerate(headers):
-            k = h.strip().lower()
-            en = vi_to_en.get(k) or (k if k in ["id","ho_ten","lop","toan","ly","hoa","van","anh","tin","diem_tb","xep_loai"] else None)
-            if en:
-                col_map[idx] = en
-
-        for r in ws.iter_rows(min_row=2, values_only=True):
-            row = {col_map[i]: r[i] for i in col_map.keys() if i < len(r)}
-            get = lambda en_key, default="": row.get(en_key, default)
-            sc = {s: parse_score_any(get(s, 0)) for s in SUBJECTS}
-            avg = wavg(sc); xl = classify(avg)
-            id_val = get("id")
-            try: id_int = int(float(id_val)) if id_val not in ("", None) else len(self.students)+1
-            except: id_int = len(self.students)+1
-            self.students.append({
-                "id": id_int,
-                "ho_ten": (str(get("ho_ten") or "")).strip(),
-                "lop": (str(get("lop") or "")).strip(),
-                **sc, "diem_tb": round(avg, 2), "xep_loai": xl
-            })
-        self.next_id = max((s["id"] for s in self.students), default=0) + 1
+                cols = read(progress)
+                if cancel.is_set(): raise LoadCancelled
+                q.put(("build", len(cols["id"])))
+                data, err = self._build_data(cols, sort_spec, filters_path, keep_filters)
+                if cancel.is_set(): raise LoadCancelled
+                q.put(("done", cols, data, err, time.perf_counter() - t0))
+            except LoadCancelled: q.put(("cancelled",))
+            except Exception as e: q.put(("error", e))
+
+        self._load = {"label": label, "msg": done_msg, "path": data_path, "cancel": cancel, "queue": q}
+        self.load_progress["value"] = 0
+        self.btn_load_cancel.pack(side="right", padx=(4, 12), pady=2)
+        self.load_progress.pack(side="right", pady=2)
+        self.status.set(f"Đang đọc {label}...")
+        threading.Thread(target=work, daemon=True).start()
+        self._load_poll = self.root.after(self.LOAD_POLL_MS, self._poll_load)
+
+    def cancel_load(self):
+        # nút Hủy cạnh thanh tiến độ: lượt đọc file, hoặc lượt kiểm tra trùng nếu không đang đọc
+        if self._load is not None:
+            self._load["cancel"].set(); self.status.set("Đang hủy đọc file...")
+        elif self._dup is not None:
+            self._dup["cancel"].set(); self.status.set("Đang hủy kiểm tra trùng...")
+
+    def _poll_load(self):
+        self._load_poll = None
+        job = self._load; result = None
+        while True:
+            try: msg = job["queue"].get_nowait()
+            except queue.Empty: break
+            if msg[0] == "build":
+                if not job["cancel"].is_set():
+                    self.load_progress["value"] = 100
+                    self.status.set(f"Đang dựng chỉ mục {job['label']}: {msg[1]:,} dòng...")
+                continue
+            if msg[0] != "progress": result = msg; continue
+            _, rows, done, total = msg
+            if job["cancel"].is_set(): continue
+            self.load_progress["value"] = 100 * done / total if total else 0
+            self.status.set(f"Đang đọc {job['label']}: {rows:,} dòng"
+                            + (f" ({100 * done / total:.0f}%)" if total else ""))
+        if result is None:
+            self._load_poll = self.root.after(self.LOAD_POLL_MS, self._poll_load); return
+        self._load = None
+        if self._dup is None: self.load_progress.pack_forget(); self.btn_load_cancel.pack_forget()
+        if result[0] == "cancelled":
+            self._set_status("Đã hủy đọc file – dữ liệu cũ giữ nguyên."); return
+        if result[0] == "error":
+            self.status.set(self._status_msg)
+            messagebox.showerror("Lỗi", f"Không đọc được file (dữ liệu cũ giữ nguyên):\n{result[1]}"); return
+        _, cols, data, err, dt = result
+        self._install_data(data, cols, job["msg"], dt)
+        self.data_path = job["path"]
+        if err is not None:
+            messagebox.showwarning("Bộ lọc đã lưu", f"Không đọc được {self._filters_path()}:\n{err}")
+        if self._active_filter not in self.saved.filters: self._active_filter = None
+        self._update_saved_filters()
+        if cols.get("loi"):
+            messagebox.showwarning("Nhập dữ liệu", f"Bỏ qua {len(cols['loi'])} nguồn không đọc được:\n"
+                                   + "\n".join(f"• {s}: {e}" for s, e in cols["loi"][:15]))
+        self.check_duplicates(auto=True)       # chạy nền, bảng dùng được ngay
+
+    @staticmethod
+    def _new_data(store: StudentStore) -> dict:
+        # kho + mọi chỉ mục/người nghe của nó (thuộc tính GUI -> đối tượng), đăng ký theo thứ tự này
+        return {"students": store, "kpi": KpiAggregator(store), "hist": ScoreHistograms(store),
+                "sorter": SortEngine(store), "fuzzy": FuzzyNameIndex(store), "_dirty": _DirtyRows(store),
+                "sources": ImportSources(store),   # file/sheet gốc của từng dòng khi nhập nhiều nguồn
+                "saved": SavedFilters(store)}
+
+    @classmethod
+    def _build_data(cls, cols, sort_spec, filters_path, keep_filters):
+        # luồng nền: kho mới nạp cols + chỉ mục, bộ lọc đã lưu của file mới (không có/đọc lỗi -> giữ
+        # keep_filters) đã đếm sẵn, hoán vị theo cột đang sắp. Không đụng tới đối tượng của luồng Tk.
+        data = cls._new_data(StudentStore())
+        data["students"].load_columns(cols)
+        if "nguon" in cols: data["sources"].set(*cols["nguon"])
+        saved = data["saved"]; err = None; loaded = False
+        if os.path.exists(filters_path):
+            try: saved.load(filters_path); loaded = True
+            except (OSError, ValueError) as e: err = e
+        if not loaded:
+            for name, expr in keep_filters: saved.add(name, expr)
+        for f in saved.filters.values(): f.rids()
+        data["sorter"].order(*sort_spec)
+        return data, err
+
+    def _use_data(self, data: dict):
+        for attr, obj in data.items(): setattr(self, attr, obj)
+        self._share_store()
+
+    def _install_data(self, data, cols, msg, dt):
+        # luồng Tk: bỏ lượt vẽ/kết quả tìm của kho cũ, đổi sang bộ đã dựng rồi vẽ lại bảng
+        self._cancel_render()
+        self._use_data(data); self._live_last = None
+        self.next_id = int(cols["id"].max()) + 1 if len(cols["id"]) else 1
         self.refresh_table()
-        self._set_status(f"Đã đọc Excel: {path}")
+        n = len(self.students)
+        extra = f", {len(self.sources.names)} nguồn" if "nguon" in cols else ""
+        if cols.get("doi_id"): extra += f", cấp lại {cols['doi_id']:,} ID trùng"
+        self._set_status(f"{msg} – {n:,} dòng{extra}, {dt:.2f}s ({n / max(dt, 1e-9):,.0f} dòng/s)")
+
+    def _share_store(self):
+        # trợ lý AI (DataRegistry) trả lời câu hỏi "top" thẳng trên kho + chỉ mục điểm đang dùng
+        DataRegistry.attach_store(self.students, self.sorter)
 
     # ---------- EXCEL ----------
     def export_excel(self, subset_only=False):
-        data = self._get_visible_subset() if subset_only else self.students
+        # cả kho: theo cột/chiều đang sắp trên bảng (như tập con đang hiển thị)
+        data = self._get_visible_subset() if subset_only else \
+               StudentView(self.students, self.sorter.order(*self.sort_spec))
         if not data:
             messagebox.showinfo("Trống", "Chưa có dữ liệu để xuất."); return
 
@@ -1026,8 +3276,7 @@ class StudentManagerGUI:
             cell.alignment = Alignment(horizontal="center", vertical="center")
             cell.border = border
 
-        data_sorted = sorted(data, key=lambda s: (s["lop"], s["ho_ten"]))
-        for idx, s in enumerate(data_sorted, start=1):
+        for idx, s in enumerate(data, start=1):
             row_vals = [idx, s["id"], s["ho_ten"], s["lop"],
                         s["toan"], s["ly"], s["hoa"], s["van"], s["anh"], s["tin"],
                         float(f"{s['diem_tb']:.2f}"), s["xep_loai"]]
@@ -1051,21 +3300,147 @@ class StudentManagerGUI:
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể lưu Excel:\n{e}")
 
+    # ---------- KIỂM TRA TRÙNG ----------
+    DUP_REPORT_MAX = 5000      # số nhóm tối đa hiện trong cửa sổ báo cáo (file CSV xuất đủ)
+
+    DUP_POLL_MS = 100
+
+    def check_duplicates(self, auto=False):
+        # find_duplicates chạy ở luồng nền (tiến độ + Hủy như khi đọc file) trên kho hiện tại;
+        # auto=True: gọi sau khi đọc file -> chỉ hỏi khi có nhóm nghi trùng
+        # lượt cũ đã hủy (đang dừng dần) không chặn lượt mới; vòng poll đang chạy chuyển sang lượt mới
+        if self._load is not None or (self._dup is not None and not self._dup["cancel"].is_set()):
+            if not auto: messagebox.showinfo("Kiểm tra trùng", "Đang có việc chạy nền – chờ xong hoặc bấm Hủy.")
+            return
+        store = self.students; cancel = threading.Event(); q: queue.Queue = queue.Queue()
+
+        def progress(done, total):
+            if cancel.is_set(): raise LoadCancelled
+            q.put(("progress", done, total))
+
+        def work():
+            t0 = time.perf_counter()
+            try: q.put(("done", find_duplicates(store, progress=progress), time.perf_counter() - t0))
+            except LoadCancelled: q.put(("cancelled",))
+            except Exception as e: q.put(("error", e))
+
+        self._dup = {"store": store, "version": store.version, "auto": auto, "cancel": cancel, "queue": q}
+        self.load_progress["value"] = 0
+        self.btn_load_cancel.pack(side="right", padx=(4, 12), pady=2)
+        self.load_progress.pack(side="right", pady=2)
+        self.status.set(f"Đang kiểm tra trùng ({len(store):,} dòng)...")
+        threading.Thread(target=work, daemon=True).start()
+        if self._dup_poll is None: self._dup_poll = self.root.after(self.DUP_POLL_MS, self._poll_duplicates)
+
+    def _cancel_duplicates(self):
+        # sắp nạp dữ liệu mới -> lượt đang chạy (nếu có) thuộc dữ liệu cũ
+        if self._dup is not None: self._dup["cancel"].set()
+
+    def _poll_duplicates(self):
+        self._dup_poll = None
+        job = self._dup; result = None
+        while True:
+            try: msg = job["queue"].get_nowait()
+            except queue.Empty: break
+            if msg[0] != "progress": result = msg; continue
+            if job["cancel"].is_set() or self._load is not None: continue
+            _, done, total = msg
+            self.load_progress["value"] = 100 * done / total
+            self.status.set(f"Đang kiểm tra trùng: {100 * done / total:.0f}%")
+        if result is None:
+            self._dup_poll = self.root.after(self.DUP_POLL_MS, self._poll_duplicates); return
+        self._dup = None
+        if self._load is not None: return       # lượt đọc mới đang dùng thanh tiến độ
+        self.load_progress.pack_forget(); self.btn_load_cancel.pack_forget()
+        # kho bị sửa/nạp lại trong lúc tính (hoặc tính hỏng vì thế) -> kết quả không còn đúng
+        stale = job["store"] is not self.students or job["version"] != self.students.version
+        if result[0] == "cancelled" or stale:
+            self._set_status("Đã hủy kiểm tra trùng." if result[0] == "cancelled" else
+                             "Dữ liệu đã thay đổi khi đang kiểm tra trùng – bấm 'Kiểm tra trùng' để chạy lại.")
+            return
+        if result[0] == "error":
+            self.status.set(self._status_msg)
+            messagebox.showerror("Lỗi", f"Không kiểm tra trùng được:\n{result[1]}"); return
+        self._show_duplicates(result[1], result[2], job["auto"])
+
+    def _show_duplicates(self, groups, dt, auto):
+        if not groups:
+            self._set_status(f"Không phát hiện học sinh trùng ({len(self.students):,} dòng, {dt:.1f}s).")
+            if not auto: messagebox.showinfo("Kiểm tra trùng", "Không phát hiện học sinh trùng.")
+            return
+        nrows = sum(len(g) for _, g in groups)
+        msg = f"Phát hiện {len(groups):,} nhóm nghi trùng ({nrows:,} dòng, {dt:.1f}s)."
+        self._set_status(msg)
+        if auto and not messagebox.askyesno("Kiểm tra trùng", msg + "\nXem báo cáo gộp?"): return
+        self.show_duplicate_report(groups)
+
+    def show_duplicate_report(self, groups):
+        store = self.students; version = store.version   # nhóm tính trên đúng phiên bản này của kho
+        win = tk.Toplevel(self.root); win.title(f"Báo cáo học sinh trùng – {len(groups):,} nhóm")
+        win.geometry("900x520")
+        cols = ("nhom", "loai", "ban_sao", "id", "ho_ten", "lop", "diem_tb")
+        heads = ("Nhóm", "Loại", "Trùng hệt ID", "ID", "Họ tên", "Lớp", "Điểm TB")
+        wrap = ttk.Frame(win); wrap.pack(fill="both", expand=True, padx=8, pady=8)
+        tv = ttk.Treeview(wrap, columns=cols, show="headings")
+        for c, h, w in zip(cols, heads, (60, 160, 90, 80, 240, 80, 80)):
+            tv.heading(c, text=h); tv.column(c, width=w, anchor="w" if c in ("loai", "ho_ten") else "center")
+        vsb = ttk.Scrollbar(wrap, orient="vertical", command=tv.yview); tv.configure(yscrollcommand=vsb.set)
+        tv.pack(side="left", fill="both", expand=True); vsb.pack(side="right", fill="y")
+        for gi, (kind, rids) in enumerate(groups[:self.DUP_REPORT_MAX], 1):
+            rids = rids.tolist(); copy = exact_copies(store, rids)
+            for rid in rids:
+                r = store.record(rid); keep = copy.get(rid)
+                tv.insert("", "end", values=(gi, DUP_KINDS[kind], "" if keep is None else store.get_value(keep, "id"),
+                                             r["id"], r["ho_ten"], r["lop"], f"{r['diem_tb']:.2f}"))
+
+        def stale():
+            # kho bị sửa/nạp lại sau khi kiểm tra -> rid trong nhóm có thể đã trỏ sang dòng khác: đóng báo cáo
+            if store is self.students and store.version == version: return False
+            win.destroy()
+            messagebox.showinfo("Kiểm tra trùng", "Dữ liệu đã thay đổi sau lần kiểm tra này.\n"
+                                "Bấm 'Kiểm tra trùng' để chạy lại.")
+            return True
+
+        def show_in_table():
+            if stale(): return
+            rids = np.concatenate([g for _, g in groups])
+            self.refresh_table(StudentView(store, rids[store.alive_mask()[rids]]), ranked=True)
+            self._set_status(f"Đang hiển thị {len(groups):,} nhóm nghi trùng.")
+
+        def export():
+            if stale(): return
+            path = filedialog.asksaveasfilename(parent=win, defaultextension=".csv", initialfile="bao_cao_trung.csv",
+                                                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+            if not path: return
+            try: write_duplicate_report(path, store, groups)
+            except OSError as e:
+                messagebox.showerror("Lỗi", str(e), parent=win); return
+            self._set_status(f"Đã xuất báo cáo trùng: {path}")
+
+        def drop_exact():
+            # trong mỗi nhóm: giữ dòng ID nhỏ nhất của mỗi bản ghi, xoá các bản giống hệt (trừ ID)
+            if stale(): return
+            victims = [rid for _, rids in groups for rid in exact_copies(store, rids.tolist())]
+            if not victims:
+                messagebox.showinfo("Gộp trùng", "Không có bản ghi trùng hoàn toàn.", parent=win); return
+            if not messagebox.askyesno("Gộp trùng", f"Xóa {len(victims):,} bản trùng hoàn toàn (giữ ID nhỏ nhất)?", parent=win):
+                return
+            for rid in victims: store.delete(rid)
+            win.destroy(); self.refresh_table()
+            self._set_status(f"Đã xóa {len(victims):,} bản trùng hoàn toàn.")
+
+        bar = ttk.Frame(win); bar.pack(fill="x", padx=8, pady=(0, 8))
+        if len(groups) > self.DUP_REPORT_MAX:
+            ttk.Label(bar, text=f"Hiện {self.DUP_REPORT_MAX:,}/{len(groups):,} nhóm – xuất CSV để xem đủ.").pack(side="left")
+        ttk.Button(bar, text="Đóng", command=win.destroy).pack(side="right", padx=4)
+        ttk.Button(bar, text="Xóa bản trùng hoàn toàn", command=drop_exact).pack(side="right", padx=4)
+        ttk.Button(bar, text="Xuất báo cáo CSV", command=export).pack(side="right", padx=4)
+        ttk.Button(bar, text="Hiện trong bảng", command=show_in_table).pack(side="right", padx=4)
+
     # ---------- LẤY TẬP DỮ LIỆU ĐANG HIỂN THỊ ----------
-    def _get_visible_subset(self):
-        id_to_obj = {s["id"]: s for s in self.students}
-        subset = []
-        for item in self.tree.get_children():
-            vals = self.tree.item(item)["values"]
-            if not vals:
-                continue
-            try:
-                sid = int(vals[1])
-                if sid in id_to_obj:
-                    subset.append(id_to_obj[sid])
-            except Exception:
-                continue
-        return subset
+    def _get_visible_subset(self) -> StudentView:
+        # view hiện tại giữ sẵn dạng mảng rid (refresh_table đặt) -> không hỏi lại Treeview
+        return StudentView(self.students, self.view_ids)
 
     # ---------- ẨN/HIỆN CỘT ----------
     def toggle_columns_dialog(self):
@@ -1095,39 +3470,22 @@ class StudentManagerGUI:
             messagebox.showinfo("Chưa có dữ liệu", "Bảng đang rỗng. Hãy thêm học sinh hoặc hiển thị dữ liệu trước.")
             return
 
-        def hist10(values):
-            bins = [0]*10
-            for v in values:
-                bins[_bucket_index(v)] += 1
-            return [int(x) for x in bins]
-
-        tb_vals   = [s["diem_tb"] for s in subset]
-        toan_vals = [s["toan"]    for s in subset]
-        ly_vals   = [s["ly"]      for s in subset]
-        hoa_vals  = [s["hoa"]     for s in subset]
-        van_vals  = [s["van"]     for s in subset]
-        anh_vals  = [s["anh"]     for s in subset]
-        tin_vals  = [s["tin"]     for s in subset]
-
-        y_tb   = hist10(tb_vals)
-        y_toan = hist10(toan_vals)
-        y_li   = hist10(ly_vals)
-        y_hoa  = hist10(hoa_vals)
-        y_van  = hist10(van_vals)
-        y_anh  = hist10(anh_vals)
-        y_tin  = hist10(tin_vals)
+        # cả bảng đang hiển thị -> đọc bộ đếm sẵn có; tập con -> bin vector hoá một lượt
+        rids = None if len(subset) == len(self.students) else subset.rids
+        h = self.hist.as_dict(rids)
 
         x_labels = ["0-1","1-2","2-3","3-4","4-5","5-6","6-7","7-8","8-9","9-10"]
         series = [
-            ("TRUNG BÌNH MÔN", y_tb,   "blue"),
-            ("TOÁN HỌC",       y_toan, "green"),
-            ("VẬT LÝ",         y_li,   "red"),
-            ("HÓA HỌC",        y_hoa,  "orange"),
-            ("NGỮ VĂN",        y_van,  "purple"),
-            ("NGOẠI NGỮ",      y_anh,  "gold"),
-            ("TIN HỌC",        y_tin,  "grey"),
+            ("TRUNG BÌNH MÔN", h["TB"],   "blue"),
+            ("TOÁN HỌC",       h["TOAN"], "green"),
+            ("VẬT LÝ",         h["LI"],   "red"),
+            ("HÓA HỌC",        h["HOA"],  "orange"),
+            ("NGỮ VĂN",        h["VAN"],  "purple"),
+            ("NGOẠI NGỮ",      h["ANH"],  "gold"),
+            ("TIN HỌC",        h["TIN"],  "grey"),
         ]
 
+        plt = _pyplot(); from matplotlib.ticker import MaxNLocator
         fig, axs = plt.subplots(4, 2, figsize=(12, 10))
         axs = axs.ravel()
 
@@ -1163,39 +3521,15 @@ class StudentManagerGUI:
             messagebox.showinfo("Chưa có dữ liệu", "Bảng đang rỗng. Hãy thêm học sinh hoặc hiển thị dữ liệu trước.")
             return
 
-        # gom theo khối dựa vào tiền tố lớp
-        blocks = {"10": [], "11": [], "12": []}
-        for s in subset:
-            lop = (s.get("lop") or "").strip()
-            tb  = float(s.get("diem_tb", 0.0))
-            if lop.startswith("10"):
-                blocks["10"].append(tb)
-            elif lop.startswith("11"):
-                blocks["11"].append(tb)
-            elif lop.startswith("12"):
-                blocks["12"].append(tb)
-
-        # histogram 10 bin
-        def hist10(values):
-            bins = [0]*10
-            for v in values:
-                try: x = float(v)
-                except: x = 0.0
-                if x < 0: x = 0.0
-                if x > 10: x = 10.0
-                idx = 9 if x >= 9.0 else int(x)
-                bins[idx] += 1
-            return [int(x) for x in bins]
-
-        h10 = hist10(blocks["10"])
-        h11 = hist10(blocks["11"])
-        h12 = hist10(blocks["12"])
+        # gom theo khối dựa vào tiền tố lớp, histogram 10 bin một lượt
+        h10, h11, h12 = ([int(x) for x in row] for row in self.hist.by_grade(subset.rids))
         havg = [(h10[i] + h11[i] + h12[i]) / 3.0 for i in range(10)]  # TB theo từng bin
 
         x_labels = ["0-1","1-2","2-3","3-4","4-5","5-6","6-7","7-8","8-9","9-10"]
         x = np.arange(len(x_labels))
         width = 0.2
 
+        plt = _pyplot(); from matplotlib.ticker import MaxNLocator
         fig, ax = plt.subplots(figsize=(12, 6))
         r10  = ax.bar(x - 1.5*width, h10, width, label="Khối 10")
         r11  = ax.bar(x - 0.5*width, h11, width, label="Khối 11")
@@ -1430,11 +3764,367 @@ def open_qna_window(root, get_subset_callable=None):
     txt_q.bind("<Control-Return>", on_ask)
 
     log("Khởi động Q&A.")
-# ---------- RUN ----------
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = StudentManagerGUI(root)
-    root.mainloop()
+# ================== BENCHMARK (python PROJECT.py --bench [tên ...]) ==================
+_BENCH_HO  = ["Nguyễn","Trần","Lê","Phạm","Hoàng","Huỳnh","Phan","Vũ","Võ","Đặng","Bùi","Đỗ","Hồ","Ngô","Dương","Lý"]
+_BENCH_DEM = ["Văn","Thị","Hữu","Đức","Minh","Ngọc","Thanh","Quốc","Gia","Bảo","Thu","Hoài","Xuân","Kim","Anh"]
+_BENCH_TEN = ["An","Anh","Bình","Chi","Dũng","Đạt","Giang","Hà","Hải","Hạnh","Hiếu","Hoa","Hùng","Huy","Khoa","Lan",
+              "Linh","Long","Mai","Minh","Nam","Ngân","Nhung","Phong","Phúc","Quân","Quỳnh","Sơn","Tâm","Thảo",
+              "Trang","Trung","Tuấn","Uyên","Vy","Yến"]
+
+def _bench_names(n: int, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        dem = rnd.sample(_BENCH_DEM, rnd.choice((1, 1, 2)))
+        out.append(" ".join([rnd.choice(_BENCH_HO), *dem, rnd.choice(_BENCH_TEN)]))
+    return out
+
+def bench_name_search(sizes=(10_000, 100_000, 1_000_000)):
+    queries = ["văn an", "thị hồ", "quỳnh", "đức trung", "nguyễn gia bảo", "ngọc lan"]
+    for n in sizes:
+        gc.collect()
+        names = _bench_names(n)
+        t0 = time.perf_counter()
+        col = _InternColumn(n); idx = _TrigramIndex()
+        for rid, nm in enumerate(names):
+            col.set(rid, nm); idx.add(col.key(rid), rid)
+        idx._ensure_grams()                  # tầng trigram dựng lười -> tính vào thời gian dựng
+        t_build = time.perf_counter() - t0
+        # quét tuyến tính trên cột khoá đã fold sẵn (đã rẻ hơn .lower() từng dòng của bản cũ)
+        keys = [col.key(rid) for rid in range(n)]
+
+        t_lin = t_idx = 0.0
+        gc.disable()   # như timeit: không để GC của heap lớn lẫn vào số đo
+        for q in queries:
+            t0 = time.perf_counter()
+            qf = fold_vn(q); lin = [rid for rid, k in enumerate(keys) if qf in k]
+            t_lin += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            hit = idx.contains(qf)
+            t_idx += time.perf_counter() - t0
+            assert len(hit) == len(lin), q
+        gc.enable()
+        t_lin = t_lin / len(queries) * 1000; t_idx = t_idx / len(queries) * 1000
+        print(f"{n:>9,} tên ({len(idx.postings):,} khác nhau) | dựng chỉ mục {t_build:.2f}s | "
+              f"quét tuyến tính {t_lin:.2f} ms/truy vấn | trigram {t_idx:.3f} ms/truy vấn | x{t_lin / max(t_idx, 1e-9):.0f}")
+
+def bench_name_sort(sizes=(100_000, 500_000)):
+    for n in sizes:
+        gc.collect()
+        names = _bench_names(n)
+        store = StudentStore(n)
+        for i, nm in enumerate(names): store.append({"id": i + 1, "ho_ten": nm, "lop": "10A1"})
+        gc.disable()
+        t0 = time.perf_counter()
+        old = sorted(range(n), key=lambda r: names[r].lower())          # cách cũ: sai thứ tự, theo họ
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        per_row = sorted(range(n), key=lambda r: vn_name_key(names[r]))  # khoá đúng nhưng tính mỗi dòng
+        t_row = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        perm = SortEngine(store).order(("ho_ten",))                     # khoá mỗi giá trị + argsort
+        t_new = time.perf_counter() - t0
+        gc.enable()
+        assert [vn_name_key(names[r]) for r in perm.tolist()] == [vn_name_key(names[r]) for r in per_row]
+        print(f"{n:>9,} tên ({len(store.pool('ho_ten')):,} khác nhau) | str.lower {t_old:.2f}s | "
+              f"khoá mỗi dòng {t_row:.2f}s | SortEngine {t_new:.3f}s | x{t_row / max(t_new, 1e-9):.0f}")
+
+def _bench_store(n: int, seed: int = 7) -> StudentStore:
+    rnd = random.Random(seed); names = _bench_names(n, seed)
+    classes = [f"{k}A{j}" for k in GRADES for j in range(1, 9)]
+    store = StudentStore(n)
+    for i, nm in enumerate(names):
+        sc = {c: round(rnd.uniform(0, 10), 1) for c in SUBJECTS}; a = wavg(sc)
+        store.append({"id": i + 1, "ho_ten": nm, "lop": rnd.choice(classes), **sc,
+                      "diem_tb": round(a, 2), "xep_loai": classify(a)})
+    return store
+
+def bench_filter_expr(sizes=(100_000, 1_000_000)):
+    # biểu thức -> bản Python thuần duyệt từng dòng (để đối chiếu kết quả và thời gian)
+    exprs = {
+        "toan >= 8 and van < 5 and lop ^= 11":
+            lambda r: r["toan"] >= 8 and r["van"] < 5 and fold_vn(r["lop"]).startswith("11"),
+        '(xl in (gioi, kha) or tb > 9) and not ten ~ "nguyen"':
+            lambda r: (fold_vn(r["xep_loai"]) in ("gioi", "kha") or r["diem_tb"] > 9)
+                      and "nguyen" not in fold_vn(r["ho_ten"]),
+        "ly > 9.5 or hoa < 0.5 or tin = 10":
+            lambda r: r["ly"] > 9.5 or r["hoa"] < 0.5 or r["tin"] == 10,
+    }
+    for n in sizes:
+        gc.collect()
+        store = _bench_store(n); recs = [store.record(r) for r in range(n)]
+        for e, py in exprs.items():
+            compile_filter(e)
+            gc.disable()
+            t0 = time.perf_counter(); got = filter_expr_rids(store, e); t_mask = time.perf_counter() - t0
+            t0 = time.perf_counter(); ref = [r for r in range(n) if py(recs[r])]; t_py = time.perf_counter() - t0
+            gc.enable()
+            assert got.tolist() == ref, e
+            print(f"{n:>9,} dòng | {e!r:<58} | {len(got):>7,} kết quả | mặt nạ {t_mask * 1000:.1f} ms | "
+                  f"duyệt dict {t_py * 1000:.0f} ms")
+
+def bench_score_index(sizes=(100_000, 1_000_000)):
+    for n in sizes:
+        gc.collect()
+        store = _bench_store(n); sorter = SortEngine(store)
+        t0 = time.perf_counter(); sorter.sorted_values("diem_tb"); sorter.sorted_values("toan")
+        t_build = time.perf_counter() - t0
+        recs = [store.record(r) for r in range(n)]
+        gc.disable()
+        t0 = time.perf_counter()
+        rng_scan = sorted((r for r in range(n) if 6.5 <= recs[r]["diem_tb"] <= 7.0), key=lambda r: recs[r]["diem_tb"])
+        top_scan = sorted(range(n), key=lambda r: recs[r]["toan"], reverse=True)[:50]
+        t_scan = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        rng = sorter.range("diem_tb", 6.5, 7.0); top = sorter.top("toan", 50)
+        t_idx = time.perf_counter() - t0
+        gc.enable()
+        assert sorted(rng.tolist()) == sorted(rng_scan)
+        assert [recs[r]["toan"] for r in top.tolist()] == [recs[r]["toan"] for r in top_scan]
+        print(f"{n:>9,} dòng | dựng chỉ mục {t_build:.2f}s | TB 6.5..7 ({len(rng):,}) + top 50 Toán: "
+              f"quét+sort {t_scan * 1000:.0f} ms | chỉ mục {t_idx * 1000:.2f} ms")
+
+def _bench_typo(name: str, rnd: random.Random) -> str:
+    # mỗi từ dài >= 4: một lỗi (đổi chỗ / xoá / thay ký tự); bỏ dấu
+    out = []
+    for w in fold_vn(name).split():
+        if len(w) >= 4:
+            i = rnd.randrange(len(w) - 1); kind = rnd.randrange(3)
+            w = w[:i] + w[i + 1] + w[i] + w[i + 2:] if kind == 0 else \
+                w[:i] + w[i + 1:] if kind == 1 else w[:i] + rnd.choice("aeiouy") + w[i + 1:]
+        out.append(w)
+    return " ".join(out)
+
+def bench_fuzzy_search(sizes=(100_000, 500_000), nq=20):
+    rnd = random.Random(11)
+    for n in sizes:
+        gc.collect()
+        names = _bench_names(n)
+        store = StudentStore(n)
+        for i, nm in enumerate(names): store.append({"id": i + 1, "ho_ten": nm, "lop": "10A1"})
+        fz = FuzzyNameIndex(store)
+        t0 = time.perf_counter(); fz.search("an"); t_build = time.perf_counter() - t0
+        targets = [names[rnd.randrange(n)] for _ in range(nq)]
+        queries = [_bench_typo(t, rnd) for t in targets]
+        keys = list(store.key_index["ho_ten"].postings)
+        gc.disable()
+        t0 = time.perf_counter(); results = [fz.search(q, 20) for q in queries]; t_idx = time.perf_counter() - t0
+        # đối chiếu: quét mọi tên phân biệt, cùng tiêu chí khớp từng từ (chỉ 3 truy vấn đầu vì rất chậm)
+        t0 = time.perf_counter()
+        for q, res in zip(queries[:3], results):
+            qw = q.split()
+            lin = {k for k in keys if all(any(_osa_distance(a, b, _word_tolerance(a)) <= _word_tolerance(a)
+                                              for b in k.split()) for a in qw)}
+            assert lin == {k for k, _ in fz.search(q, len(keys))}, q
+        t_lin = (time.perf_counter() - t0) / 3
+        gc.enable()
+        found = sum(fold_vn(t) in {k for k, _ in r} for t, r in zip(targets, results))
+        print(f"{n:>9,} tên ({len(keys):,} khác nhau, {len(fz.word_names):,} từ) | dựng {t_build:.2f}s | "
+              f"SymSpell {t_idx / nq * 1000:.1f} ms/truy vấn | quét {t_lin * 1000:.0f} ms/truy vấn | "
+              f"tìm thấy tên gốc {found}/{nq}")
+
+def bench_duplicates(sizes=(100_000, 1_000_000), rate=0.01):
+    # lớp ~40 HS như thực tế; chèn bản sao ID mới: nguyên vẹn / đổi điểm / gõ sai một từ của tên
+    for n in sizes:
+        gc.collect()
+        rnd = random.Random(5); names = _bench_names(n)
+        classes = [f"{GRADES[i % 3]}A{i}" for i in range(max(1, n // 40))]
+        store = StudentStore(n + int(n * rate))
+        for i, nm in enumerate(names):
+            sc = {c: round(rnd.uniform(0, 10), 1) for c in SUBJECTS}; a = wavg(sc)
+            store.append({"id": i + 1, "ho_ten": nm, "lop": classes[i % len(classes)], **sc,
+                          "diem_tb": round(a, 2), "xep_loai": classify(a)})
+        planted = []
+        for j in range(int(n * rate)):
+            src = store.record(rnd.randrange(n)); kind = j % 3
+            if kind == 1: src["toan"] = round(10 - src["toan"], 1)
+            if kind == 2 and j % 2: w = src["ho_ten"].split(); src["ho_ten"] = " ".join(w[:-1] + [_bench_typo(w[-1], rnd)])
+            if kind == 2 and not j % 2: src["ho_ten"] = fold_vn(src["ho_ten"]).upper()
+            planted.append((src["id"], n + j + 1)); src["id"] = n + j + 1
+            store.append(src)
+        gc.disable()
+        t0 = time.perf_counter(); groups = find_duplicates(store); t = time.perf_counter() - t0
+        gc.enable()
+        ids = store.column("id"); group_of = {}
+        for gi, (_, g) in enumerate(groups):
+            for sid in ids[g].tolist(): group_of[sid] = gi
+        found = sum(a in group_of and group_of.get(a) == group_of.get(b) for a, b in planted)
+        by_kind = {k: sum(1 for kk, _ in groups if kk == k) for k in DUP_KINDS}
+        print(f"{len(store):>9,} dòng ({len(classes):,} lớp) | {t:.2f}s | {len(groups):,} nhóm "
+              f"({', '.join(f'{DUP_KINDS[k]}: {v:,}' for k, v in by_kind.items())}) | "
+              f"bắt được {found:,}/{len(planted):,} bản sao đã chèn")
+
+_BENCH_HEADER = ["ID", "Họ Tên", "Lớp", "Toán", "Lý", "Hóa", "Văn", "Anh", "Tin", "Điểm TB", "Xếp Loại"]
+
+def _bench_rows(n: int, seed: int = 7):
+    # dòng kiểu giáo viên nhập: vài điểm dùng dấu phẩy thập phân / ô trống
+    rnd = random.Random(seed); names = _bench_names(n, seed)
+    classes = [f"{k}A{j}" for k in GRADES for j in range(1, 9)]
+    for i, nm in enumerate(names):
+        sc = [round(rnd.uniform(0, 10), 1) for _ in SUBJECTS]
+        cells = [str(v).replace(".", ",") if rnd.random() < 0.001 else "" if rnd.random() < 0.0005 else v for v in sc]
+        a = sum(sc) / len(sc)
+        yield [i + 1, nm, rnd.choice(classes), *cells, f"{a:.2f}", classify(a)]
+
+def _bench_write_csv(path: str, n: int, seed: int = 7):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(_BENCH_HEADER); w.writerows(_bench_rows(n, seed))
+
+def _bench_write_xlsx(path: str, n: int, seed: int = 7):
+    wb = Workbook(write_only=True); ws = wb.create_sheet("Bảng điểm")
+    ws.append(_BENCH_HEADER)
+    for r in _bench_rows(n, seed): ws.append(r)
+    wb.save(path)
+
+def _bench_legacy_load_csv(path: str, store: StudentStore):
+    # _load_csv trước khi đọc theo cột: DictReader + tra field_map từng ô + append từng dòng
+    store.clear()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        delimiter = _sniff_delimiter(f.read(4096)); f.seek(0)
+        reader = csv.DictReader(f, delimiter=delimiter, quotechar='"')
+        field_map = {h: en for h in reader.fieldnames or [] if (en := _HEADER_ALIASES.get((h or "").strip().lower()))}
+        for row in reader:
+            get = lambda en_key: next((row[h] for h, en in field_map.items() if en == en_key), "")
+            sc = {s: parse_score_any(get(s)) for s in SUBJECTS}
+            avg = wavg(sc); xl = classify(avg)
+            id_val = get("id")
+            try: id_int = int(float(id_val)) if id_val != "" else len(store)+1
+            except: id_int = len(store)+1
+            store.append({"id": id_int, "ho_ten": (get("ho_ten") or "").strip(), "lop": (get("lop") or "").strip(),
+                          **sc, "diem_tb": round(avg, 2), "xep_loai": xl})
+
+def _bench_legacy_load_xlsx(path: str, store: StudentStore):
+    # _load_xlsx trước khi đọc theo cột: workbook đầy đủ (mọi ô thành đối tượng) + append từng dòng
+    store.clear()
+    ws = load_workbook(path, data_only=True).active
+    headers = [(c.value or "").strip() if isinstance(c.value, str) else str(c.value or "") for c in ws[1]]
+    col_map = {i: en for i, h in enumerate(headers) if (en := _HEADER_ALIASES.get(h.strip().lower()))}
+    for r in ws.iter_rows(min_row=2, values_only=True):
+        row = {col_map[i]: r[i] for i in col_map.keys() if i < len(r)}
+        get = lambda en_key, default="": row.get(en_key, default)
+        sc = {s: parse_score_any(get(s, 0)) for s in SUBJECTS}
+        avg = wavg(sc); xl = classify(avg)
+        id_val = get("id")
+        try: id_int = int(float(id_val)) if id_val not in ("", None) else len(store)+1
+        except: id_int = len(store)+1
+        store.append({"id": id_int, "ho_ten": (str(get("ho_ten") or "")).strip(), "lop": (str(get("lop") or "")).strip(),
+                      **sc, "diem_tb": round(avg, 2), "xep_loai": xl})
+
+def _bench_digest(store: StudentStore) -> str:
+    h = hashlib.sha1()
+    for c in STUDENT_COLS:
+        v = store.column(c)
+        h.update(np.ascontiguousarray(v).tobytes() if c in NUM_COLS else "\x1f".join(v).encode())
+    return h.hexdigest()
+
+_BENCH_LOADERS = {
+    "csv-cũ": _bench_legacy_load_csv,
+    "csv": lambda path, store: store.load_columns(read_csv_columns(path)),
+    "xlsx-cũ": _bench_legacy_load_xlsx,
+    "xlsx": lambda path, store: store.load_columns(read_xlsx_columns(path)),
+    "xlsx-đọc": lambda path, store: read_xlsx_columns(path),     # chỉ đọc thành cột, không nạp kho
+}
+
+def _bench_load_child(loader: str, path: str, repeat: int = 1) -> tuple[float, int, float, str]:
+    # chạy trong tiến trình con mới (heap sạch, RSS đỉnh riêng): (giây tốt nhất, số dòng, RSS đỉnh MB, digest)
+    import resource
+    store = StudentStore()
+    KpiAggregator(store); ScoreHistograms(store); SortEngine(store); _DirtyRows(store); SavedFilters(store)  # như GUI
+    best = float("inf")
+    for _ in range(repeat):
+        store.clear(); gc.collect()
+        t0 = time.perf_counter(); _BENCH_LOADERS[loader](path, store); best = min(best, time.perf_counter() - t0)
+    return best, len(store), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, _bench_digest(store)
+
+def _bench_load(loader: str, path: str, repeat: int = 1):
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=ctx) as ex:
+        return ex.submit(_bench_load_child, loader, path, repeat).result()
+
+def bench_csv_load(sizes=(100_000, 1_000_000)):
+    import tempfile
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hs.csv"); _bench_write_csv(path, n)
+            mb = os.path.getsize(path) / 2 ** 20
+            t_old, _, _, d_old = _bench_load("csv-cũ", path, repeat=2)     # như timeit: lấy lần nhanh nhất
+            t_new, rows, _, d_new = _bench_load("csv", path, repeat=2)
+        assert d_old == d_new, "kết quả khác loader cũ"
+        print(f"{rows:>9,} dòng ({mb:.0f} MB) | cũ {t_old:.2f}s ({rows / t_old:,.0f} dòng/s) | "
+              f"theo cột {t_new:.2f}s ({rows / t_new:,.0f} dòng/s) | x{t_old / t_new:.1f}")
+
+def bench_xlsx_load(sizes=(20_000, 100_000, 300_000), legacy_max=100_000):
+    # RSS đỉnh đo trong tiến trình con riêng cho mỗi lần đọc: "đọc" = chỉ phân tích file thành cột,
+    # "nạp" = gồm cả kho + chỉ mục. File lớn chỉ chạy loader mới (loader cũ giữ mọi ô, cần vài GB)
+    import tempfile
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hs.xlsx"); _bench_write_xlsx(path, n)
+            mb = os.path.getsize(path) / 2 ** 20
+            _, _, rss_read, _ = _bench_load("xlsx-đọc", path)
+            t_new, rows, rss_new, d_new = _bench_load("xlsx", path)
+            line = (f"{rows:>8,} dòng ({mb:.0f} MB) | read_only {t_new:.2f}s ({rows / t_new:,.0f} dòng/s), "
+                    f"RSS đỉnh đọc {rss_read:,.0f} MB / nạp {rss_new:,.0f} MB")
+            if n <= legacy_max:
+                t_old, _, rss_old, d_old = _bench_load("xlsx-cũ", path)
+                assert d_old == d_new, "kết quả khác loader cũ"
+                line += f" | cũ {t_old:.2f}s, RSS đỉnh {rss_old:,.0f} MB | x{t_old / t_new:.1f}"
+        print(line)
+
+def bench_import_folder(files=200, rows=45, workers=(1, 2, 4, 8)):
+    # mỗi lớp một workbook (ID từ 1 -> trùng giữa các file); so đọc tuần tự với pool nhiều tiến trình
+    import tempfile
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(files):
+            _bench_write_xlsx(os.path.join(tmp, f"lop{i:03d}.xlsx"), rows, seed=i)
+        paths = list_import_files(tmp)
+        t0 = time.perf_counter()
+        serial = build_import([p for path in paths for p in _read_source_parts((path, None))])
+        t_serial = time.perf_counter() - t0
+        print(f"{files} file x {rows} dòng, máy có {cpus} CPU | tuần tự {t_serial:.2f}s")
+        for w in (w for w in workers if w == 1 or w <= cpus):
+            t0 = time.perf_counter(); cols = import_sources(paths, workers=w); dt = time.perf_counter() - t0
+            assert np.array_equal(cols["id"], serial["id"]) and cols["nguon"][1] == serial["nguon"][1]
+            print(f"  {w} tiến trình: {dt:.2f}s ({len(cols['id']) / dt:,.0f} dòng/s, x{t_serial / dt:.1f} so với tuần tự)"
+                  f", cấp lại {cols['doi_id']:,} ID")
+
+def bench_csv_parallel(n=1_000_000, workers=(1, 2, 4, 8)):
+    # chỉ bước đọc file thành cột (nạp kho vẫn một luồng); pool so với read_csv_columns một tiến trình
+    import tempfile
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hs.csv"); _bench_write_csv(path, n)
+        mb = os.path.getsize(path) / 2 ** 20
+        t0 = time.perf_counter(); ref = read_csv_columns(path); t_one = time.perf_counter() - t0
+        print(f"{n:,} dòng ({mb:.0f} MB), máy có {cpus} CPU | một tiến trình {t_one:.2f}s ({n / t_one:,.0f} dòng/s)")
+        for w in (w for w in workers if w == 1 or w <= cpus):
+            t0 = time.perf_counter(); cols = _read_csv_parallel(path, workers=w); dt = time.perf_counter() - t0
+            assert all(np.array_equal(cols[c], ref[c]) for c in ["id"] + SUBJECTS + ["diem_tb"])
+            assert [ref["ho_ten"][1][i] for i in ref["ho_ten"][0][:1000]] == [cols["ho_ten"][1][i] for i in cols["ho_ten"][0][:1000]]
+            print(f"  {w} tiến trình: {dt:.2f}s ({n / dt:,.0f} dòng/s, x{t_one / dt:.2f})")
+
+_BENCHMARKS = {
+    "name-search": bench_name_search,
+    "name-sort": bench_name_sort,
+    "filter-expr": bench_filter_expr,
+    "score-index": bench_score_index,
+    "fuzzy-search": bench_fuzzy_search,
+    "duplicates": bench_duplicates,
+    "csv-load": bench_csv_load,
+    "xlsx-load": bench_xlsx_load,
+    "import-folder": bench_import_folder,
+    "csv-parallel": bench_csv_parallel,
+}
+
+def run_benchmarks(names):
+    for name in (names or list(_BENCHMARKS)):
+        fn = _BENCHMARKS.get(name)
+        if fn is None:
+            print(f"Không có benchmark '{name}'. Có: {', '.join(_BENCHMARKS)}"); continue
+        print(f"== {name} ==")
+        fn()
 
 
 # ===========================
@@ -1451,10 +4141,8 @@ from typing import Any, Dict, List, Tuple, Optional
 
 try:
     import pandas as pd
-    import numpy as np
 except Exception:
     pd = None
-    np = None
 
 # ---- tiny tokenizer ----
 _VN_STOP = {"là","và","hoặc","nhưng","thì","của","cho","với","những","các","đã","đang","sẽ","trong","tại","từ","theo","đến","về","này","kia","ấy","đó","một"}
@@ -1498,6 +4186,10 @@ class _Index:
 class DataRegistry:
     tables: Dict[str,"Any"] = {}
     index = _Index()
+    store = None    # StudentStore (tuỳ chọn): có thì câu hỏi "top" đọc thẳng chỉ mục điểm
+    sorter = None   # SortEngine của store
+    @classmethod
+    def attach_store(cls, store, sorter): cls.store = store; cls.sorter = sorter
     @classmethod
     def default_table(cls)->str: return next(iter(cls.tables.keys()), "scores")
     @classmethod
@@ -1516,7 +4208,34 @@ class DataRegistry:
 # ---- tools ----
 class ToolError(Exception): pass
 
+_AI_STORE_COLS = {"ID":"id","Họ Tên":"ho_ten","Lớp":"lop","Toán":"toan","Lý":"ly","Hóa":"hoa",
+                  "Văn":"van","Anh":"anh","Tin":"tin","Điểm TB":"diem_tb"}
+
+def _store_top_rids(plan:Dict[str,Any]):
+    # plan "top": 1 cột điểm + limit, lọc tối đa theo Lớp -> rid top-k trên chỉ mục điểm (không sort cả bảng);
+    # không có kho gắn vào / plan khác dạng -> None
+    st, so = DataRegistry.store, DataRegistry.sorter
+    order=plan.get("order_by") or []; lim=plan.get("limit"); where=plan.get("where") or {}
+    if st is None or so is None or len(order)!=1 or not isinstance(lim,int) or lim<=0: return None
+    if not isinstance(where,dict) or set(where)-{"Lớp"}: return None
+    name,_,dir=str(order[0]).strip().rpartition(" ")
+    if dir.upper() not in ("ASC","DESC"): name,dir=str(order[0]).strip(),"ASC"
+    col=_AI_STORE_COLS.get(name.strip())
+    if col not in SUBJECTS+["diem_tb"]: return None
+    rids=st.key_index["lop"].exact(fold_vn(where["Lớp"])) if "Lớp" in where else None
+    return so.top(col, lim, dir.upper()=="DESC", None if rids is None else list(rids))
+
+def _store_top(plan:Dict[str,Any]):
+    top=_store_top_rids(plan) if pd is not None else None
+    if top is None: return None
+    st=DataRegistry.store
+    rows=[{"STT":i, **{vn: st.get_value(int(r), c) for vn,c in _AI_STORE_COLS.items()}} for i,r in enumerate(top.tolist(), 1)]
+    sel=[c for c in (plan.get("select") or ["STT",*_AI_STORE_COLS]) if c=="STT" or c in _AI_STORE_COLS]
+    return pd.DataFrame(rows, columns=sel)
+
 def sql_tool(plan:Dict[str,Any]):
+    fast=_store_top(plan)
+    if fast is not None: return fast
     if pd is None: raise ToolError("Thiếu pandas.")
     if not DataRegistry.tables: raise ToolError("Chưa có dữ liệu để truy vấn.")
     t=plan.get("table") or DataRegistry.default_table()
@@ -1686,4 +4405,14 @@ def ai_answer(query:str)->Dict[str,Any]:
     return AI_ENGINE.answer(query)
 # =========================
 # ==== AI UPGRADE END ====
-# =========================
\ No newline at end of file
+# =========================
+
+# ---------- RUN (cuối file: GUI dùng được cả phần AI phía trên) ----------
+if __name__ == "__main__":
+    multiprocessing.freeze_support()     # bản đóng gói: tiến trình con chạy việc đọc file, không mở GUI
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        run_benchmarks(sys.argv[2:])
+    else:
+        root = tk.Tk()
+        app = StudentManagerGUI(root)
+        root.mainloop()
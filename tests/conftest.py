@@ -0,0 +1,5 @@
+import os
+import sys
+
+# PROJECT.py nằm ở gốc repo (không phải gói cài đặt)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+import pytest
+
+import PROJECT as P
+
+
+def make_store(rows):
+    store = P.StudentStore()
+    for i, (lop, toan) in enumerate(rows, 1):
+        sc = {c: 5.0 for c in P.SUBJECTS}; sc["toan"] = float(toan)
+        avg = P.wavg(sc)
+        store.append({"id": i, "ho_ten": f"Học sinh {i}", "lop": lop, **sc,
+                      "diem_tb": round(avg, 2), "xep_loai": P.classify(avg)})
+    return store
+
+
+@pytest.fixture
+def gui():
+    # chỉ phần GUI cần cho việc gắn kho vào trợ lý AI (không mở cửa sổ Tk)
+    g = P.StudentManagerGUI.__new__(P.StudentManagerGUI)
+    g.students = make_store([("10A1", 7), ("10A1", 9.5), ("11B1", 8), ("10A1", 3), ("11B1", 10)])
+    g.sorter = P.SortEngine(g.students)
+    yield g
+    P.DataRegistry.attach_store(None, None)
+
+
+def top_ids(plan):
+    top = P._store_top_rids(plan)
+    return None if top is None else [int(P.DataRegistry.store.get_value(int(r), "id")) for r in top]
+
+
+def test_top_reads_the_attached_store(gui):
+    gui._share_store()
+    assert P.DataRegistry.store is gui.students and P.DataRegistry.sorter is gui.sorter
+    assert top_ids({"order_by": ["Toán DESC"], "limit": 3}) == [5, 2, 3]
+    assert top_ids({"order_by": ["Toán ASC"], "limit": 2, "where": {"Lớp": "10a1"}}) == [4, 1]
+    assert top_ids({"order_by": ["Toán"], "limit": 10, "where": {"Lớp": "12C1"}}) == []
+
+
+def test_top_follows_a_store_swap(gui):
+    gui._share_store()
+    gui.students = make_store([("12C1", 4), ("12C1", 6)]); gui.sorter = P.SortEngine(gui.students)
+    gui._share_store()
+    assert top_ids({"order_by": ["Toán DESC"], "limit": 1, "where": {"Lớp": "12C1"}}) == [2]
+
+
+def test_top_falls_back_for_other_plans(gui):
+    assert top_ids({"order_by": ["Toán DESC"], "limit": 3}) is None      # chưa gắn kho
+    gui._share_store()
+    assert top_ids({"order_by": ["Toán DESC", "Văn DESC"], "limit": 3}) is None
+    assert top_ids({"order_by": ["Họ Tên"], "limit": 3}) is None
+    assert top_ids({"order_by": ["Toán DESC"], "limit": 3, "where": {"Văn": 5}}) is None
+    assert top_ids({"order_by": ["Toán DESC"]}) is None
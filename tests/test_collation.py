@@ -0,0 +1,26 @@
+import PROJECT as P
+
+
+def test_vietnamese_alphabet_and_tones():
+    words = ["an", "ăn", "ân", "bàn", "chi", "dung", "đào", "em", "êm", "ghi", "ô", "ơ", "ư", "yến"]
+    assert sorted(reversed(words), key=P.vn_collate_key) == words
+    tones = ["ma", "mà", "mả", "mã", "má", "mạ"]
+    assert sorted(reversed(tones), key=P.vn_collate_key) == tones
+    assert P.vn_collate_key("an") < P.vn_collate_key("anh") < P.vn_collate_key("ăn")
+    assert P.vn_collate_key("Đào") == P.vn_collate_key("đào")
+
+
+def test_class_names_and_digits():
+    lops = ["10A1", "10A2", "10B1", "11A1", "12C1"]
+    assert sorted(reversed(lops), key=P.vn_collate_key) == lops
+
+
+def test_names_sort_by_given_name_then_family():
+    names = ["Trần Văn An", "Nguyễn Thị Anh", "Lê Bình", "Nguyễn Văn Bình", "Phạm Đức"]
+    assert sorted(reversed(names), key=P.vn_name_key) == names
+
+
+def test_sort_engine_uses_collation():
+    store = P.StudentStore(); eng = P.SortEngine(store)
+    for i, n in enumerate(["Đỗ Yến", "Lê An", "Ánh", "Anh", "Bảo"]): store.append({"id": i, "ho_ten": n})
+    assert [store.get_value(r, "ho_ten") for r in eng.order(("ho_ten",))] == ["Lê An", "Anh", "Ánh", "Bảo", "Đỗ Yến"]
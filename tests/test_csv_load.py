@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+
+import PROJECT as P
+
+
+def records(store):
+    return [store.record(r) for r in store.row_ids().tolist()]
+
+
+def load(path):
+    store = P.StudentStore(); store.load_columns(P.read_csv_columns(str(path)))
+    return store
+
+
+def test_columnar_loader_matches_legacy(tmp_path):
+    path = tmp_path / "hs.csv"; P._bench_write_csv(str(path), 3000)
+    legacy = P.StudentStore(); P._bench_legacy_load_csv(str(path), legacy)
+    assert records(load(path)) == records(legacy)
+
+
+def test_quotes_crlf_and_bad_cells(tmp_path):
+    path = tmp_path / "tay.csv"
+    path.write_bytes(("Lớp,ID,Họ Tên,Toán,Văn,Ghi chú\r\n"
+                      '10A1,7,"Nguyễn, Văn An",8,"6,5",x\r\n'
+                      '10A2,,"Lê ""Bé"" Hà",abc,11\r\n'
+                      '11B1,3.0,"Trần\nThị",  9 ,\r\n'
+                      "\r\n"
+                      "12C1,x,Phạm Đức\r\n").encode("utf-8-sig"))
+    store = load(path); legacy = P.StudentStore(); P._bench_legacy_load_csv(str(path), legacy)
+    assert records(store) == records(legacy)
+    assert [r["ho_ten"] for r in records(store)] == ["Nguyễn, Văn An", 'Lê "Bé" Hà', "Trần\nThị", "Phạm Đức"]
+    assert [r["id"] for r in records(store)] == [7, 2, 3, 4]
+
+
+def test_bulk_indexes_and_kpi_match_scan(tmp_path):
+    path = tmp_path / "hs.csv"; P._bench_write_csv(str(path), 4000, seed=3)
+    store = P.StudentStore(); kpi = P.KpiAggregator(store)
+    store.load_columns(P.read_csv_columns(str(path)))
+    rnd = random.Random(1)
+
+    def check():
+        for col in ("lop", "ho_ten", "xep_loai"):
+            idx = store.key_index[col]; keys = {s.rid: P.fold_vn(s[col]) for s in store}
+            for q in {P.fold_vn(store.get_value(int(r), col))[:n] for r in store.row_ids()[:20] for n in (2, 4, 40)}:
+                assert idx.exact(q) == {r for r, k in keys.items() if k == q}
+                assert idx.prefix(q) == {r for r, k in keys.items() if k.startswith(q)}
+                assert idx.contains(q) == {r for r, k in keys.items() if q in k}, (col, q)
+        want = dict.fromkeys(P.RANKS, 0)
+        for s in store: want[s["xep_loai"]] += 1
+        assert kpi.current() == want and store.rid_of(int(store.get_value(5, "id"))) is not None
+
+    check()
+    for _ in range(300):
+        alive = store.row_ids().tolist(); r = rnd.choice(alive); op = rnd.random()
+        if op < 0.4: store.update_row(r, {"lop": rnd.choice(["10A1", "12A9", "99Z"]), "xep_loai": rnd.choice(P.RANKS)})
+        elif op < 0.7: store.update_row(r, {"ho_ten": store.get_value(rnd.choice(alive), "ho_ten") + " Mới"})
+        elif op < 0.85: store.delete(r)
+        else: store.append({"id": 10**6 + len(alive), "ho_ten": "Vũ Thị Mai", "lop": "10A1", "xep_loai": "Khá"})
+    check()
+    assert np.array_equal(np.sort(store.row_ids()), store.row_ids())
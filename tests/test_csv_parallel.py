@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+import pytest
+
+import PROJECT as P
+
+HEADER = "ID;Họ Tên;Lớp;Toán;Lý;Hóa;Văn;Anh;Tin"
+
+
+def same_columns(a, b):
+    assert set(a) == set(b)
+    for k, x in a.items():
+        y = b[k]
+        if isinstance(x, tuple):      # cột chuỗi: (mã, pool) -> so giá trị theo từng dòng
+            assert [x[1][i] for i in x[0].tolist()] == [y[1][i] for i in y[0].tolist()], k
+        elif isinstance(x, np.ndarray):
+            assert np.array_equal(x, y), k
+        else:
+            assert x == y, k
+
+
+def by_ranges(path, parts):
+    # csv_byte_ranges + đọc từng khoảng ngay trong tiến trình này, ghép như _read_csv_parallel
+    delimiter, header, start = P._csv_header(path)
+    pos = P.map_header(header)
+    ranges = P.csv_byte_ranges(path, start, parts)
+    assert all(lo < hi for lo, hi in ranges) and [hi for _, hi in ranges[:-1]] == [lo for lo, _ in ranges[1:]]
+    return P.build_columns([p for lo, hi in ranges for p in P._read_csv_range((path, lo, hi, delimiter, pos))])
+
+
+def random_rows(n, seed=1, newline="\n"):
+    rnd = random.Random(seed); lines = [HEADER]
+    for i in range(n):
+        name = rnd.choice(["An", "Bình Minh", '"Q; q"', '"hai\ndòng"', '"x ""y""\n\nz"', '"cr\r\nlf"', "Đặng Ư"])
+        lines.append(";".join([str(i) if rnd.random() > 0.01 else "", name, rnd.choice(["10A1", "11A2"])]
+                              + [rnd.choice(["1", "2,5", "9.75", "", "11", "x"]) for _ in range(6)]))
+    return newline.join(lines) + newline
+
+
+CASES = {
+    "quoted_newlines": ("utf-8", random_rows(3000)),
+    "crlf": ("utf-8", random_rows(3000, seed=2, newline="\r\n")),
+    "bom": ("utf-8-sig", random_rows(3000, seed=3)),
+    "bom_crlf_edge": ("utf-8-sig", HEADER + "\r\n1;An;10A1;8;7;6;5;4;3\r\n\r\n"
+                      '2;"Bình, ""B""\nhai dòng\nba";10A2;8,5;x;;11;-1;nan\r\n;Chi;10A3;1;2;3;4;5;6\r\n'
+                      "abc;Dũng;10A1;1\r\n7.9;  Em  ; 11A1 ;10;10;10;10;10;10;extra\r\n1;An;10A1;8;7;6;5;4;3"),
+}
+
+
+@pytest.fixture(params=list(CASES))
+def csv_file(request, tmp_path):
+    encoding, text = CASES[request.param]
+    path = tmp_path / f"{request.param}.csv"
+    path.write_text(text, encoding=encoding, newline="")
+    return str(path)
+
+
+@pytest.mark.parametrize("parts", [2, 7, 50])
+def test_byte_ranges_match_serial_reader(csv_file, parts):
+    same_columns(P.read_csv_columns(csv_file), by_ranges(csv_file, parts))
+
+
+def test_process_pool_matches_serial_reader(tmp_path, monkeypatch):
+    path = tmp_path / "pool.csv"
+    path.write_text(CASES["bom_crlf_edge"][1] + "\r\n" + random_rows(2000, seed=4, newline="\r\n").split("\r\n", 1)[1],
+                    encoding="utf-8-sig", newline="")
+    monkeypatch.setattr(P, "CSV_RANGE", 16 << 10)
+    same_columns(P.read_csv_columns(str(path)), P._read_csv_parallel(str(path), workers=2))
+
+
+def test_bare_cr_falls_back_to_serial(tmp_path):
+    path = tmp_path / "cr.csv"
+    path.write_text("ID;Họ Tên\r1;a\r2;b\r", encoding="utf-8", newline="")
+    same_columns(P.read_csv_columns(str(path)), P._read_csv_parallel(str(path), workers=2))
+
+
+def test_small_files_or_few_cpus_read_serially(tmp_path, monkeypatch):
+    path = tmp_path / "small.csv"
+    path.write_text(random_rows(50), encoding="utf-8", newline="")
+    monkeypatch.setattr(P, "_read_csv_parallel", lambda *a, **k: pytest.fail("không được dùng pool"))
+    P.read_csv_columns_parallel(str(path), workers=8)
+    monkeypatch.setattr(P, "CSV_PARALLEL_MIN", 0)
+    P.read_csv_columns_parallel(str(path), workers=P.CSV_PARALLEL_CPUS - 1)
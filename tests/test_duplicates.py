@@ -0,0 +1,42 @@
+import pytest
+
+import PROJECT as P
+
+
+@pytest.fixture(scope="module")
+def store():
+    store = P._bench_store(20_000)
+    for rid in range(0, 600, 3):                    # bản sao hoàn toàn (khác ID) và bản cùng tên khác điểm
+        rec = store.record(rid); rec["id"] += 100_000; store.append(rec)
+        if rid % 2: rec["id"] += 100_000; rec["toan"] = (rec["toan"] + 1) % 10; store.append(rec)
+    return store
+
+
+def test_progress_reports_until_done(store, monkeypatch):
+    monkeypatch.setattr(P, "DUP_PROGRESS_EVERY", 64)
+    seen = []
+    groups = P.find_duplicates(store, progress=lambda done, total: seen.append((done, total)))
+    assert len(seen) > 2 and [d for d, _ in seen] == sorted(d for d, _ in seen)
+    assert seen[-1][0] == seen[-1][1] - 1 and len({t for _, t in seen}) == 1
+    assert [(k, g.tolist()) for k, g in groups] == [(k, g.tolist()) for k, g in P.find_duplicates(store)]
+
+
+def test_progress_can_cancel(store, monkeypatch):
+    monkeypatch.setattr(P, "DUP_PROGRESS_EVERY", 64)
+    def progress(done, total):
+        if done >= 128: raise P.LoadCancelled
+    with pytest.raises(P.LoadCancelled):
+        P.find_duplicates(store, progress=progress)
+
+
+def test_injected_copies_are_grouped(store):
+    groups = P.find_duplicates(store)
+    by_rid = {r: (k, g.tolist()) for k, g in groups for r in g.tolist()}
+    for rid in range(0, 600, 3):
+        sid = store.get_value(rid, "id")
+        kind, members = by_rid[rid]
+        ids = [store.get_value(r, "id") for r in members]
+        assert sid + 100_000 in ids and ids == sorted(ids)
+        copies = P.exact_copies(store, members)
+        assert store.rid_of(sid + 100_000) in copies and rid not in copies
+        if rid % 2: assert store.rid_of(sid + 200_000) not in copies
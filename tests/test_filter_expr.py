@@ -0,0 +1,91 @@
+import re
+
+import numpy as np
+import pytest
+
+import PROJECT as P
+
+
+def make_store():
+    store = P.StudentStore()
+    rows = [("Nguyễn Văn An", "10A1", 8, 6.5), ("Trần Thị Bình", "10A2", 4, 9),
+            ("Lê Văn Cường", "11B1", 9.5, 3), ("Phạm Thu Dung", "12C1", 6, 7),
+            ("Hoàng Minh Em", "11B2", 5, 5)]
+    for i, (name, lop, toan, van) in enumerate(rows, 1):
+        sc = {c: 6.0 for c in P.SUBJECTS}; sc.update(toan=float(toan), van=float(van))
+        avg = P.wavg(sc)
+        store.append({"id": i, "ho_ten": name, "lop": lop, **sc, "diem_tb": round(avg, 2), "xep_loai": P.classify(avg)})
+    return store
+
+
+def ids(store, text, sorter=None):
+    return [int(store.get_value(r, "id")) for r in P.filter_expr_rids(store, text, sorter)]
+
+
+def test_and_binds_tighter_than_or():
+    assert P.parse_filter("toan > 5 or van < 4 and lop = 11b1") == \
+        ("or", ("cmp", "toan", ">", 5.0), ("and", ("cmp", "van", "<", 4.0), ("cmp", "lop", "=", "11b1")))
+
+
+def test_not_and_parentheses():
+    store = make_store()
+    assert ids(store, "not toan > 5") == [2, 5]
+    assert ids(store, "not (toan > 5 or van > 8)") == [5]
+    assert ids(store, "(toan > 5 or van > 8) and lop ^= 10") == [1, 2]
+    assert ids(store, "khong lop ^= 1 va toan >= 0") == []
+
+
+def test_between_and_in():
+    store = make_store()
+    assert ids(store, "toan between 5 and 8") == [1, 4, 5]
+    assert ids(store, "toan between 5 and 8 and van > 6") == [1, 4]
+    assert ids(store, "toan in (4, 9.5)") == [2, 3]
+    assert ids(store, "lop not in (10a1, 11B1)") == [2, 4, 5]
+
+
+def test_string_operators_fold_accents():
+    store = make_store()
+    assert ids(store, "ten ~ 'van'") == [1, 3]
+    assert ids(store, "ten ~ 'Văn' and toan < 9") == [1]
+    assert ids(store, "lop ^= 11") == [3, 5]
+    assert ids(store, "lop = 12c1") == [4]
+    assert ids(store, "lop != 12c1 and lop ^= 1") == [1, 2, 3, 5]
+
+
+def test_comma_decimal():
+    assert P.parse_filter("tb >= 6,5") == ("cmp", "diem_tb", ">=", 6.5)
+    assert P.parse_filter("van = 6,5 and toan < 7") == \
+        ("and", ("cmp", "van", "=", 6.5), ("cmp", "toan", "<", 7.0))
+    assert ids(make_store(), "van = 6,5") == [1]
+    # trong in (...) dấu phẩy vẫn ngăn các giá trị
+    assert P.parse_filter("toan in (5,6)") == ("in", "toan", (5.0, 6.0))
+
+
+def test_index_plans_match_full_scan():
+    store = make_store(); sorter = P.SortEngine(store)
+    store.delete(store.by_id(2).rid)
+    for text in ["lop ^= 10", "lop = 11b2 and toan >= 5", "lop in (10a1, 12c1) or toan > 9",
+                 "toan > 9", f"xl = '{store.get_value(0, 'xep_loai')}'"]:
+        full = np.flatnonzero(P.compile_filter(text)(store) & store.alive_mask())
+        assert P.filter_expr_rids(store, text).tolist() == full.tolist()
+        assert P.filter_expr_rids(store, text, sorter).tolist() == full.tolist()
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Biểu thức rỗng"),
+    ("toan > 5 or", "kết thúc đột ngột: còn thiếu điều kiện"),
+    ("toan > 5 and not", "kết thúc đột ngột: còn thiếu điều kiện"),
+    ("toan >", "kết thúc đột ngột: còn thiếu giá trị cho 'toan'"),
+    ("(toan > 5", "kết thúc đột ngột: còn thiếu ')'"),
+    ("toan between 5", "kết thúc đột ngột: còn thiếu 'and'"),
+    ("diem > 5", "Không có cột 'diem'"),
+    ("toan ~ 5", "Cột 'toan' không dùng được phép '~'"),
+    ("lop between 1 and 2", "Cột 'lop' không dùng được 'between'"),
+    ("toan > abc", "'abc' không phải số"),
+    ("toan > 5 5", "Thừa '5.0' ở cuối biểu thức"),
+    ("toan > 5 )", "Thừa ')' ở cuối biểu thức"),
+    ("toan > 5 ^ 3", "Không hiểu ký tự ở vị trí 10"),
+])
+def test_error_messages(text, message):
+    with pytest.raises(P.FilterSyntaxError, match=re.escape(message)):
+        P.parse_filter(text)
@@ -0,0 +1,65 @@
+import random
+
+import PROJECT as P
+
+
+def osa(a, b):
+    d = [[max(i, j) if min(i, j) == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def brute(keys, query):
+    qwords = P.fold_vn(query).split(); out = []
+    for key in set(keys):
+        total = 0
+        for q in qwords:
+            tol = P._word_tolerance(q)
+            best = min((osa(q, w) for w in key.split()), default=tol + 1)
+            if best > tol: break
+            total += best
+        else:
+            out.append((key, total))
+    return sorted(out, key=lambda kv: (kv[1], abs(len(kv[0].split()) - len(qwords)), kv[0]))
+
+
+def test_osa_distance_matches_reference():
+    rnd = random.Random(2)
+    for _ in range(500):
+        a = "".join(rnd.choice("abcn") for _ in range(rnd.randint(0, 7)))
+        b = "".join(rnd.choice("abcn") for _ in range(rnd.randint(0, 7)))
+        for max_d in (1, 2):
+            assert P._osa_distance(a, b, max_d) == min(osa(a, b), max_d + 1), (a, b)
+
+
+FIRST = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Võ"]
+MID = ["Văn", "Thị", "Minh", "Thu", "Ngọc"]
+LAST = ["An", "Anh", "Bình", "Hương", "Khánh", "Thanh", "Trang", "Tuấn", "Hà"]
+
+
+def test_ranking_matches_brute_force():
+    rnd = random.Random(4); store = P.StudentStore(); fz = P.FuzzyNameIndex(store)
+    for i in range(300):
+        store.append({"id": i, "ho_ten": f"{rnd.choice(FIRST)} {rnd.choice(MID)} {rnd.choice(LAST)}"})
+    queries = ["nguyen van an", "nguyn thi huong", "tran thahn", "huong", "Hoàng Mihn Khnah", "le ha", "xyz", "an"]
+    for q in queries:
+        assert fz.search(q, limit=10_000) == brute(store.pool_keys("ho_ten"), q), q
+    store.append({"id": 999, "ho_ten": "Đặng Quốc Việt"})         # từ mới sau lần tra đầu -> dựng tiếp
+    assert fz.search("dang quoc viet")[0] == ("dang quoc viet", 0)
+    assert fz.search("dnag quoc vet")[0] == ("dang quoc viet", 2)
+
+
+def test_search_rids_in_rank_order():
+    store = P.StudentStore(); fz = P.FuzzyNameIndex(store)
+    for i, n in enumerate(["Trần Văn An", "Trần Văn Anh", "Lê Văn An", "Trần Văn An", "Trần Thị Ánh"]):
+        store.append({"id": i, "ho_ten": n})
+    assert fz.search_rids("tran van an") == [0, 3, 1]            # mọi từ truy vấn phải khớp một từ của tên
+    assert fz.search_rids("tran an") == [0, 3, 4, 1]             # cùng điểm: theo khoá tên
+    store.delete(3)
+    assert fz.search_rids("tran van an")[:2] == [0, 1]
+    store.clear(); store.append({"id": 1, "ho_ten": "Phạm Bình"})
+    assert fz.search_rids("pham binh") == [0] and fz.search_rids("tran van an") == []
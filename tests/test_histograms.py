@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+import PROJECT as P
+
+
+def bin_of(v):
+    return min(9, max(0, int(v)))       # 0..1 -> bin 0, ..., 9..10 -> bin 9
+
+
+def brute(store, rids=None):
+    out = np.zeros((len(P.HIST_COLS), 10), dtype=np.int64)
+    for s in store:
+        if rids is not None and s.rid not in rids: continue
+        for j, c in enumerate(P.HIST_COLS): out[j, bin_of(s[c])] += 1
+    return out
+
+
+def score(rnd):
+    return rnd.choice([0.0, 0.5, 1.0, 4.99, 5.0, 8.75, 9.0, 9.5, 10.0, rnd.uniform(0, 10)])
+
+
+def test_histograms_follow_mutations():
+    rnd = random.Random(21); store = P.StudentStore(); hist = P.ScoreHistograms(store)
+    for _ in range(400):
+        alive = [s.rid for s in store]; op = rnd.random()
+        if op < 0.5 or not alive:
+            store.append({"id": 1, **{c: score(rnd) for c in P.HIST_COLS}})
+        elif op < 0.8:
+            store.update_row(rnd.choice(alive), {rnd.choice(P.HIST_COLS): score(rnd)})
+        else: store.delete(rnd.choice(alive))
+    assert (hist.for_rows() == brute(store)).all()
+    sub = [s.rid for s in store][::3]
+    assert (hist.for_rows(sub) == brute(store, set(sub))).all()
+    d = hist.as_dict(sub)
+    assert list(d) == P.HIST_NAMES and d["TB"] == brute(store, set(sub))[-1].tolist()
+
+
+def test_hist10_helpers_match_scalar_bins():
+    rnd = random.Random(22)
+    vals = np.array([[score(rnd) for _ in range(300)] for _ in range(3)] + [[-1.0, 11.0, 9.0] * 100])
+    m = P.hist10_matrix(vals)
+    for j, row in enumerate(vals):
+        assert m[j].tolist() == np.bincount([P._bucket_index(v) for v in row], minlength=10).tolist()
+    groups = np.array([rnd.randrange(-1, 3) for _ in range(300)])
+    g = P.hist10_grouped(groups, vals[0], 3)
+    for k in range(3):
+        assert g[k].tolist() == np.bincount([P._bucket_index(v) for v in vals[0][groups == k]], minlength=10).tolist()
+
+
+def test_by_grade_matches_brute_force():
+    rnd = random.Random(23); store = P.StudentStore(); hist = P.ScoreHistograms(store)
+    for i in range(300):
+        store.append({"id": i, "lop": rnd.choice(["10A1", " 11B2", "12C3", "9A1", "", "10"]), "diem_tb": score(rnd)})
+    rids = [s.rid for s in store if rnd.random() < 0.6]
+    want = np.zeros((3, 10), dtype=np.int64)
+    for r in rids:
+        lop = store.get_value(r, "lop").strip()
+        for k, g in enumerate(["10", "11", "12"]):
+            if lop.startswith(g): want[k, bin_of(store.get_value(r, "diem_tb"))] += 1
+    assert (hist.by_grade(rids) == want).all()
+    assert (hist.by_grade() == hist.by_grade([s.rid for s in store])).all()
@@ -0,0 +1,53 @@
+import openpyxl
+
+import PROJECT as P
+
+
+def write_sheet(ws, rows, lop=True):
+    ws.append(["ID", "Họ Tên"] + (["Lớp"] if lop else []) + ["Toán", "Văn"])
+    for r in rows: ws.append(list(r))
+
+
+def class_book(path, sheets):
+    wb = openpyxl.Workbook(); wb.remove(wb.active)
+    for name, rows in sheets.items(): write_sheet(wb.create_sheet(name), rows, lop=False)
+    wb.save(path)
+
+
+def test_folder_import_merges_sources_and_reassigns_ids(tmp_path):
+    class_book(tmp_path / "10A1.xlsx", {"DS": [(1, "An", 8, 7), (2, "Bình", 6, 5)]})
+    (tmp_path / "10A2.csv").write_text("ID;Họ Tên;Lớp;Toán;Văn\n1;Chi;;9;9\n5;Dũng;10A9;4;4\n", encoding="utf-8")
+    (tmp_path / "~$10A1.xlsx").write_bytes(b"khoa")
+    (tmp_path / "hong.xlsx").write_bytes(b"khong phai xlsx")
+    paths = P.list_import_files(str(tmp_path))
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["10A1.xlsx", "10A2.csv", "hong.xlsx"]
+    seen = []
+    cols = P.import_sources(paths, lambda rows, done, total: seen.append((done, total)), workers=1)
+    assert seen[-1] == (3, 3)
+    store = P.StudentStore(); src = P.ImportSources(store)
+    store.load_columns(cols); src.set(*cols["nguon"])
+    recs = [store.record(r) for r in store.row_ids().tolist()]
+    assert [(r["id"], r["ho_ten"], r["lop"]) for r in recs] == [
+        (1, "An", "10A1"), (2, "Bình", "10A1"), (6, "Chi", "10A2"), (5, "Dũng", "10A9")]
+    assert cols["doi_id"] == 1
+    assert [src.name_of(r) for r in store.row_ids().tolist()] == ["10A1.xlsx", "10A1.xlsx", "10A2.csv", "10A2.csv"]
+    assert [s for s, _ in cols["loi"]] == ["hong.xlsx"]
+    store.clear()
+    assert src.name_of(0) is None
+
+
+def test_all_sheets_take_class_from_sheet_name(tmp_path):
+    path = tmp_path / "khoi10.xlsx"
+    class_book(path, {"10A1": [(1, "An", 8, 7)], "10A2": [(1, "Bình", 6, 5), (2, "Chi", 9, 9)], "Ghi chú": []})
+    cols = P.import_workbook_sheets(str(path), workers=1)
+    store = P.StudentStore(); store.load_columns(cols)
+    recs = [store.record(r) for r in store.row_ids().tolist()]
+    assert [(r["id"], r["lop"]) for r in recs] == [(1, "10A1"), (3, "10A2"), (2, "10A2")]
+    assert cols["nguon"][1] == ["khoi10.xlsx › 10A1", "khoi10.xlsx › 10A2"] and not cols["loi"]
+
+
+def test_build_data_keeps_row_sources(tmp_path):
+    class_book(tmp_path / "a.xlsx", {"S": [(1, "An", 8, 7)]})
+    cols = P.import_sources([str(tmp_path / "a.xlsx")], workers=1)
+    data, err = P.StudentManagerGUI._build_data(cols, (P.DEFAULT_SORT, False), str(tmp_path / "none.json"), [])
+    assert err is None and data["sources"].name_of(0) == "a.xlsx"
@@ -0,0 +1,106 @@
+import random
+
+import PROJECT as P
+
+
+CLASSES = ["10A1", "10A2", "10B1", "11A1", "11C3", "12A10", " 12a1 "]
+RANKS = ["Giỏi", "Khá", "Trung bình", "Yếu"]
+
+
+def build(n=500, seed=1):
+    rnd = random.Random(seed); store = P.StudentStore()
+    for i in range(n):
+        store.append({"id": i, "ho_ten": f"HS {i}", "lop": rnd.choice(CLASSES), "xep_loai": rnd.choice(RANKS)})
+    for _ in range(n // 3):                         # sửa / xoá ngẫu nhiên sau khi nạp
+        rid = rnd.randrange(n)
+        if not store.is_alive(rid): continue
+        if rnd.random() < 0.5: store.update_row(rid, {"lop": rnd.choice(CLASSES)})
+        else: store.delete(rid)
+    return store
+
+
+def scan(store, col, ok):
+    norm = store.key_index[col].normalize
+    return {s.rid for s in store if ok(norm(s[col]))}
+
+
+def test_posting_lookups_match_scan():
+    store = build(); idx = store.key_index["lop"]
+    for q in ["10a1", "10", "1", "12a1", "a1", "c", "9"]:
+        assert idx.exact(q) == scan(store, "lop", lambda k: k == q)
+        assert idx.prefix(q) == scan(store, "lop", lambda k: k.startswith(q))
+        assert idx.contains(q) == scan(store, "lop", lambda k: q in k)
+    rank = store.key_index["xep_loai"]
+    assert P._intersect([idx.prefix("11"), rank.exact(rank.normalize("Khá"))]) == \
+        {s.rid for s in store if s["lop"].strip().startswith("11") and s["xep_loai"] == "Khá"}
+
+
+def test_emptied_keys_leave_index():
+    store = P.StudentStore(); a = store.append({"id": 1, "lop": "10A1"})
+    idx = store.key_index["lop"]
+    store.update_row(a.rid, {"lop": "11A1"})
+    assert idx.prefix("10") == set() and idx.sorted_keys() == ["11a1"]
+    store.delete(a.rid)
+    assert idx.contains("a") == set() and idx.sorted_keys() == []
+
+
+def test_trigram_contains_matches_scan():
+    rnd = random.Random(5); store = P.StudentStore()
+    first = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng"]; last = ["An", "Bình", "Chi", "Dũng", "Hà", "Anh"]
+    for i in range(400):
+        store.append({"id": i, "ho_ten": f"{rnd.choice(first)} Văn {rnd.choice(last)}", "lop": "10A1"})
+    for rid in rnd.sample(range(400), 120):
+        if rnd.random() < 0.5: store.update_row(rid, {"ho_ten": f"{rnd.choice(last)} {rnd.choice(first)}"})
+        else: store.delete(rid)
+    idx = store.key_index["ho_ten"]
+    for q in ["an", "a", "văn a", "nguyễn văn", "anh", "ng", "xyz", "bình trần", "n v"]:
+        q = idx.normalize(q)
+        assert idx.contains(q) == scan(store, "ho_ten", lambda k: q in k), q
+
+
+def test_fold_vn():
+    assert P.fold_vn("  Nguyễn   Văn  AN ") == "nguyen van an"
+    assert P.fold_vn("Đặng Thị Ánh") == "dang thi anh" and P.fold_vn("Trung bình") == "trung binh"
+    assert P.fold_vn(None) == "" and P.fold_vn("Phạm\tĐức") == "pham duc"
+
+
+def test_folded_keys_computed_once_per_value():
+    store = P.StudentStore()
+    for i in range(50): store.append({"id": i, "ho_ten": "Nguyễn Văn An" if i % 2 else "Lê Thị Hà"})
+    col = store._str["ho_ten"]
+    assert col.keys == [P.fold_vn(v) for v in col.values] and len(col.values) == 2
+    idx = store.key_index["ho_ten"]
+    assert idx.contains(P.fold_vn("nguyen van an")) == {r for r in range(50) if r % 2}
+    assert idx.contains(P.fold_vn("LÊ THI")) == {r for r in range(50) if not r % 2}
+    store.update_row(1, {"ho_ten": "Đỗ Đức"})
+    assert store.search_key(1, "ho_ten") == "do duc" and idx.contains("duc") == {1}
+
+
+def test_filter_rids_and_refinement():
+    store = build(800, seed=3)
+    fields = {"lop": P.fold_vn("10"), "xep_loai": P.fold_vn("kha")}
+    want = {s.rid for s in store if "10" in P.fold_vn(s["lop"]) and "kha" in P.fold_vn(s["xep_loai"])}
+    assert P.filter_rids(store, fields) == want
+    assert P.filter_rids(store, {"lop": ""}) is None
+    narrower = {"lop": P.fold_vn("10a"), "xep_loai": P.fold_vn("kha")}
+    assert P.is_refinement(fields, narrower) and not P.is_refinement(narrower, fields)
+    assert P.filter_rids(store, narrower, base=want) == P.filter_rids(store, narrower)
+
+
+def test_filter_rids_while_store_changes():
+    import threading
+    store = build(2000, seed=4); stop = threading.Event(); errors = []
+
+    def reader():
+        while not stop.is_set():
+            try: P.filter_rids(store, {"lop": "a1", "ho_ten": "hs 1"})
+            except Exception as e: errors.append(e); return
+
+    t = threading.Thread(target=reader); t.start()
+    rnd = random.Random(9)
+    for i in range(3000):
+        store.append({"id": 10_000 + i, "ho_ten": f"HS {i}", "lop": rnd.choice(CLASSES)})
+        rid = rnd.randrange(len(store))
+        if store.is_alive(rid): store.delete(rid)
+    stop.set(); t.join()
+    assert errors == []
@@ -0,0 +1,44 @@
+import random
+from collections import Counter
+
+import PROJECT as P
+
+
+def rows(store, rids=None):
+    return [s for s in store if rids is None or s.rid in rids]
+
+
+def brute(store, rids=None):
+    c = Counter(s["xep_loai"] for s in rows(store, rids))
+    return {r: c.get(r, 0) for r in set(P.RANKS) | set(c)}
+
+
+def nonzero(d): return {k: v for k, v in d.items() if v}
+
+
+def mutate(store, rnd, steps):
+    for _ in range(steps):
+        alive = [s.rid for s in store]; op = rnd.random()
+        if op < 0.4 or not alive: store.append({"id": rnd.randrange(10**6), "xep_loai": rnd.choice(P.RANKS)})
+        elif op < 0.8: store.update_row(rnd.choice(alive), {"xep_loai": rnd.choice(P.RANKS), "toan": 1.0})
+        else: store.delete(rnd.choice(alive))
+
+
+def test_counts_follow_mutations():
+    rnd = random.Random(11); store = P.StudentStore(); kpi = P.KpiAggregator(store)
+    mutate(store, rnd, 300)
+    assert nonzero(kpi.current()) == nonzero(brute(store)) and kpi.visible() == len(store)
+
+
+def test_view_counts_follow_edits_and_inserts():
+    rnd = random.Random(12); store = P.StudentStore(); kpi = P.KpiAggregator(store)
+    mutate(store, rnd, 200)
+    view = {s.rid for s in store if rnd.random() < 0.3}
+    kpi.set_view(iter(view))
+    assert nonzero(kpi.current()) == nonzero(brute(store, view)) and kpi.visible() == len(view)
+    mutate(store, rnd, 200)          # thêm dòng khi đang lọc: dòng mới không vào view
+    alive_view = {r for r in view if store.is_alive(r)}
+    assert nonzero(kpi.current()) == nonzero(brute(store, alive_view)) and kpi.visible() == len(alive_view)
+    assert nonzero(kpi.counts) == nonzero(brute(store))
+    kpi.set_view(None)
+    assert nonzero(kpi.current()) == nonzero(brute(store))
@@ -0,0 +1,41 @@
+import json
+
+import PROJECT as P
+
+
+def read_cols(tmp_path, n=500):
+    path = tmp_path / "hs.csv"; P._bench_write_csv(str(path), n)
+    return P.read_csv_columns(str(path))
+
+
+def test_build_data_binds_every_listener_to_the_new_store(tmp_path):
+    cols = read_cols(tmp_path)
+    data, err = P.StudentManagerGUI._build_data(cols, (P.DEFAULT_SORT, False), str(tmp_path / "none.json"), [])
+    store = data["students"]
+    assert err is None and len(store) == 500
+    for name in ("kpi", "hist", "sorter", "_dirty", "sources", "saved"):
+        assert data[name] in store._listeners
+    assert sum(data["kpi"].counts.values()) == 500
+    assert sorted(data["sorter"].order(P.DEFAULT_SORT).tolist()) == list(range(500))
+    assert data["_dirty"].reset      # bảng sẽ vẽ lại toàn bộ sau khi đổi kho
+
+
+def test_build_data_loads_filters_of_the_new_file(tmp_path):
+    cols = read_cols(tmp_path)
+    path = tmp_path / "hs.filters.json"
+    path.write_text(json.dumps({"version": 1, "filters": [{"name": "yếu văn", "expr": "van < 3,5"},
+                                                          {"name": "hỏng", "expr": "toan >"}]}), encoding="utf-8")
+    data, err = P.StudentManagerGUI._build_data(cols, (P.DEFAULT_SORT, False), str(path), [("cũ", "toan > 5")])
+    store = data["students"]
+    assert err is None and data["saved"].names() == ["yếu văn"]
+    assert data["saved"].get("yếu văn").rids() == set(P.filter_expr_rids(store, "van < 3.5").tolist())
+
+
+def test_build_data_keeps_current_filters_without_a_readable_file(tmp_path):
+    cols = read_cols(tmp_path)
+    keep = [("giỏi toán", "toan >= 8")]
+    data, err = P.StudentManagerGUI._build_data(cols, (("toan",), True), str(tmp_path / "none.json"), keep)
+    assert err is None and data["saved"].names() == ["giỏi toán"]
+    bad = tmp_path / "bad.json"; bad.write_text("{hỏng", encoding="utf-8")
+    data, err = P.StudentManagerGUI._build_data(cols, (("toan",), True), str(bad), keep)
+    assert isinstance(err, ValueError) and data["saved"].names() == ["giỏi toán"]
@@ -0,0 +1,57 @@
+import random
+
+import PROJECT as P
+
+
+CLASSES = ["10A1", "10A2", "11B1", "12C1"]
+
+
+def row(rnd, i):
+    sc = {c: float(rnd.randint(0, 10)) for c in P.SUBJECTS}; avg = P.wavg(sc)
+    return {"id": i, "ho_ten": f"HS {i}", "lop": rnd.choice(CLASSES), **sc,
+            "diem_tb": round(avg, 2), "xep_loai": P.classify(avg)}
+
+
+def scan(store, expr):
+    return set(P.filter_expr_rids(store, expr).tolist())
+
+
+EXPRS = ["toan >= 8", "lop ^= 10 and van < 5", "xl = gioi or tb < 4", "not lop in (11b1, 12c1)", "ten ~ 'hs 1'"]
+
+
+def test_saved_filters_follow_edits():
+    rnd = random.Random(11); store = P.StudentStore(); saved = P.SavedFilters(store)
+    for i in range(300): store.append(row(rnd, i))
+    for e in EXPRS: saved.add(e, e)
+    for step in range(400):
+        alive = [s.rid for s in store]; op = rnd.random()
+        if op < 0.3: store.append(row(rnd, 1000 + step))
+        elif op < 0.8:
+            r = rnd.choice(alive); new = row(rnd, 0)
+            col = rnd.choice(["toan", "van", "lop", "ho_ten", "ly"])
+            store.update_row(r, {col: new[col]} if col != "van" else {"van": new["van"], "diem_tb": new["diem_tb"]})
+        else: store.delete(rnd.choice(alive))
+        if step % 37 == 0:                              # đọc giữa chừng: hàng chờ xét lại theo lô
+            for e in EXPRS: assert saved.get(e).rids() == scan(store, e), e
+    for e in EXPRS: assert saved.get(e).rids() == scan(store, e) and len(saved.get(e)) == len(scan(store, e))
+    store.clear()
+    for i in range(50): store.append(row(rnd, i))
+    for e in EXPRS: assert saved.get(e).rids() == scan(store, e)
+
+
+def test_unrelated_column_edits_are_ignored():
+    store = P.StudentStore(); saved = P.SavedFilters(store)
+    for i in range(10): store.append({"id": i, "toan": float(i), "lop": "10A1"})
+    f = saved.add("gioi toan", "toan >= 8"); assert f.rids() == {8, 9}
+    store.update_row(3, {"lop": "11A1"}); assert not f._pending
+    store.update_row(3, {"toan": 9.0}); assert f._pending == {3} and f.rids() == {3, 8, 9}
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    store = P.StudentStore(); saved = P.SavedFilters(store)
+    saved.add("A", "toan > 5"); saved.add("B", "lop ^= 10 and xl = kha")
+    path = tmp_path / "loc.json"; saved.save(str(path))
+    other = P.SavedFilters(store)
+    assert other.load(str(path)) == 2 and other.names() == ["A", "B"] and other.get("B").expr == "lop ^= 10 and xl = kha"
+    path.write_text('{"filters": [{"name": "hong", "expr": "toan >"}, {"name": "ok", "expr": "van < 3"}]}', encoding="utf-8")
+    assert other.load(str(path)) == 1 and other.names() == ["ok"]
@@ -0,0 +1,80 @@
+import random
+
+import PROJECT as P
+
+
+NAMES = ["Nguyễn Văn An", "nguyen van an", "Lê Thị Hà", "Đỗ Bình", "Trần An", "An", "Ánh"]
+CLASSES = ["10A1", "10a1", "11B2", "12C3", "10A10"]
+
+
+def rand_row(rnd, i):
+    return {"id": rnd.randrange(50), "ho_ten": rnd.choice(NAMES), "lop": rnd.choice(CLASSES),
+            "toan": rnd.choice([5.0, 7.5, 8.0, 9.25]), "diem_tb": rnd.choice([6.0, 7.0, 8.5])}
+
+
+def expected(store, eng, cols, descending=False, rids=None):
+    def key(r):
+        return tuple(eng.collate[c](store.get_value(r, c)) if c in eng.collate else store.get_value(r, c)
+                     for c in cols)
+    live = sorted(s.rid for s in store if rids is None or s.rid in rids)
+    return sorted(live, key=key, reverse=descending)      # sort ổn định: cùng khoá giữ rid tăng ở cả hai chiều
+
+
+def mutate(store, rnd, steps):
+    for _ in range(steps):
+        alive = [s.rid for s in store]; op = rnd.random()
+        if op < 0.5 or not alive: store.append(rand_row(rnd, len(alive)))
+        elif op < 0.8:
+            col = rnd.choice(["ho_ten", "lop", "toan"])
+            store.update_row(rnd.choice(alive), {col: rand_row(rnd, 0)[col]})
+        else: store.delete(rnd.choice(alive))
+
+
+SPECS = [P.DEFAULT_SORT, ("toan",), ("ho_ten",), ("lop",), ("diem_tb", "ho_ten"), ("id",)]
+
+
+def test_order_matches_sorted_in_both_directions():
+    rnd = random.Random(31); store = P.StudentStore(); eng = P.SortEngine(store)
+    for _ in range(6):
+        mutate(store, rnd, 150)             # sửa nhỏ -> chèn lại theo hàng chờ; nhiều -> dựng lại
+        sub = {s.rid for s in store if rnd.random() < 0.4}
+        for cols in SPECS:
+            for desc in (False, True):
+                assert eng.order(cols, desc).tolist() == expected(store, eng, cols, desc), (cols, desc)
+                assert eng.order(cols, desc, sorted(sub)).tolist() == expected(store, eng, cols, desc, sub)
+
+
+def test_descending_ties_keep_insertion_order():
+    store = P.StudentStore(); eng = P.SortEngine(store)
+    for i in range(6): store.append({"id": i, "ho_ten": "A", "lop": "10A1" if i % 2 else "11A1"})
+    assert eng.order(("lop",), True).tolist() == [0, 2, 4, 1, 3, 5]
+    assert eng.order(("lop",), False).tolist() == [1, 3, 5, 0, 2, 4]
+    store.append({"id": 9, "lop": "11A1"}); store.delete(2)
+    assert eng.order(("lop",), True).tolist() == [0, 4, 6, 1, 3, 5]
+
+
+def test_range_and_top_match_sorted():
+    rnd = random.Random(7); store = P.StudentStore(); eng = P.SortEngine(store)
+    for _ in range(4):
+        mutate(store, rnd, 200)
+        live = [s.rid for s in store]; sub = [r for r in live if rnd.random() < 0.5]
+        for lo, hi, lo_open, hi_open in [(None, 7.5, False, False), (7.5, None, True, False),
+                                         (5.0, 8.0, False, True), (8.0, 8.0, False, False), (9.5, None, False, False)]:
+            def ok(v):
+                return (lo is None or (v > lo if lo_open else v >= lo)) and (hi is None or (v < hi if hi_open else v <= hi))
+            want = sorted((r for r in live if ok(store.get_value(r, "toan"))), key=lambda r: store.get_value(r, "toan"))
+            assert eng.range("toan", lo, hi, lo_open, hi_open).tolist() == want
+            assert eng.range("toan", lo, hi, lo_open, hi_open, sub).tolist() == [r for r in want if r in sub]
+            assert eng.range_size("toan", lo, hi, lo_open, hi_open) >= len(want)
+        for k in (1, 5, 40, 10_000):
+            for rids in (None, sub):
+                pool = live if rids is None else rids
+                assert eng.top("toan", k, True, rids).tolist() == expected(store, eng, ("toan",), True, set(pool))[:k]
+                assert eng.top("toan", k, False, rids).tolist() == expected(store, eng, ("toan",), False, set(pool))[:k]
+
+
+def test_top_ties_keep_rid_order():
+    store = P.StudentStore(); eng = P.SortEngine(store)
+    for i, v in enumerate([8, 9, 8, 9, 7, 9]): store.append({"id": i, "toan": float(v)})
+    assert eng.top("toan", 4).tolist() == [1, 3, 5, 0]
+    assert eng.top("toan", 2, largest=False).tolist() == [4, 0]
@@ -0,0 +1,93 @@
+import numpy as np
+
+import PROJECT as P
+
+
+def rec(sid, name="Nguyễn Văn An", lop="10A1", **scores):
+    r = {"id": sid, "ho_ten": name, "lop": lop, "diem_tb": 7.5, "xep_loai": "Khá"}
+    r.update({s: 7.0 for s in P.SUBJECTS}); r.update(scores)
+    return r
+
+
+def test_append_and_read_back():
+    store = P.StudentStore(capacity=4)
+    rows = [store.append(rec(i, f"HS {i}", f"1{i % 3}A1", toan=i / 10)) for i in range(40)]   # vượt capacity
+    assert len(store) == 40 and bool(store)
+    assert [r.rid for r in rows] == list(range(40))
+    assert [s["id"] for s in store] == list(range(40))
+    assert store[3]["ho_ten"] == "HS 3" and store[3]["lop"] == "10A1"
+    assert store.column("toan").tolist() == [i / 10 for i in range(40)]
+    assert store.column("lop", [0, 1, 2]) == ["10A1", "11A1", "12A1"]
+    assert dict(store[5]) == store.record(5) and set(dict(store[5])) == set(P.STUDENT_COLS)
+
+
+def test_missing_fields_default():
+    store = P.StudentStore(); r = store.append({"id": 1, "ho_ten": "A"})
+    assert r["lop"] == "" and r["toan"] == 0.0 and r["diem_tb"] == 0.0
+
+
+def test_update_through_row_and_store():
+    store = P.StudentStore()
+    a = store.append(rec(1)); b = store.append(rec(2, "Trần Thị Bình"))
+    a["toan"] = 9.5
+    a.update({"lop": "11B2", "xep_loai": "Giỏi"})
+    store.update_row(b.rid, {"ho_ten": "Trần Bình", "diem_tb": 8.25})
+    assert store.record(a.rid)["toan"] == 9.5 and a["lop"] == "11B2" and a["xep_loai"] == "Giỏi"
+    assert b["ho_ten"] == "Trần Bình" and b["diem_tb"] == 8.25
+    assert store.get_value(b.rid, "lop") == "10A1"
+
+
+def test_delete_keeps_other_rids():
+    store = P.StudentStore()
+    rows = [store.append(rec(i)) for i in range(5)]
+    store.remove(rows[1]); store.delete(rows[3].rid); store.delete(rows[3].rid)   # xoá lại: bỏ qua
+    assert len(store) == 3 and [s["id"] for s in store] == [0, 2, 4]
+    assert not store.is_alive(1) and store.is_alive(4) and store[2].rid == 4
+    r = store.append(rec(9))
+    assert r.rid == 5 and [s["id"] for s in store] == [0, 2, 4, 9]
+
+
+def test_id_change_and_duplicate_ids():
+    store = P.StudentStore()
+    a = store.append(rec(1)); b = store.append(rec(1, "Bản trùng")); c = store.append(rec(2))
+    assert [s["id"] for s in store] == [1, 1, 2] and a != b
+    a["id"] = 7
+    assert [s["id"] for s in store] == [7, 1, 2] and b["ho_ten"] == "Bản trùng"
+    store.delete(b.rid)
+    assert [s["id"] for s in store] == [7, 2] and c["id"] == 2
+
+
+def test_clear_resets():
+    store = P.StudentStore()
+    for i in range(3): store.append(rec(i))
+    store.clear()
+    assert len(store) == 0 and list(store) == [] and store.append(rec(5)).rid == 0
+    assert isinstance(store.column("id"), np.ndarray)
+
+
+def test_by_id_follows_edits_and_deletes():
+    store = P.StudentStore()
+    a = store.append(rec(1)); b = store.append(rec(1, "Bản trùng")); c = store.append(rec(2))
+    assert store.by_id(1) == a and store.rid_of(2) == c.rid and store.by_id(3) is None
+    store.delete(a.rid)
+    assert store.by_id(1) == b                 # còn dòng trùng ID -> chỉ mục chuyển sang dòng đó
+    store.update_row(c.rid, {"id": 3})
+    assert store.by_id(2) is None and store.by_id(3) == c
+    store.update_row(c.rid, {"toan": 1.0})     # không đổi ID -> chỉ mục giữ nguyên
+    assert store.by_id(3) == c
+
+
+def test_id_index_matches_scan():
+    rnd = np.random.default_rng(3); store = P.StudentStore()
+    for step in range(600):
+        alive = [s.rid for s in store]
+        op = rnd.integers(3)
+        if op == 0 or not alive: store.append(rec(int(rnd.integers(40))))
+        elif op == 1: store.update_row(int(rnd.choice(alive)), {"id": int(rnd.integers(40))})
+        else: store.delete(int(rnd.choice(alive)))
+    ids = {}
+    for s in store: ids.setdefault(s["id"], []).append(s.rid)
+    for sid in range(40):
+        rid = store.rid_of(sid)
+        assert (rid in ids[sid]) if sid in ids else rid is None
+    assert store._id_dups == len(store) - len(ids)
@@ -0,0 +1,24 @@
+import numpy as np
+
+import PROJECT as P
+
+
+class FakeTree:
+    # đủ cho _item_rid/_selected_rid: cửa sổ item cố định, một item đang chọn
+    def __init__(self, n): self.items = [f"I{k}" for k in range(n)]; self.sel = ()
+    def selection(self): return self.sel
+    def index(self, iid): return self.items.index(iid)
+
+
+def test_virtual_selection_maps_items_to_rids_with_duplicate_ids():
+    g = P.StudentManagerGUI.__new__(P.StudentManagerGUI)
+    g.students = P.StudentStore()
+    for i in range(20): g.students.append({"id": i % 4, "ho_ten": f"HS {i}"})     # mỗi ID xuất hiện 5 lần
+    g._virt_ids = np.arange(19, -1, -1); g._virt_start = 6; g._virt_sel_rid = None
+    g.tree = FakeTree(8)
+    g.tree.sel = ("I3",)                         # vị trí 9 trong view -> rid 10
+    assert g._item_rid("I3") == 10 and g._selected_rid() == 10
+    g.tree.sel = (); g._virt_sel_rid = 17       # dòng chọn đã cuộn khỏi cửa sổ
+    assert g._selected_rid() == 17
+    g.students.delete(17)
+    assert g._selected_rid() is None
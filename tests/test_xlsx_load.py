@@ -0,0 +1,46 @@
+import re
+import zipfile
+
+import pytest
+
+import PROJECT as P
+
+
+def records(store):
+    return [store.record(r) for r in store.row_ids().tolist()]
+
+
+def load(path, progress=None):
+    store = P.StudentStore(); store.load_columns(P.read_xlsx_columns(str(path), progress))
+    return store
+
+
+def test_streaming_loader_matches_legacy(tmp_path):
+    path = tmp_path / "hs.xlsx"; P._bench_write_xlsx(str(path), 2500)
+    legacy = P.StudentStore(); P._bench_legacy_load_xlsx(str(path), legacy)
+    assert records(load(path)) == records(legacy)
+
+
+def test_stale_dimension_does_not_truncate(tmp_path):
+    src = tmp_path / "hs.xlsx"; P._bench_write_xlsx(str(src), 300)
+    dst = tmp_path / "a1.xlsx"     # như file của vài phần mềm: thẻ dimension chỉ ghi "A1"
+    with zipfile.ZipFile(src) as zi, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zo:
+        for item in zi.infolist():
+            data = zi.read(item.filename)
+            if item.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb'<dimension ref="[^"]*"\s*/>', b'<dimension ref="A1"/>', data)
+            zo.writestr(item, data)
+    assert len(load(dst)) == 300
+
+
+def test_progress_per_chunk_and_cancel(tmp_path, monkeypatch):
+    monkeypatch.setattr(P, "XLSX_CHUNK", 100)
+    path = tmp_path / "hs.xlsx"; P._bench_write_xlsx(str(path), 250)
+    seen = []
+    assert len(load(path, lambda done, n, total: seen.append((n, total)))) == 250
+    assert [n for n, _ in seen] == [100, 200, 250] and all(total >= n for n, total in seen)
+
+    def cancel(done, n, total):
+        raise P.LoadCancelled()
+    with pytest.raises(P.LoadCancelled):
+        P.read_xlsx_columns(str(path), cancel)